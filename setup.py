@@ -1,6 +1,13 @@
+import re
+
 from setuptools import setup, find_packages
 
-from timeprofile import __version__
+# Read the version without importing timeprofile, whose dependencies may
+# not be installed yet
+with open('timeprofile/__init__.py') as f:
+    __version_info__ = re.search(r'__version_info__ = \((.*)\)',
+        f.read()).group(1)
+__version__ = '.'.join(n.strip() for n in __version_info__.split(','))
 
 test_requirements = []
 with open('requirements-test.txt') as f:
@@ -14,6 +21,11 @@ setup(
     author_email='jdubowy@gmail.com',
     packages=find_packages(),
     scripts=[],
+    entry_points={
+        'console_scripts': [
+            'timeprofile=timeprofile.cli:main'
+        ]
+    },
     package_data={
     },
     classifiers=[
@@ -27,7 +39,8 @@ setup(
     url='https://github.com/pnwairfire/timeprofile',
     description='Package for time profiling emissions output.',
     install_requires=[
-        "nested_dict==1.61"
+        "nested_dict==1.61",
+        "numpy"
     ],
     dependency_links=[
     ],
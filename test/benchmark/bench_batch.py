@@ -0,0 +1,41 @@
+import pytest
+
+from timeprofile.feps import FepsBatchProfiler
+from timeprofile.static import StaticBatchProfiler
+
+from population import generate_fires
+
+# Larger populations are profiled in batches of this many fires, as they
+# would be in practice, to bound memory use
+MAX_BATCH_SIZE = 100000
+
+NUM_FIRES = [1000, 100000, 1000000]
+
+
+@pytest.fixture(scope='module', params=NUM_FIRES)
+def fires(request):
+    return generate_fires(request.param)
+
+def profile(profiler_class, fires, keys=None):
+    num_fires = len(fires['local_start_times'])
+    for b in range(0, num_fires, MAX_BATCH_SIZE):
+        profiler_class(**{k: v[b:b + MAX_BATCH_SIZE] for k, v in fires.items()
+            if keys is None or k in keys})
+    return num_fires
+
+def run(benchmark, profiler_class, fires, keys=None):
+    if len(fires['local_start_times']) > MAX_BATCH_SIZE:
+        num_fires = benchmark.pedantic(profile,
+            args=(profiler_class, fires, keys), rounds=1)
+    else:
+        num_fires = benchmark(profile, profiler_class, fires, keys)
+    benchmark.extra_info['num_fires'] = num_fires
+    benchmark.extra_info['fires_per_second'] = num_fires / benchmark.stats['min']
+
+
+def test_feps_batch(benchmark, fires):
+    run(benchmark, FepsBatchProfiler, fires)
+
+def test_static_batch(benchmark, fires):
+    run(benchmark, StaticBatchProfiler, fires,
+        keys=('local_start_times', 'local_end_times'))
@@ -0,0 +1,41 @@
+import datetime
+
+import pytest
+
+from timeprofile.feps import FepsTimeProfiler, FireType
+
+from population import generate_fires, get_fire
+
+START = datetime.datetime(2019, 8, 10)
+
+# 1 hour to 60 days
+WINDOW_HOURS = [1, 24, 24 * 7, 24 * 30, 24 * 60]
+
+NUM_POPULATION_FIRES = 1000
+
+
+@pytest.fixture(scope='module')
+def population():
+    fires = generate_fires(NUM_POPULATION_FIRES)
+    return [get_fire(fires, i) for i in range(NUM_POPULATION_FIRES)]
+
+
+@pytest.mark.parametrize('engine', FepsTimeProfiler.ENGINES)
+@pytest.mark.parametrize('fire_type', FireType.VALID_FIRE_TYPES)
+@pytest.mark.parametrize('hours', WINDOW_HOURS)
+def test_feps_profiler(benchmark, hours, fire_type, engine):
+    end = START + datetime.timedelta(hours=hours)
+    benchmark(FepsTimeProfiler, START, end, fire_type=fire_type,
+        engine=engine, eager=True)
+
+@pytest.mark.parametrize('hours', WINDOW_HOURS)
+def test_feps_iter_hourly_fractions(benchmark, hours):
+    end = START + datetime.timedelta(hours=hours)
+    profiler = FepsTimeProfiler(START, end, fire_type='wf')
+    benchmark(lambda: sum(1 for _ in profiler.iter_hourly_fractions()))
+
+@pytest.mark.parametrize('fire_type', FireType.VALID_FIRE_TYPES)
+def test_feps_population(benchmark, population, fire_type):
+    fires = [f for f in population if f['fire_type'] == fire_type]
+    benchmark(lambda: [FepsTimeProfiler(eager=True, **f) for f in fires])
+    benchmark.extra_info['num_fires'] = len(fires)
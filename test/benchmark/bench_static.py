@@ -0,0 +1,48 @@
+import datetime
+
+import numpy as np
+import pytest
+
+from timeprofile.static import StaticTimeProfiler
+
+from population import generate_fires, get_fire
+
+START = datetime.datetime(2019, 8, 10, 0, 30)
+
+# 1 hour to 60 days
+WINDOW_HOURS = [1, 24, 24 * 7, 24 * 30, 24 * 60]
+
+NUM_POPULATION_FIRES = 1000
+
+def get_hourly_fractions(kind, hours):
+    if kind == 'default':
+        return None
+    # one value per hour of the window (plus the partial last hour), or
+    # per hour of the day
+    n = 24 if kind == 'daily' else hours + 1
+    values = np.random.default_rng(0).random(n)
+    values = (values / values.sum()).tolist()
+    return {p: values for p in StaticTimeProfiler.FIELDS}
+
+
+@pytest.mark.parametrize('kind', ['default', 'daily', 'window'])
+@pytest.mark.parametrize('hours', WINDOW_HOURS)
+def test_static_profiler(benchmark, hours, kind):
+    end = START + datetime.timedelta(hours=hours)
+    hourly_fractions = get_hourly_fractions(kind, hours)
+    benchmark(lambda: StaticTimeProfiler(START, end,
+        hourly_fractions=hourly_fractions).hourly_fractions)
+
+@pytest.fixture(scope='module')
+def population():
+    fires = generate_fires(NUM_POPULATION_FIRES)
+    fires = [get_fire(fires, i) for i in range(NUM_POPULATION_FIRES)]
+    return [(f['local_start_time'], f['local_end_time']) for f in fires]
+
+@pytest.mark.parametrize('kind', ['default', 'daily'])
+def test_static_population(benchmark, population, kind):
+    hourly_fractions = get_hourly_fractions(kind, 24)
+    benchmark(lambda: [StaticTimeProfiler(start, end,
+        hourly_fractions=hourly_fractions).hourly_fractions
+        for start, end in population])
+    benchmark.extra_info['num_fires'] = len(population)
@@ -0,0 +1,8 @@
+import sys, os
+
+# As in test/conftest.py, put the repo root dir at the front of sys.path so
+# that the local timeprofile package is found; test/conftest.py isn't loaded
+# when running benchmarks, since they have their own pytest.ini
+app_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, app_root)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
@@ -0,0 +1,77 @@
+"""Synthetic, but realistic, fire populations for benchmarks
+
+Most fires are profiled over a single day (00:00 to 00:00 local time),
+as in daily emissions runs; wildfires are sometimes given multi-day
+activity windows, and prescribed burns sometimes have explicit ignition
+windows.  Consumption and weather inputs are drawn from broad plausible
+ranges.  Wind speeds are kept at or above FepsTimeProfiler.U_b, below
+which the smoldering adjustment, and hence smoldering fractions, are zero.
+"""
+
+import numpy as np
+
+from timeprofile.feps import FepsTimeProfiler, MoistureCategory
+
+START = np.datetime64('2019-08-10T00:00', 'us')
+ONE_HOUR = np.timedelta64(1, 'h')
+
+
+def generate_fires(n, wf_fraction=0.7, seed=0):
+    """Returns a dict of columns, keyed by FepsBatchProfiler kwargs"""
+    rng = np.random.default_rng(seed)
+    is_wf = rng.random(n) < wf_fraction
+
+    days = rng.integers(0, 30, n)
+    starts = START + days * np.timedelta64(1, 'D')
+    # most windows are a day; a quarter of wildfires' windows span 2-5 days
+    window_days = np.where(is_wf & (rng.random(n) < 0.25),
+        rng.integers(2, 6, n), 1)
+    ends = starts + window_days * 24 * ONE_HOUR
+
+    # half of rx burns have explicit ignition windows, starting 8am-noon
+    explicit = ~is_wf & (rng.random(n) < 0.5)
+    ig_starts = starts + rng.integers(8 * 60, 12 * 60, n) * np.timedelta64(1, 'm')
+    ig_ends = ig_starts + rng.integers(2 * 60, 6 * 60, n) * np.timedelta64(1, 'm')
+    nat = np.datetime64('NaT', 'us')
+
+    above = rng.lognormal(np.log(8), 0.8, n)
+    return {
+        'local_start_times': starts,
+        'local_end_times': ends,
+        'local_ignition_start_times': np.where(explicit, ig_starts, nat),
+        'local_ignition_end_times': np.where(explicit, ig_ends, nat),
+        'fire_types': np.where(is_wf, 'wf', 'rx'),
+        'duff_fuel_loads': rng.lognormal(np.log(10), 0.7, n),
+        'total_above_ground_consumptions': above,
+        'total_below_ground_consumptions': above * rng.uniform(0.05, 0.8, n),
+        'moisture_categories': rng.choice(MoistureCategory.CATEGORIES, n),
+        'relative_humidities': rng.uniform(15, 90, n),
+        'wind_speeds': rng.uniform(FepsTimeProfiler.U_b, 15, n),
+        'duff_moisture_contents': rng.uniform(20, 250, n)
+    }
+
+# FepsBatchProfiler kwargs -> FepsTimeProfiler kwargs
+FIRE_KWARGS = {
+    'local_start_times': 'local_start_time',
+    'local_end_times': 'local_end_time',
+    'local_ignition_start_times': 'local_ignition_start_time',
+    'local_ignition_end_times': 'local_ignition_end_time',
+    'fire_types': 'fire_type',
+    'duff_fuel_loads': 'duff_fuel_load',
+    'total_above_ground_consumptions': 'total_above_ground_consumption',
+    'total_below_ground_consumptions': 'total_below_ground_consumption',
+    'moisture_categories': 'moisture_category',
+    'relative_humidities': 'relative_humidity',
+    'wind_speeds': 'wind_speed',
+    'duff_moisture_contents': 'duff_moisture_content'
+}
+
+def get_fire(columns, i):
+    """Returns fire i's FepsTimeProfiler kwargs"""
+    fire = {}
+    for k, v in columns.items():
+        v = v[i]
+        if isinstance(v, np.datetime64):
+            v = None if np.isnat(v) else v.item()
+        fire[FIRE_KWARGS[k]] = v.item() if isinstance(v, np.generic) else v
+    return fire
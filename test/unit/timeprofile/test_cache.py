@@ -0,0 +1,128 @@
+import datetime
+
+from pytest import raises
+
+from timeprofile.cache import LRUCache, ProfilerCache
+from timeprofile.feps import FepsParameters, FepsTimeProfiler, MoistureCategory
+from timeprofile.static import HourlyFractionSet, StaticTimeProfiler
+
+
+class TestLRUCache(object):
+
+    def test_max_entries(self):
+        cache = LRUCache(max_entries=2)
+        assert cache.get('a', lambda: 1) == 1
+        assert cache.get('b', lambda: 2) == 2
+        assert cache.get('a', lambda: None) == 1  # hit; 'b' is now LRU
+        assert cache.get('c', lambda: 3) == 3  # evicts 'b'
+        assert cache.get('b', lambda: 4) == 4  # evicts 'a'
+        stats = cache.get_stats()
+        assert (stats.hits, stats.misses, stats.evictions, stats.entries) == (1, 4, 2, 2)
+
+        cache.configure(max_entries=1)
+        assert cache.get_stats().entries == 1
+        assert cache.get_stats().evictions == 3
+
+        cache.clear()
+        assert cache.get_stats()[:5] == (0, 0, 0, 0, 0)
+
+    def test_max_bytes(self):
+        class SizedCache(LRUCache):
+            def _sizeof(self, value):
+                return len(value)
+
+        cache = SizedCache(max_entries=None, max_bytes=10)
+        cache.get('a', lambda: 'x' * 6)
+        cache.get('b', lambda: 'x' * 4)
+        assert cache.get_stats().bytes == 10
+        cache.get('c', lambda: 'x' * 3)
+        stats = cache.get_stats()
+        assert (stats.entries, stats.bytes, stats.evictions) == (2, 7, 1)
+
+
+class TestProfilerCache(object):
+
+    START = datetime.datetime(2015, 1, 1, 0)
+    END = datetime.datetime(2015, 1, 2, 0)
+
+    def test_feps(self):
+        cache = ProfilerCache()
+        p1 = cache.get_profiler('feps', self.START, self.END)
+        p2 = cache.get_profiler('feps', self.START, self.END, fire_type='RX',
+            relative_humidity=65, moisture_category=MoistureCategory('moderate'))
+        p3 = cache.get_profiler(FepsTimeProfiler, self.START,
+            local_end_time=self.END, duff_moisture_content=130.0)
+        assert p1 is p2 is p3
+        p4 = cache.get_profiler('feps', self.START, self.END, fire_type='wf')
+        assert p4 is not p1
+        stats = cache.get_stats()
+        assert (stats.hits, stats.misses, stats.entries) == (2, 2, 2)
+        assert stats.bytes > 0
+
+        expected = FepsTimeProfiler(self.START, self.END).hourly_fractions
+        assert {k: list(v) for k, v in p1.hourly_fractions.items()} == expected
+
+    def test_feps_hourly_meteorology(self):
+        cache = ProfilerCache()
+        p1 = cache.get_profiler('feps', self.START, self.END,
+            relative_humidity=[50] * 24)
+        p2 = cache.get_profiler('feps', self.START, self.END,
+            relative_humidity=tuple([50.0] * 24))
+        p3 = cache.get_profiler('feps', self.START, self.END,
+            relative_humidity=[50] * 24, relative_humidity_lag=4)
+        assert p1 is p2 and p3 is not p1
+        assert cache.get_stats().entries == 2
+
+    def test_feps_parameters(self):
+        cache = ProfilerCache()
+        p1 = cache.get_profiler('feps', self.START, self.END)
+        p2 = cache.get_profiler('feps', self.START, self.END,
+            parameters=FepsParameters())
+        p3 = cache.get_profiler('feps', self.START, self.END,
+            parameters=FepsParameters(K_RDR=6))
+        assert p1 is p2 and p3 is not p1
+
+    def test_static(self):
+        cache = ProfilerCache()
+        hourly_fractions = {
+            k: list(StaticTimeProfiler.DEFAULT_DAILY_HOURLY_FRACTIONS[k])
+            for k in StaticTimeProfiler.FIELDS
+        }
+        p1 = cache.get_profiler('static', self.START, self.END)
+        p2 = cache.get_profiler('static', self.START, self.END,
+            hourly_fractions=StaticTimeProfiler.DEFAULT_DAILY_HOURLY_FRACTIONS)
+        p3 = cache.get_profiler('static', self.START, self.END,
+            hourly_fractions=hourly_fractions)
+        p4 = cache.get_profiler('static', self.START, self.END,
+            hourly_fractions=dict(hourly_fractions))
+        p5 = cache.get_profiler('static', self.START, self.END,
+            hourly_fractions=HourlyFractionSet(hourly_fractions))
+        assert p1 is p2
+        assert p3 is p4 and p3 is not p1
+        assert p5 is p3
+        assert cache.get_stats().entries == 2
+
+    def test_results_are_read_only(self):
+        profiler = ProfilerCache().get_profiler('feps', self.START, self.END)
+        with raises(TypeError):
+            profiler.hourly_fractions['flaming'] = []
+        with raises(TypeError):
+            profiler.hourly_fractions['flaming'][0] = 1.0
+
+    def test_dtype(self):
+        cache = ProfilerCache()
+        p1 = cache.get_profiler('feps', self.START, self.END)
+        p2 = cache.get_profiler('feps', self.START, self.END, dtype='float32')
+        assert p1 is not p2
+        assert cache.get_stats().entries == 2
+        assert p2.hourly_fractions.computed == FepsTimeProfiler.FIELDS
+        with raises(ValueError):
+            p2.hourly_fractions.get_array('flaming')[0] = 1.0
+
+    def test_invalid(self):
+        cache = ProfilerCache()
+        with raises(ValueError) as e_info:
+            cache.get_profiler('foo', self.START, self.END)
+        assert e_info.value.args[0] == "Invalid model: 'foo'.  Valid: 'feps', 'static'"
+        with raises(TypeError):
+            cache.get_profiler('static', self.START, self.END, fire_type='rx')
@@ -0,0 +1,113 @@
+import csv
+import datetime
+import io
+import json
+
+from pytest import mark, raises
+
+from timeprofile import cli, parallel
+from timeprofile.cli import main, parse_record
+from timeprofile.feps import FepsTimeProfiler
+from timeprofile.static import StaticTimeProfiler
+
+FIRES_CSV = """id,local_start_time,local_end_time,fire_type,relative_humidity,other
+a,2015-01-01T00:00:00,2015-01-01T03:00:00,rx,,foo
+b,2015-01-01T06:30:00,2015-01-01T09:15:00,wf,50,bar
+"""
+
+FIRES = [
+    ('a', datetime.datetime(2015, 1, 1, 0), datetime.datetime(2015, 1, 1, 3),
+        {'fire_type': 'rx'}),
+    ('b', datetime.datetime(2015, 1, 1, 6, 30), datetime.datetime(2015, 1, 1, 9, 15),
+        {'fire_type': 'wf', 'relative_humidity': 50.0})
+]
+
+
+class TestMain(object):
+
+    def test_csv_hourly(self, tmpdir):
+        input_file = tmpdir.join('fires.csv')
+        input_file.write(FIRES_CSV)
+        output_file = tmpdir.join('out.csv')
+        main(['-i', str(input_file), '-o', str(output_file), '-b', '1'])
+
+        rows = list(csv.DictReader(io.StringIO(output_file.read())))
+        assert len(rows) == 7
+        assert [r['id'] for r in rows] == ['a'] * 3 + ['b'] * 4
+        assert rows[3]['hour'] == '2015-01-01T06:00:00'
+        i = 0
+        for fire_id, s, e, kwargs in FIRES:
+            expected = FepsTimeProfiler(s, e, **kwargs).hourly_fractions
+            for j in range(len(expected['flaming'])):
+                for p in FepsTimeProfiler.FIELDS:
+                    assert float(rows[i][p]) == expected[p][j]
+                i += 1
+
+    def test_jsonl_fire(self, tmpdir, monkeypatch, capsys):
+        records = [{'local_start_time': s.isoformat(),
+            'local_end_time': e.isoformat()} for _, s, e, _ in FIRES]
+        monkeypatch.setattr('sys.stdin',
+            io.StringIO('\n'.join(json.dumps(r) for r in records) + '\n'))
+        main(['--input-format', 'jsonl', '--output-format', 'jsonl',
+            '-l', 'fire', '-m', 'static'])
+
+        rows = [json.loads(l) for l in capsys.readouterr().out.splitlines()]
+        assert [r['id'] for r in rows] == [0, 1]
+        assert [r['num_hours'] for r in rows] == [3, 4]
+        for row, (_, s, e, _) in zip(rows, FIRES):
+            assert row['start_hour'] == s.replace(minute=0).isoformat()
+            expected = StaticTimeProfiler(s, e).hourly_fractions
+            for p in StaticTimeProfiler.FIELDS:
+                assert row[p] == expected[p]
+
+    def test_invalid_record(self, monkeypatch, caplog):
+        monkeypatch.setattr('sys.stdin', io.StringIO(
+            "local_start_time,local_end_time\n2015-01-01T03:00:00,foo\n"))
+        with raises(SystemExit) as e_info:
+            main([])
+        assert e_info.value.code == 1
+        assert "Record 0: Invalid isoformat string: 'foo'" in caplog.text
+
+    @mark.parametrize('workers', ['1', '2'])
+    def test_failing_records_are_skipped(self, tmpdir, caplog, monkeypatch,
+            workers):
+        # an empty default ignition window, and a wind speed below U_b,
+        # both of which divide by zero
+        input_file = tmpdir.join('fires.csv')
+        input_file.write("id,local_start_time,local_end_time,wind_speed\n"
+            "a,2015-01-01T00:00:00,2015-01-01T03:00:00,\n"
+            "b,2020-01-02T08:17:00,2020-01-02T08:55:00,\n"
+            "c,2015-01-01T00:00:00,2015-01-01T03:00:00,2\n"
+            "d,2015-01-01T06:30:00,2015-01-01T09:15:00,\n")
+        output_file = tmpdir.join('out.csv')
+
+        # each batch is profiled once, with the given number of workers
+        calls = []
+        def profile_many(fires, **kwargs):
+            calls.append((len(fires), kwargs['workers']))
+            return parallel.profile_many(fires, **kwargs)
+        monkeypatch.setattr(cli, 'profile_many', profile_many)
+
+        with raises(SystemExit) as e_info:
+            main(['-i', str(input_file), '-o', str(output_file), '-b', '3',
+                '-w', workers])
+        assert e_info.value.code == 1
+        assert "Record 1: float division by zero" in caplog.text
+        assert "Record 2: float division by zero" in caplog.text
+        assert "Skipped 2 invalid record(s)" in caplog.text
+        assert calls == [(3, int(workers)), (1, int(workers))]
+
+        rows = list(csv.DictReader(io.StringIO(output_file.read())))
+        assert [r['id'] for r in rows] == ['a'] * 3 + ['d'] * 4
+
+
+class TestParseRecord(object):
+
+    def test_hourly_meteorology(self):
+        kwargs = parse_record({'local_start_time': '2015-01-01T00:00:00',
+            'local_end_time': '2015-01-01T03:00:00',
+            'relative_humidity': '[40, 50, 60]', 'wind_speed': '5',
+            'relative_humidity_lag': '4'}, 'feps')
+        assert kwargs['relative_humidity'] == [40.0, 50.0, 60.0]
+        assert kwargs['wind_speed'] == 5.0
+        assert kwargs['relative_humidity_lag'] == 4
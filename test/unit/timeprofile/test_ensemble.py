@@ -0,0 +1,85 @@
+import datetime
+
+import numpy as np
+from numpy.testing import assert_allclose
+from pytest import raises
+
+from timeprofile.ensemble import FepsEnsemble
+from timeprofile.feps import FepsParameters, FepsTimeProfiler, MoistureCategory
+
+
+class TestFepsEnsemble(object):
+
+    S = datetime.datetime(2015, 1, 1, 0, 30)
+    E = datetime.datetime(2015, 1, 3, 0)
+
+    GRID = {
+        'fire_type': ['rx', 'wf'],
+        'moisture_category': MoistureCategory.CATEGORIES,
+        'relative_humidity': [30, 70],
+        'wind_speed': [5, 12],
+        'duff_moisture_content': [40, 130, 200]
+    }
+
+    def _assert_matches_profilers(self, ensemble, **kwargs):
+        for i, member in enumerate(ensemble.members):
+            expected = FepsTimeProfiler(self.S, self.E, engine='numpy',
+                **dict(kwargs, **member)).hourly_fractions
+            actual = ensemble.get_hourly_fractions(i)
+            for k in FepsTimeProfiler.FIELDS:
+                assert_allclose(actual[k], expected[k], rtol=1e-12, atol=1e-300)
+
+    def test_matches_per_member_profilers(self):
+        ensemble = FepsEnsemble(self.S, self.E, total_above_ground_consumption=5,
+            **self.GRID)
+        assert ensemble.shape == (2, 6, 2, 2, 3)
+        assert ensemble.num_members == 144
+        assert ensemble.hourly_fractions.shape == (144, 4, 48)
+        assert ensemble.members[1] == {'fire_type': 'rx',
+            'moisture_category': 'verydry', 'relative_humidity': 30,
+            'wind_speed': 5, 'duff_moisture_content': 130}
+        assert ensemble.start_hour == datetime.datetime(2015, 1, 1, 0)
+        self._assert_matches_profilers(ensemble,
+            total_above_ground_consumption=5)
+
+        # indexed by grid position
+        by_position = ensemble.hourly_fractions.reshape(
+            ensemble.shape + (4, 48))
+        assert (by_position[1, 2, 0, 1, 2]
+            == ensemble.hourly_fractions[72 + 24 + 3 + 2]).all()
+
+    def test_ignition_times_and_parameters(self):
+        ensemble = FepsEnsemble(self.S, self.E,
+            parameters=FepsParameters(K_RDR=6),
+            local_ignition_start_time=[None, datetime.datetime(2015, 1, 1, 14)],
+            fire_type=('rx', 'wf'), duff_moisture_content=range(40, 100, 20))
+        assert ensemble.num_members == 12
+        self._assert_matches_profilers(ensemble,
+            parameters=FepsParameters(K_RDR=6))
+
+    def test_zero_coefficients(self):
+        # wind speeds below U_b zero out the smoldering adjustment
+        ensemble = FepsEnsemble(self.S, self.E, wind_speed=[1, 5])
+        assert np.isnan(ensemble.hourly_fractions[0, 2:]).all()
+        assert not np.isnan(ensemble.hourly_fractions[0, :2]).any()
+        assert not np.isnan(ensemble.hourly_fractions[1]).any()
+
+    def test_no_grid(self):
+        ensemble = FepsEnsemble(self.S, self.E, fire_type='wf', dtype='float32')
+        assert ensemble.shape == ()
+        assert ensemble.members == [{}]
+        assert ensemble.hourly_fractions.dtype == np.float32
+        expected = FepsTimeProfiler(self.S, self.E, fire_type='wf').hourly_fractions
+        for k in FepsTimeProfiler.FIELDS:
+            assert_allclose(ensemble.get_hourly_fractions(0)[k], expected[k],
+                rtol=1e-6, atol=1e-30)
+
+    def test_invalid(self):
+        with raises(ValueError) as e_info:
+            FepsEnsemble(self.S, self.E, foo=[1, 2])
+        assert e_info.value.args[0] == "Invalid ensemble input(s): foo"
+        with raises(ValueError) as e_info:
+            FepsEnsemble(self.S, self.E, fire_type=['rx', 'foo'])
+        with raises(ValueError) as e_info:
+            FepsEnsemble(self.S, self.E, moisture_category=['dry', 'foo'])
+        assert e_info.value.args[0] == "Invalid moisture category: foo"
@@ -2,16 +2,22 @@ __author__      = "Joel Dubowy"
 
 #import copy
 import datetime
+import json
 
-from numpy.testing import assert_approx_equal
+import numpy as np
+from numpy.testing import assert_approx_equal, assert_allclose
 from pytest import raises
 
 from timeprofile.feps import (
     MoistureCategory,
+    FepsParameters,
     FepsTimeProfiler,
+    FepsBatchProfiler,
     FireType,
+    RecurrenceState,
     InvalidStartEndTimesError
 )
+from timeprofile.fractions import HourlyFractions
 
 def assert_approximately_equal(expected, actual):
     if isinstance(expected, dict) and isinstance(actual, dict):
@@ -244,3 +250,700 @@ class TestFepsTimeProfiler_Rx(object):
     ## Valid Cases - Ignition only end specified
 
     # TDOO: implement
+
+
+class TestFepsTimeProfiler_GetIgnitionTimes(object):
+
+    def test_defaults(self):
+        s = datetime.datetime(2015, 1, 1, 0)
+        e = datetime.datetime(2015, 1, 1, 6)
+        assert FepsTimeProfiler.get_ignition_times(s, e) == (
+            datetime.datetime(2015, 1, 1, 3), e)
+        ig_s = datetime.datetime(2015, 1, 1, 1)
+        assert FepsTimeProfiler.get_ignition_times(s, e, ig_s) == (
+            ig_s, datetime.datetime(2015, 1, 1, 4))
+
+    def test_invalid(self):
+        s = datetime.datetime(2015, 1, 1, 12)
+        with raises(InvalidStartEndTimesError) as e_info:
+            FepsTimeProfiler.get_ignition_times(s, s)
+
+
+class TestFepsTimeProfiler_Lazy(object):
+
+    S = datetime.datetime(2015, 1, 1, 0)
+    E = datetime.datetime(2015, 1, 2, 0)
+
+    def test_computes_phases_on_first_access(self):
+        profiler = FepsTimeProfiler(self.S, self.E)
+        hourly_fractions = profiler.hourly_fractions
+        assert hourly_fractions.computed == []
+        assert not hasattr(profiler, '_area_fractions')
+
+        flaming = hourly_fractions['flaming']
+        assert hourly_fractions.computed == ['flaming']
+        assert hasattr(profiler, '_c_f')
+        assert not hasattr(profiler, '_smoldering_adjustment')
+        assert hourly_fractions['flaming'] is flaming
+
+        hourly_fractions['residual']
+        assert hourly_fractions.computed == ['flaming', 'residual']
+        assert hasattr(profiler, '_smoldering_adjustment')
+
+    def test_matches_eager(self):
+        for engine in FepsTimeProfiler.ENGINES:
+            eager = FepsTimeProfiler(self.S, self.E, engine=engine,
+                eager=True).hourly_fractions
+            assert isinstance(eager, dict)
+            lazy = FepsTimeProfiler(self.S, self.E, engine=engine).hourly_fractions
+            for k in ('residual', 'smoldering'):
+                assert lazy[k] == eager[k]
+            assert lazy == eager
+            assert list(lazy) == FepsTimeProfiler.FIELDS
+            assert len(lazy) == 4
+            assert dict(lazy) == eager
+
+    def test_invalid_phase(self):
+        profiler = FepsTimeProfiler(self.S, self.E)
+        assert 'foo' not in profiler.hourly_fractions
+        with raises(KeyError) as e_info:
+            profiler.hourly_fractions['foo']
+
+
+class TestFepsTimeProfiler_Dtype(object):
+
+    S = datetime.datetime(2015, 1, 1, 0)
+    E = datetime.datetime(2015, 1, 3, 12, 30)
+
+    def test_matches_default(self):
+        expected = FepsTimeProfiler(self.S, self.E, eager=True).hourly_fractions
+        for engine in FepsTimeProfiler.ENGINES:
+            for eager in (False, True):
+                hourly_fractions = FepsTimeProfiler(self.S, self.E,
+                    engine=engine, eager=eager, dtype='float32').hourly_fractions
+                assert isinstance(hourly_fractions, HourlyFractions)
+                assert hourly_fractions.dtype == 'float32'
+                assert hourly_fractions.num_hours == len(expected['flaming'])
+                for k in FepsTimeProfiler.FIELDS:
+                    assert_allclose(hourly_fractions.get_array(k),
+                        expected[k], rtol=1e-6, atol=1e-9)
+
+    def test_lazy(self):
+        profiler = FepsTimeProfiler(self.S, self.E, dtype='float64')
+        assert profiler.hourly_fractions.computed == []
+        profiler.hourly_fractions['flaming']
+        assert profiler.hourly_fractions.computed == ['flaming']
+        assert not hasattr(profiler, '_smoldering_adjustment')
+
+    def test_no_instance_dict(self):
+        profiler = FepsTimeProfiler(self.S, self.E)
+        assert not hasattr(profiler, '__dict__')
+
+    def test_invalid_dtype(self):
+        with raises(ValueError) as e_info:
+            FepsTimeProfiler(self.S, self.E, dtype='int8')
+        assert e_info.value.args[0] == (
+            "Invalid dtype: 'int8'.  Valid: 'float64', 'float32'")
+
+
+class TestFepsTimeProfiler_Sparse(object):
+
+    S = datetime.datetime(2015, 1, 1, 0)
+    E = datetime.datetime(2015, 1, 2, 0)
+
+    def test_sparsify(self):
+        for kwargs in ({}, {'dtype': 'float32'}, {'engine': 'numpy'}):
+            profiler = FepsTimeProfiler(self.S, self.E, **kwargs)
+            expected = {k: profiler.hourly_fractions[k]
+                for k in FepsTimeProfiler.FIELDS}
+            hourly_fractions = profiler.sparsify(1e-12)
+            assert profiler.hourly_fractions is hourly_fractions
+            # area fractions are only non-zero during ignition (9am - noon)
+            offset, values = hourly_fractions.get_sparse('area_fraction')
+            assert (offset, len(values)) == (9, 3)
+            assert hourly_fractions.get_sparse('flaming')[0] == 9
+            assert len(hourly_fractions.get_sparse('flaming')[1]) < 15
+            assert 0 < hourly_fractions.trimmed['flaming'] < 1e-11
+            rtol = 1e-6 if kwargs.get('dtype') else 1e-9
+            for k in FepsTimeProfiler.FIELDS:
+                assert_allclose(hourly_fractions[k], expected[k], rtol=rtol,
+                    atol=1e-12)
+
+    def test_read_only(self):
+        profiler = FepsTimeProfiler(self.S, self.E)
+        profiler.sparsify()
+        for f in (profiler.sparsify, lambda: profiler.extend(self.E
+                + datetime.timedelta(hours=1))):
+            with raises(ValueError) as e_info:
+                f()
+            assert "read-only profiler" in e_info.value.args[0]
+
+
+class TestFepsTimeProfiler_IterHourlyFractions(object):
+
+    WINDOWS = [
+        (datetime.datetime(2015, 1, 1, 0), datetime.datetime(2015, 1, 2, 0)),
+        (datetime.datetime(2015, 1, 1, 6, 30), datetime.datetime(2015, 1, 1, 9, 15)),
+        (datetime.datetime(2015, 1, 1, 9, 10), datetime.datetime(2015, 1, 20, 9, 50))
+    ]
+
+    def test_tuples(self):
+        for s, e in self.WINDOWS:
+            for fire_type in FireType.VALID_FIRE_TYPES:
+                profiler = FepsTimeProfiler(s, e, fire_type=fire_type)
+                rows = list(profiler.iter_hourly_fractions())
+                assert not profiler.hourly_fractions.computed
+                expected = profiler.hourly_fractions
+                assert len(rows) == len(expected['flaming'])
+                assert rows[0][0] == s.replace(minute=0)
+                assert rows[1][0] - rows[0][0] == datetime.timedelta(hours=1)
+                for i, k in enumerate(FepsTimeProfiler.FIELDS):
+                    assert_allclose([r[i + 1] for r in rows], expected[k],
+                        rtol=1e-9, atol=1e-15)
+
+    def test_chunks(self):
+        s, e = self.WINDOWS[2]
+        profiler = FepsTimeProfiler(s, e, fire_type='wf')
+        chunks = list(profiler.iter_hourly_fractions(chunk_size=100))
+        assert [len(c[0]) for c in chunks] == [100, 100, 100, 100, 57]
+        assert chunks[1][0][0] == np.datetime64('2015-01-05T13', 'h')
+        for i, k in enumerate(FepsTimeProfiler.FIELDS):
+            assert_allclose(np.concatenate([c[i + 1] for c in chunks]),
+                profiler.hourly_fractions[k], rtol=1e-9, atol=1e-15)
+
+    def test_ignition_outside_window(self):
+        for s, e, kwargs in [
+                # default ignition end runs past the end of the window
+                (datetime.datetime(2024, 3, 9, 5, 26),
+                    datetime.datetime(2024, 3, 9, 6, 42),
+                    {'local_ignition_start_time':
+                        datetime.datetime(2024, 3, 9, 5, 59, 43)}),
+                # default ignition start is before the start of the window
+                (datetime.datetime(2024, 3, 9, 5),
+                    datetime.datetime(2024, 3, 9, 12),
+                    {'local_ignition_end_time':
+                        datetime.datetime(2024, 3, 9, 6)})]:
+            for fire_type in FireType.VALID_FIRE_TYPES:
+                profiler = FepsTimeProfiler(s, e, fire_type=fire_type,
+                    **kwargs)
+                rows = list(profiler.iter_hourly_fractions())
+                expected = profiler.hourly_fractions
+                for i, k in enumerate(FepsTimeProfiler.FIELDS):
+                    assert_allclose([r[i + 1] for r in rows], expected[k],
+                        rtol=1e-9, atol=1e-15)
+
+    def test_invalid_chunk_size(self):
+        s, e = self.WINDOWS[0]
+        with raises(ValueError) as e_info:
+            FepsTimeProfiler(s, e).iter_hourly_fractions(chunk_size=0)
+        assert e_info.value.args[0] == "Invalid chunk size: 0"
+
+
+class TestFepsTimeProfiler_Extend(object):
+
+    S = datetime.datetime(2015, 1, 1, 0, 30)
+    E = datetime.datetime(2015, 1, 2, 0)
+    NEW_E = datetime.datetime(2015, 1, 4, 12, 15)
+
+    def _rebuild(self, profiler, **kwargs):
+        return FepsTimeProfiler(self.S, self.NEW_E,
+            local_ignition_start_time=profiler.ignition_start,
+            local_ignition_end_time=profiler.ignition_end,
+            **kwargs).hourly_fractions
+
+    def test_matches_rebuilt_profiler(self):
+        for kwargs in ({}, {'engine': 'numpy'}, {'eager': True},
+                {'dtype': 'float64'}, {'fire_type': 'wf', 'eager': True,
+                'engine': 'numpy', 'duff_moisture_content': 40}):
+            profiler = FepsTimeProfiler(self.S, self.E, **kwargs)
+            profiler.hourly_fractions['flaming']
+            profiler.extend(datetime.datetime(2015, 1, 3, 0))
+            profiler.extend(self.NEW_E)
+            assert profiler.end == self.NEW_E
+            expected = self._rebuild(profiler, **kwargs)
+            assert type(profiler.hourly_fractions) == type(expected)
+            for k in FepsTimeProfiler.FIELDS:
+                assert len(profiler.hourly_fractions[k]) == 85
+                assert_allclose(profiler.hourly_fractions[k], expected[k],
+                    rtol=1e-12, atol=1e-16)
+
+    def test_ignition_past_end(self):
+        # the default three hour ignition window runs past the original end
+        s = datetime.datetime(2015, 1, 1, 5)
+        ig_s = datetime.datetime(2015, 1, 1, 6)
+        new_e = datetime.datetime(2015, 1, 1, 13)
+        for kwargs in ({}, {'engine': 'numpy'}, {'eager': True},
+                {'dtype': 'float64'}, {'dtype': 'float32', 'eager': True},
+                {'fire_type': 'wf', 'eager': True, 'engine': 'numpy'}):
+            profiler = FepsTimeProfiler(s, datetime.datetime(2015, 1, 1, 7),
+                local_ignition_start_time=ig_s, **kwargs)
+            profiler.hourly_fractions['flaming']
+            profiler.extend(new_e)
+            expected = FepsTimeProfiler(s, new_e,
+                local_ignition_start_time=ig_s, **kwargs).hourly_fractions
+            assert type(profiler.hourly_fractions) == type(expected)
+            if 'fire_type' not in kwargs:
+                assert_allclose(profiler.hourly_fractions['area_fraction'][:5],
+                    [0, 1 / 3, 1 / 3, 1 / 3, 0], rtol=1e-6)
+            for k in FepsTimeProfiler.FIELDS:
+                assert_allclose(profiler.hourly_fractions[k], expected[k],
+                    rtol=1e-12, atol=1e-16)
+
+    def test_lazy_not_yet_computed(self):
+        rh = list(np.linspace(30, 80, 24))
+        profiler = FepsTimeProfiler(self.S, self.E, relative_humidity=rh,
+            dtype='float64')
+        profiler.extend(self.NEW_E)
+        assert profiler.hourly_fractions.computed == []
+        expected = self._rebuild(profiler, relative_humidity=rh + [80] * 61)
+        for k in FepsTimeProfiler.FIELDS:
+            assert_allclose(profiler.hourly_fractions[k], expected[k],
+                rtol=1e-12, atol=1e-16)
+
+    def test_recurrence_state(self):
+        profiler = FepsTimeProfiler(self.S, self.E)
+        state = profiler.get_recurrence_state()
+        assert state.num_hours == 24
+        assert_allclose(state.totals, [1, 1, 1])
+        assert state.last_values == tuple(profiler.hourly_fractions[k][-1]
+            for k in FepsTimeProfiler.FIELDS[1:])
+
+        # serializable, and enough to extend a saved profile
+        state = RecurrenceState(*json.loads(json.dumps(state)))
+        values, new_state = state.advance(61)
+        assert new_state.num_hours == 85
+        expected = self._rebuild(profiler)
+        for i, k in enumerate(FepsTimeProfiler.FIELDS[1:]):
+            assert_allclose(values[i] / new_state.totals[i], expected[k][24:],
+                rtol=1e-12, atol=1e-16)
+            assert_allclose(np.array(profiler.hourly_fractions[k])
+                * state.totals[i] / new_state.totals[i], expected[k][:24],
+                rtol=1e-12, atol=1e-16)
+
+    def test_invalid(self):
+        profiler = FepsTimeProfiler(self.S, self.E)
+        with raises(ValueError) as e_info:
+            profiler.extend(self.E)
+        assert e_info.value.args[0] == ("New end time - 2015-01-02 00:00:00 "
+            "- isn't after end time - 2015-01-02 00:00:00")
+
+        profiler._freeze()
+        with raises(ValueError) as e_info:
+            profiler.extend(self.NEW_E)
+        assert e_info.value.args[0] == "Can't extend a read-only profiler"
+
+
+class TestFepsTimeProfiler_Adaptive(object):
+
+    IG_S = datetime.datetime(2015, 1, 1, 9, 30)
+    IG_E = datetime.datetime(2015, 1, 1, 13)
+
+    def test_tails_below_tolerance(self):
+        for tolerance in (1e-3, 1e-9):
+            for kwargs in ({}, {'fire_type': 'wf', 'duff_moisture_content': 40},
+                    {'duff_moisture_content': 250}):
+                profiler = FepsTimeProfiler.from_ignition(self.IG_S, self.IG_E,
+                    tolerance=tolerance, **kwargs)
+                assert profiler.start == self.IG_S
+                assert profiler.end == FepsTimeProfiler.get_adaptive_end_time(
+                    self.IG_S, self.IG_E, tolerance=tolerance,
+                    fire_type=kwargs.get('fire_type', 'rx'),
+                    duff_moisture_content=kwargs.get('duff_moisture_content'))
+                n = len(profiler.hourly_fractions['residual'])
+
+                # compare with a window long enough to hold the whole tails
+                full = FepsTimeProfiler(self.IG_S,
+                    profiler.end + datetime.timedelta(days=40),
+                    self.IG_S, self.IG_E, **kwargs).hourly_fractions
+                tails = [sum(full[k][n:]) for k in FepsTimeProfiler.FIELDS[1:]]
+                assert max(tails) <= tolerance
+                # and the window is no longer than it needs to be
+                tails = [sum(full[k][n - 1:]) for k in FepsTimeProfiler.FIELDS[1:]]
+                assert max(tails) > tolerance
+
+    def test_start_time(self):
+        profiler = FepsTimeProfiler.from_ignition(self.IG_S, self.IG_E,
+            local_start_time=datetime.datetime(2015, 1, 1, 0))
+        assert profiler.start == datetime.datetime(2015, 1, 1, 0)
+        assert profiler.end == datetime.datetime(2015, 1, 5, 12)
+        assert profiler.ignition_start == self.IG_S
+
+    def test_invalid(self):
+        with raises(ValueError) as e_info:
+            FepsTimeProfiler.from_ignition(self.IG_S, self.IG_E, tolerance=0)
+        assert e_info.value.args[0] == "Invalid tolerance: 0"
+        with raises(InvalidStartEndTimesError):
+            FepsTimeProfiler.from_ignition(self.IG_E, self.IG_S)
+        with raises(ValueError):
+            FepsTimeProfiler.from_ignition(self.IG_S, self.IG_E,
+                local_start_time=datetime.datetime(2015, 1, 1, 10))
+
+
+class TestFepsTimeProfiler_NumpyEngine(object):
+
+    WINDOWS = [
+        (datetime.datetime(2015, 1, 1, 0), datetime.datetime(2015, 1, 2, 0), {}),
+        (datetime.datetime(2015, 1, 1, 9, 30), datetime.datetime(2015, 1, 1, 12),
+            {'fire_type': FireType.WF}),
+        (datetime.datetime(2015, 1, 1, 6, 30), datetime.datetime(2015, 1, 1, 9, 15), {}),
+        # long enough to span several blocks in the fused kernel
+        (datetime.datetime(2015, 1, 1, 0, 30), datetime.datetime(2015, 3, 1, 0),
+            {'local_ignition_start_time': datetime.datetime(2015, 1, 1, 10),
+            'local_ignition_end_time': datetime.datetime(2015, 1, 5, 14),
+            'duff_moisture_content': 40})
+    ]
+
+    def test_matches_python_engine(self):
+        for s, e, kwargs in self.WINDOWS:
+            expected = FepsTimeProfiler(s, e, **kwargs).hourly_fractions
+            actual = FepsTimeProfiler(s, e, engine='numpy',
+                **kwargs).hourly_fractions
+            assert set(actual) == set(expected)
+            for k in expected:
+                assert isinstance(actual[k], list)
+                assert_allclose(actual[k], expected[k], rtol=1e-11, atol=1e-300)
+
+    def test_zero_mass(self):
+        # the default ignition window starts at 9am, after the window's
+        # only hour, and a wind speed below U_b has no smoldering
+        for s, e, kwargs in [
+                (datetime.datetime(2020, 1, 2, 8, 17),
+                    datetime.datetime(2020, 1, 2, 8, 55), {}),
+                (datetime.datetime(2015, 1, 1, 0),
+                    datetime.datetime(2015, 1, 1, 3), {'wind_speed': 2})]:
+            for engine in FepsTimeProfiler.ENGINES:
+                for eager in (True, False):
+                    with raises(ZeroDivisionError):
+                        dict(FepsTimeProfiler(s, e, engine=engine,
+                            eager=eager, **kwargs).hourly_fractions)
+            with raises(ZeroDivisionError):
+                list(FepsTimeProfiler(s, e, **kwargs).iter_hourly_fractions())
+
+    def test_invalid_engine(self):
+        with raises(ValueError) as e_info:
+            FepsTimeProfiler(datetime.datetime(2015, 1, 1, 0),
+                datetime.datetime(2015, 1, 2, 0), engine='foo')
+        assert e_info.value.args[0] == "Invalid engine: 'foo'.  Valid: 'python', 'numpy'"
+
+
+class TestFepsTimeProfiler_HourlyMeteorology(object):
+
+    S = datetime.datetime(2015, 1, 1, 0, 30)
+    E = datetime.datetime(2015, 1, 3, 0)
+    N = 48
+    RH = list(np.linspace(20, 90, N))
+    WS = list(np.linspace(2, 20, N))
+
+    def test_constant_series_match_scalars(self):
+        for engine in FepsTimeProfiler.ENGINES:
+            expected = FepsTimeProfiler(self.S, self.E, relative_humidity=30,
+                wind_speed=12, engine=engine).hourly_fractions
+            actual = FepsTimeProfiler(self.S, self.E,
+                relative_humidity=[30] * self.N, wind_speed=12,
+                engine=engine).hourly_fractions
+            for k in FepsTimeProfiler.FIELDS:
+                assert_allclose(actual[k], expected[k], rtol=1e-12, atol=1e-300)
+
+    def test_engines_and_streaming_agree(self):
+        kwargs = dict(relative_humidity=self.RH, wind_speed=self.WS,
+            relative_humidity_lag=4)
+        expected = FepsTimeProfiler(self.S, self.E, **kwargs).hourly_fractions
+        profiler = FepsTimeProfiler(self.S, self.E, engine='numpy', **kwargs)
+        chunks = list(profiler.iter_hourly_fractions(chunk_size=10))
+        for i, k in enumerate(FepsTimeProfiler.FIELDS):
+            assert_allclose(profiler.hourly_fractions[k], expected[k],
+                rtol=1e-11, atol=1e-300)
+            assert_allclose(np.concatenate([c[i + 1] for c in chunks]),
+                expected[k], rtol=1e-9, atol=1e-15)
+        # unlike scalar inputs, hourly values change the profile's shape
+        scalar = FepsTimeProfiler(self.S, self.E).hourly_fractions
+        assert not np.allclose(expected['smoldering'], scalar['smoldering'])
+
+    def test_lag(self):
+        # with history, hour i uses value i; without it, hour i uses
+        # value i - lag, and the first value for hours before that
+        with_history = FepsTimeProfiler(self.S, self.E,
+            relative_humidity=[50] * 4 + self.RH, relative_humidity_lag=4)
+        without_history = FepsTimeProfiler(self.S, self.E,
+            relative_humidity=self.RH, relative_humidity_lag=4)
+        unlagged = FepsTimeProfiler(self.S, self.E,
+            relative_humidity=[50] * 4 + self.RH[:-4])
+        assert_allclose(with_history.hourly_fractions['residual'],
+            unlagged.hourly_fractions['residual'], rtol=1e-12, atol=1e-300)
+        assert with_history._relative_humidity[4] == self.RH[0]
+        assert list(without_history._relative_humidity[:5]) == [self.RH[0]] * 5
+
+    def test_invalid(self):
+        with raises(ValueError) as e_info:
+            FepsTimeProfiler(self.S, self.E, wind_speed=self.WS[:10])
+        assert e_info.value.args[0] == (
+            "Expected 48 hourly wind speed values; got 10")
+        with raises(ValueError) as e_info:
+            FepsTimeProfiler(self.S, self.E, relative_humidity=self.RH[:10],
+                relative_humidity_lag=4)
+        assert e_info.value.args[0] == (
+            "Expected 48 or 52 hourly relative humidity values; got 10")
+        with raises(ValueError) as e_info:
+            FepsTimeProfiler(self.S, self.E, relative_humidity=self.RH,
+                relative_humidity_lag=-1)
+        assert e_info.value.args[0] == "Invalid relative humidity lag: -1"
+
+
+class TestFepsTimeProfiler_Resolution(object):
+
+    S = datetime.datetime(2015, 1, 1, 5, 20)
+    E = datetime.datetime(2015, 1, 2, 3, 10)
+    IG_S = datetime.datetime(2015, 1, 1, 10, 7)
+    IG_E = datetime.datetime(2015, 1, 1, 13, 50)
+    FIFTEEN_MINUTES = datetime.timedelta(minutes=15)
+
+    def test_area_fractions_hourly_sums(self):
+        for fire_type in (FireType.RX, FireType.WF):
+            expected = FepsTimeProfiler(self.S, self.E, self.IG_S, self.IG_E,
+                fire_type=fire_type).hourly_fractions['area_fraction']
+            profiler = FepsTimeProfiler(self.S, self.E, self.IG_S, self.IG_E,
+                fire_type=fire_type, resolution=self.FIFTEEN_MINUTES)
+            assert profiler._first_hour() == datetime.datetime(2015, 1, 1, 5, 15)
+            # 05:15 through 03:00, padded out to 05:00 through 03:45
+            values = np.pad(profiler.hourly_fractions['area_fraction'], (1, 3))
+            assert_allclose(values.reshape(-1, 4).sum(axis=1), expected,
+                rtol=1e-12, atol=1e-15)
+
+    def test_decays_rescaled(self):
+        profiler = FepsTimeProfiler(self.S, self.E, self.IG_S, self.IG_E,
+            resolution=self.FIFTEEN_MINUTES)
+        # after ignition, each phase decays by its hourly decay^(1/4) per step
+        for k, decay in zip(FepsTimeProfiler.FIELDS[1:], profiler._get_decays()):
+            values = np.array(profiler.hourly_fractions[k][40:60])
+            assert_allclose(values[1:] / values[:-1], decay, rtol=1e-9)
+        assert_allclose(profiler._get_decays()[0] ** 4,
+            FepsTimeProfiler.DECAY_f, rtol=1e-12)
+
+    def test_engines_and_streaming_agree(self):
+        kwargs = dict(wind_speed=list(np.linspace(4, 20, 23)),
+            relative_humidity=list(np.linspace(20, 90, 23)),
+            resolution=datetime.timedelta(minutes=5))
+        expected = FepsTimeProfiler(self.S, self.E, self.IG_S, self.IG_E,
+            **kwargs).hourly_fractions
+        profiler = FepsTimeProfiler(self.S, self.E, self.IG_S, self.IG_E,
+            engine='numpy', **kwargs)
+        # hourly values apply to each of the hour's steps
+        assert list(profiler._wind_speed[:9]) == [4] * 8 + [kwargs['wind_speed'][1]]
+        chunks = list(profiler.iter_hourly_fractions(chunk_size=50))
+        assert chunks[0][0][:2].tolist() == [datetime.datetime(2015, 1, 1, 5, 20),
+            datetime.datetime(2015, 1, 1, 5, 25)]
+        for i, k in enumerate(FepsTimeProfiler.FIELDS):
+            assert_allclose(profiler.hourly_fractions[k], expected[k],
+                rtol=1e-9, atol=1e-300)
+            assert_allclose(np.concatenate([c[i + 1] for c in chunks]),
+                expected[k], rtol=1e-9, atol=1e-15)
+
+    def test_extend(self):
+        profiler = FepsTimeProfiler(self.S, self.E, self.IG_S, self.IG_E,
+            resolution=self.FIFTEEN_MINUTES)
+        profiler.extend(datetime.datetime(2015, 1, 3, 0))
+        expected = FepsTimeProfiler(self.S, datetime.datetime(2015, 1, 3, 0),
+            self.IG_S, self.IG_E, resolution=self.FIFTEEN_MINUTES).hourly_fractions
+        for k in FepsTimeProfiler.FIELDS:
+            assert_allclose(profiler.hourly_fractions[k], expected[k],
+                rtol=1e-9, atol=1e-300)
+
+
+class TestFepsParameters(object):
+
+    S = datetime.datetime(2015, 1, 1, 0)
+    E = datetime.datetime(2015, 1, 3, 0)
+
+    def test_defaults(self):
+        parameters = FepsParameters()
+        for k, v in parameters.constants.items():
+            assert getattr(FepsTimeProfiler, k) == v
+        assert parameters == FepsParameters(U_b=3)
+        assert hash(parameters) == hash(FepsParameters(U_b=3))
+
+        expected = FepsTimeProfiler(self.S, self.E).hourly_fractions
+        actual = FepsTimeProfiler(self.S, self.E,
+            parameters=parameters).hourly_fractions
+        assert actual == expected
+
+    def test_custom(self):
+        parameters = FepsParameters(B_f=10, K_RDR=6)
+        assert parameters.DECAY_f != FepsTimeProfiler.DECAY_f
+        assert parameters.DECAY_STS == FepsTimeProfiler.DECAY_STS
+        kwargs = dict(duff_moisture_content=40, parameters=parameters)
+        expected = FepsTimeProfiler(self.S, self.E, **kwargs).hourly_fractions
+        default = FepsTimeProfiler(self.S, self.E,
+            duff_moisture_content=40).hourly_fractions
+        assert not np.allclose(expected['flaming'], default['flaming'])
+        assert not np.allclose(expected['residual'], default['residual'])
+        assert_allclose(expected['smoldering'], default['smoldering'],
+            rtol=1e-12)
+
+        numpy_engine = FepsTimeProfiler(self.S, self.E, engine='numpy',
+            **kwargs).hourly_fractions
+        batch = FepsBatchProfiler([self.S], [self.E],
+            duff_moisture_contents=[40], parameters=parameters)
+        for k in FepsTimeProfiler.FIELDS:
+            assert_allclose(numpy_engine[k], expected[k], rtol=1e-11,
+                atol=1e-300)
+            assert_allclose(batch.get_hourly_fractions(0)[k], expected[k],
+                rtol=1e-12, atol=1e-300)
+
+    def test_cached_lts_constants(self):
+        parameters = FepsParameters()
+        inv_lts, decay_l = parameters.get_lts_constants(40)
+        assert parameters.get_lts_constants(40.0) is parameters.get_lts_constants(40)
+        assert_allclose(parameters.compute_lts_constants(np.array([40, 130])),
+            [[inv_lts, 100 / np.e], [decay_l, parameters.get_lts_constants(130)[1]]])
+
+    def test_read_only(self):
+        parameters = FepsParameters()
+        with raises(AttributeError):
+            parameters.U_b = 4
+
+    def test_fingerprint(self):
+        # unlike hash(), the same in every process
+        assert FepsParameters().fingerprint == 12978021826661341369
+        assert FepsParameters(U_b=3).fingerprint == FepsParameters().fingerprint
+        assert FepsParameters(U_b=4).fingerprint != FepsParameters().fingerprint
+
+    def test_invalid(self):
+        with raises(ValueError) as e_info:
+            FepsParameters(U_b=4, foo=1, bar=2)
+        assert e_info.value.args[0] == "Invalid FEPS parameter(s): bar, foo"
+
+
+class TestFepsBatchProfiler(object):
+
+    # Each fire is (args, kwargs) for FepsTimeProfiler
+    FIRES = [
+        ((datetime.datetime(2015, 1, 1, 0), datetime.datetime(2015, 1, 2, 0)),
+            {}),
+        ((datetime.datetime(2015, 1, 1, 9, 30), datetime.datetime(2015, 1, 1, 12)),
+            {'fire_type': FireType.WF}),
+        ((datetime.datetime(2015, 1, 1, 0, 30), datetime.datetime(2015, 1, 3, 0)),
+            {'local_ignition_start_time': datetime.datetime(2015, 1, 1, 10),
+            'local_ignition_end_time': datetime.datetime(2015, 1, 1, 14),
+            'relative_humidity': 30, 'wind_speed': 12,
+            'duff_moisture_content': 40, 'moisture_category': 'dry'}),
+        ((datetime.datetime(2015, 1, 1, 0), datetime.datetime(2015, 1, 1, 6)),
+            {}),
+        ((datetime.datetime(2015, 1, 1, 8), datetime.datetime(2015, 1, 1, 10, 15)),
+            {'fire_type': 'WF'}),
+        ((datetime.datetime(2015, 1, 1, 0), datetime.datetime(2015, 1, 1, 10, 30)),
+            {'local_ignition_start_time': datetime.datetime(2015, 1, 1, 2, 20),
+            'total_above_ground_consumption': 7,
+            'total_below_ground_consumption': 3, 'duff_fuel_load': 12}),
+        ((datetime.datetime(2015, 1, 1, 0), datetime.datetime(2015, 1, 1, 10, 30)),
+            {'local_ignition_end_time': datetime.datetime(2015, 1, 1, 2, 20),
+            'moisture_category': MoistureCategory('verywet')}),
+        ((datetime.datetime(2015, 1, 1, 22), datetime.datetime(2015, 1, 2, 3)),
+            {})
+    ]
+
+    COLUMNS = {
+        'local_ignition_start_time': 'local_ignition_start_times',
+        'local_ignition_end_time': 'local_ignition_end_times',
+        'fire_type': 'fire_types',
+        'duff_fuel_load': 'duff_fuel_loads',
+        'total_above_ground_consumption': 'total_above_ground_consumptions',
+        'total_below_ground_consumption': 'total_below_ground_consumptions',
+        'moisture_category': 'moisture_categories',
+        'relative_humidity': 'relative_humidities',
+        'wind_speed': 'wind_speeds',
+        'duff_moisture_content': 'duff_moisture_contents'
+    }
+
+    def _batch_kwargs(self, fires):
+        return {
+            col: [kwargs.get(k) or ('rx' if k == 'fire_type' else
+                'moderate' if k == 'moisture_category' else None)
+                for _, kwargs in fires]
+            for k, col in self.COLUMNS.items()
+        }
+
+    def test_matches_per_fire_profiler(self):
+        batch = FepsBatchProfiler(
+            [args[0] for args, _ in self.FIRES],
+            [args[1] for args, _ in self.FIRES],
+            **self._batch_kwargs(self.FIRES))
+
+        assert batch.num_fires == len(self.FIRES)
+        for k in FepsTimeProfiler.FIELDS:
+            assert batch.hourly_fractions[k].shape == (len(self.FIRES), 48)
+
+        for i, (args, kwargs) in enumerate(self.FIRES):
+            profiler = FepsTimeProfiler(*args, **kwargs)
+            assert batch.ignition_start[i].astype(object) == profiler.ignition_start
+            assert batch.ignition_end[i].astype(object) == profiler.ignition_end
+            actual = batch.get_hourly_fractions(i)
+            assert set(actual) == set(profiler.hourly_fractions)
+            for k, expected in profiler.hourly_fractions.items():
+                assert len(actual[k]) == batch.num_hours[i] == len(expected)
+                assert_allclose(actual[k], expected, rtol=1e-12, atol=1e-300)
+            # padding
+            for v in batch.hourly_fractions.values():
+                assert not v[i, batch.num_hours[i]:].any()
+
+    def test_scalar_columns(self):
+        batch = FepsBatchProfiler(
+            [datetime.datetime(2015, 1, 1, 0), datetime.datetime(2015, 1, 1, 6)],
+            datetime.datetime(2015, 1, 2, 0), fire_types='wf',
+            relative_humidities=30)
+        profiler = FepsTimeProfiler(datetime.datetime(2015, 1, 1, 6),
+            datetime.datetime(2015, 1, 2, 0), fire_type='wf',
+            relative_humidity=30)
+        assert list(batch.num_hours) == [24, 18]
+        for k, expected in profiler.hourly_fractions.items():
+            assert_allclose(batch.get_hourly_fractions(1)[k], expected,
+                rtol=1e-12, atol=1e-300)
+
+    def test_hourly_meteorology(self):
+        s = [datetime.datetime(2015, 1, 1, 0), datetime.datetime(2015, 1, 1, 6)]
+        e = datetime.datetime(2015, 1, 2, 0)
+        relative_humidities = np.linspace(20, 90, 2 * 28).reshape(2, 28)
+        wind_speeds = np.linspace(2, 20, 2 * 24).reshape(2, 24)
+        batch = FepsBatchProfiler(s, e, relative_humidities=relative_humidities,
+            wind_speeds=wind_speeds, relative_humidity_lag=4)
+        for i in range(2):
+            n = batch.num_hours[i]
+            profiler = FepsTimeProfiler(s[i], e,
+                relative_humidity=relative_humidities[i, :n + 4],
+                wind_speed=wind_speeds[i, :n], relative_humidity_lag=4)
+            for k, expected in profiler.hourly_fractions.items():
+                assert_allclose(batch.get_hourly_fractions(i)[k], expected,
+                    rtol=1e-12, atol=1e-300)
+
+        with raises(ValueError) as e_info:
+            FepsBatchProfiler(s, e, wind_speeds=wind_speeds[:1])
+        assert e_info.value.args[0] == (
+            "Expected 2 rows of hourly wind speed; got 1")
+
+    def test_invalid(self):
+        s = [datetime.datetime(2015, 1, 1, 0), datetime.datetime(2015, 1, 1, 12)]
+        e = [datetime.datetime(2015, 1, 2, 0), datetime.datetime(2015, 1, 1, 12)]
+        with raises(InvalidStartEndTimesError) as e_info:
+            FepsBatchProfiler(s, e)
+        assert e_info.value.args[0].startswith("Fire 1: ")
+
+        e[1] = datetime.datetime(2015, 1, 1, 18)
+        with raises(ValueError) as e_info:
+            FepsBatchProfiler(s, e, local_ignition_start_times=[
+                None, datetime.datetime(2015, 1, 1, 9)])
+        assert e_info.value.args[0].startswith("Fire 1: Ignition start time")
+
+        with raises(InvalidStartEndTimesError) as e_info:
+            FepsBatchProfiler(s, e,
+                local_ignition_start_times=datetime.datetime(2015, 1, 1, 14),
+                local_ignition_end_times=datetime.datetime(2015, 1, 1, 13))
+
+        with raises(ValueError) as e_info:
+            FepsBatchProfiler(s, e, fire_types=['rx', 'foo'])
+        assert e_info.value.args[0].startswith("Fire 1: Invalid fire type: 'foo'")
+
+        with raises(ValueError) as e_info:
+            FepsBatchProfiler(s, e, moisture_categories=['dry', 'sdf'])
+        assert e_info.value.args[0] == "Invalid moisture category: sdf"
+
+        with raises(ValueError) as e_info:
+            FepsBatchProfiler(s, e, wind_speeds=[1, 2, 3])
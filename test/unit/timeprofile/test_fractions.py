@@ -0,0 +1,162 @@
+import numpy as np
+from pytest import raises
+
+from timeprofile.fractions import (
+    HourlyFractions,
+    LazyHourlyFractions,
+    SparseHourlyFractions
+)
+
+PHASES = ('area_fraction', 'flaming', 'smoldering', 'residual')
+
+VALUES = {
+    'area_fraction': [0.5, 0.5],
+    'flaming': [0.25, 0.75],
+    'smoldering': [0.1, 0.9],
+    'residual': [0.0, 1.0]
+}
+
+
+class TestLazyHourlyFractions(object):
+
+    def test_computes_on_access(self):
+        computed = []
+        def compute(p):
+            computed.append(p)
+            return np.array(VALUES[p])
+
+        hf = LazyHourlyFractions(PHASES, compute)
+        assert hf.computed == []
+        assert hf['flaming'] == [0.25, 0.75]
+        assert hf['flaming'] == [0.25, 0.75]
+        assert computed == ['flaming']
+        assert dict(hf) == VALUES
+        with raises(KeyError):
+            hf['foo']
+
+
+class TestHourlyFractions(object):
+
+    def test_from_dict(self):
+        hf = HourlyFractions.from_dict(VALUES, phases=PHASES)
+        assert hf.dtype == np.float64
+        assert hf.num_hours == 2
+        assert hf.nbytes == 4 * 2 * 8
+        assert dict(hf) == VALUES
+        assert list(hf) == list(PHASES)
+        assert hf.array.shape == (4, 2)
+
+    def test_float32(self):
+        hf = HourlyFractions.from_dict(VALUES, phases=PHASES, dtype='float32')
+        assert hf.dtype == np.float32
+        assert hf.nbytes == 4 * 2 * 4
+        assert hf['smoldering'] == [np.float32(0.1), np.float32(0.9)]
+        assert isinstance(hf['smoldering'][0], float)
+
+    def test_invalid_dtype(self):
+        with raises(ValueError) as e_info:
+            HourlyFractions(PHASES, 2, dtype='int32')
+        assert e_info.value.args[0] == (
+            "Invalid dtype: 'int32'.  Valid: 'float64', 'float32'")
+
+    def test_lazy(self):
+        computed = []
+        def compute(p):
+            computed.append(p)
+            return VALUES[p]
+
+        hf = HourlyFractions(PHASES, 2, compute=compute)
+        assert hf.computed == []
+        assert hf['residual'] == [0.0, 1.0]
+        np.testing.assert_array_equal(hf.get_array('residual'), [0.0, 1.0])
+        assert hf.computed == ['residual']
+        assert computed == ['residual']
+        with raises(KeyError):
+            hf['foo']
+
+        hf.array
+        assert hf.computed == list(PHASES)
+
+    def test_cached_lists(self):
+        hf = HourlyFractions(PHASES, 2, compute=lambda p: VALUES[p])
+        flaming = hf['flaming']
+        assert hf['flaming'] is flaming
+        assert not isinstance(hf, LazyHourlyFractions)
+
+        # frozen objects don't share lists handed out before freezing
+        hf.freeze()
+        assert hf['flaming'] == flaming
+        assert hf['flaming'] is not flaming
+        assert hf['flaming'] is hf['flaming']
+
+    def test_read_only_views(self):
+        hf = HourlyFractions.from_dict(VALUES, phases=PHASES)
+        with raises(ValueError):
+            hf.get_array('flaming')[0] = 1.0
+        with raises(ValueError):
+            hf.array[0, 0] = 1.0
+
+    def test_freeze(self):
+        hf = HourlyFractions(PHASES, 2, compute=lambda p: VALUES[p])
+        hf.freeze()
+        assert hf.computed == list(PHASES)
+        assert not hf.array.base.flags.writeable
+        assert dict(hf) == VALUES
+
+
+class TestSparseHourlyFractions(object):
+
+    TAILS = {
+        'area_fraction': [0.0, 0.0, 0.5, 0.5, 0.0],
+        'flaming': [0.0, 0.3, 0.6, 0.1 - 2e-9, 2e-9],
+        'smoldering': [1e-9, 0.5, 0.0, 0.5 - 1e-9, 0.0],
+        'residual': [0.0] * 5
+    }
+
+    def test_no_trimming(self):
+        hf = SparseHourlyFractions.from_dict(VALUES, phases=PHASES)
+        assert dict(hf) == VALUES
+        assert hf.get_sparse('residual')[0] == 1
+        assert hf.get_sparse('residual')[1].tolist() == [1.0]
+        assert hf.trimmed == dict.fromkeys(PHASES, 0.0)
+
+    def test_trimming(self):
+        hf = SparseHourlyFractions.from_dict(self.TAILS, epsilon=1e-8,
+            renormalize=False)
+        assert hf.num_hours == 5
+        assert [hf.get_sparse(p)[0] for p in PHASES] == [2, 1, 1, 0]
+        # only leading and trailing values are trimmed
+        assert hf.get_sparse('smoldering')[1].tolist() == [0.5, 0.0, 0.5 - 1e-9]
+        assert hf.get_sparse('residual')[1].tolist() == []
+        assert hf.trimmed['flaming'] == 2e-9
+        assert hf.trimmed['smoldering'] == 1e-9
+        assert hf.span == (1, 4)
+        assert hf['flaming'] == [0.0, 0.3, 0.6, 0.1 - 2e-9, 0.0]
+        assert hf['residual'] == [0.0] * 5
+        assert hf.array.shape == (4, 5)
+
+    def test_renormalize(self):
+        hf = SparseHourlyFractions.from_dict(self.TAILS, epsilon=1e-8)
+        for p in ('flaming', 'smoldering'):
+            assert abs(sum(hf[p]) - 1) < 1e-15
+            assert hf.trimmed[p] > 0
+
+    def test_nan_not_trimmed(self):
+        hf = SparseHourlyFractions.from_dict({'flaming': [np.nan, np.nan]},
+            epsilon=0.1)
+        assert hf.get_sparse('flaming')[1].size == 2
+
+    def test_read_only(self):
+        hf = SparseHourlyFractions.from_dict(self.TAILS, epsilon=1e-8)
+        assert hf.frozen
+        with raises(ValueError):
+            hf.get_sparse('flaming')[1][0] = 1.0
+        with raises(ValueError):
+            hf.get_array('flaming')[0] = 1.0
+        with raises(KeyError):
+            hf['foo']
+
+    def test_invalid_offset(self):
+        with raises(ValueError) as e_info:
+            SparseHourlyFractions(['flaming'], 3, [2], [[0.5, 0.5]])
+        assert e_info.value.args[0] == "Invalid offset 2 for 2 values of 3 hours"
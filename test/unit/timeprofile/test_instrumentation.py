@@ -0,0 +1,72 @@
+import datetime
+
+from timeprofile import instrumentation
+from timeprofile.feps import FepsTimeProfiler
+from timeprofile.static import StaticTimeProfiler
+
+S = datetime.datetime(2015, 1, 1, 0)
+E = datetime.datetime(2015, 1, 3, 0)
+
+
+class TestRecord(object):
+
+    def test_feps(self):
+        with instrumentation.record() as recorder:
+            FepsTimeProfiler(S, E, eager=True)
+            FepsTimeProfiler(S, E, engine='numpy', eager=True)
+        stats = recorder.get_stats()
+
+        assert stats['FepsTimeProfiler._set_times'].calls == 2
+        assert stats['FepsTimeProfiler._compute_area_fractions'] == (2,
+            stats['FepsTimeProfiler._compute_area_fractions'].seconds, 96)
+        assert stats['FepsTimeProfiler._normalize'].calls == 3
+        assert stats['_fused_recurrences'].calls == 1
+        assert stats['_fused_recurrences'].hours == 48
+        for s in stats.values():
+            assert s.seconds > 0
+
+        # stages run outside of the context aren't recorded
+        FepsTimeProfiler(S, E, eager=True)
+        assert recorder.get_stats() == stats
+        assert instrumentation.get_stats() == {}
+
+    def test_static_and_nesting(self):
+        with instrumentation.record() as outer:
+            StaticTimeProfiler(S, E)
+            with instrumentation.record() as inner:
+                StaticTimeProfiler(S, E).hourly_fractions
+            StaticTimeProfiler(S, E).hourly_fractions
+
+        assert list(inner.get_stats()) == [
+            'StaticTimeProfiler._compute_hourly_fractions',
+            'StaticTimeProfiler._set_times'
+        ]
+        stats = outer.get_stats()
+        assert stats['StaticTimeProfiler._set_times'].calls == 2
+        assert stats['StaticTimeProfiler._compute_hourly_fractions'].hours == 48
+
+    def test_enable_disable(self):
+        recorder = instrumentation.enable()
+        try:
+            FepsTimeProfiler(S, E).hourly_fractions['flaming']
+            assert instrumentation.get_stats() == recorder.get_stats()
+            assert instrumentation.get_stats()['FepsTimeProfiler._compute_phase'].calls == 1
+            recorder.reset()
+            assert instrumentation.get_stats() == {}
+        finally:
+            instrumentation.disable()
+        assert instrumentation.get_stats() == {}
+
+    def test_custom_recorder(self):
+        class ListRecorder(object):
+            def __init__(self):
+                self.calls = []
+            def add(self, stage, seconds, hours):
+                self.calls.append((stage, hours))
+
+        with instrumentation.record(ListRecorder()) as recorder:
+            StaticTimeProfiler(S, E).hourly_fractions
+        assert recorder.calls == [
+            ('StaticTimeProfiler._set_times', 48),
+            ('StaticTimeProfiler._compute_hourly_fractions', 48)
+        ]
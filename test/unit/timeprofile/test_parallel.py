@@ -0,0 +1,76 @@
+import datetime
+import sys
+
+from numpy.testing import assert_allclose
+from pytest import raises
+
+from timeprofile.feps import FepsTimeProfiler
+from timeprofile.fractions import SparseHourlyFractions
+from timeprofile import parallel
+from timeprofile.parallel import profile_many
+from timeprofile.static import StaticTimeProfiler
+
+
+def make_fires(n):
+    s = datetime.datetime(2015, 1, 1, 0)
+    return [{
+        'local_start_time': s + datetime.timedelta(hours=i),
+        'local_end_time': s + datetime.timedelta(hours=24 + 7 * i),
+        'fire_type': 'wf' if i % 2 else 'rx'
+    } for i in range(n)]
+
+
+class TestProfileMany(object):
+
+    def test_serial(self):
+        fires = make_fires(5)
+        results = profile_many(fires, workers=1)
+        assert results == [dict(FepsTimeProfiler(**f).hourly_fractions)
+            for f in fires]
+
+    def test_parallel_matches_serial(self):
+        fires = make_fires(9)
+        assert (profile_many(fires, workers=2, chunksize=2)
+            == profile_many(fires, workers=1))
+
+    def test_static(self):
+        fires = [{k: v for k, v in f.items() if k != 'fire_type'}
+            for f in make_fires(4)]
+        results = profile_many(fires, model='static', workers=2)
+        assert results == [StaticTimeProfiler(**f).hourly_fractions
+            for f in fires]
+
+    def test_sparse(self):
+        fires = make_fires(4)
+        results = profile_many(fires, workers=2, epsilon=1e-12)
+        for fire, result in zip(fires, results):
+            assert isinstance(result, SparseHourlyFractions)
+            expected = FepsTimeProfiler(**fire).hourly_fractions
+            for k in FepsTimeProfiler.FIELDS:
+                assert_allclose(result[k], expected[k], rtol=1e-9, atol=1e-12)
+
+    def test_return_errors(self):
+        fires = make_fires(4)
+        fires[1]['fire_type'] = 'foo'
+        for workers in (1, 2):
+            results = profile_many(fires, workers=workers, return_errors=True)
+            assert isinstance(results[1], ValueError)
+            assert results[2] == dict(FepsTimeProfiler(**fires[2]).hourly_fractions)
+            with raises(ValueError):
+                profile_many(fires, workers=workers)
+
+    def test_invalid(self):
+        with raises(ValueError) as e_info:
+            profile_many(make_fires(2), model='foo')
+        assert e_info.value.args[0] == "Invalid model: 'foo'.  Valid: 'feps', 'static'"
+        with raises(ValueError) as e_info:
+            profile_many(make_fires(2), workers=-1)
+        assert e_info.value.args[0] == "Invalid number of workers: -1"
+
+    def test_mp_context(self, monkeypatch):
+        # the default start method is kept unless pyarrow is loaded
+        monkeypatch.delitem(sys.modules, 'pyarrow', raising=False)
+        assert parallel._get_mp_context() is None
+        monkeypatch.setitem(sys.modules, 'pyarrow', object())
+        context = parallel._get_mp_context()
+        assert context is None or context.get_start_method() == 'forkserver'
@@ -0,0 +1,137 @@
+import datetime
+import pickle
+
+import numpy as np
+from numpy.testing import assert_array_equal
+from pytest import raises
+
+from timeprofile import serialization
+from timeprofile.feps import FepsParameters, FepsTimeProfiler
+from timeprofile.fractions import HourlyFractions
+from timeprofile.static import StaticTimeProfiler
+from timeprofile.templates import TemplateCache
+
+FIELDS = FepsTimeProfiler.FIELDS
+
+S = datetime.datetime(2015, 1, 1, 6, 30)
+E = datetime.datetime(2015, 1, 2, 9, 15)
+
+
+def assert_same_values(profiler, result):
+    for k in FIELDS:
+        assert_array_equal(result.hourly_fractions.get_array(k),
+            profiler.hourly_fractions[k])
+
+
+class TestToBytes(object):
+
+    def test_feps(self):
+        parameters = FepsParameters(K_RDR=10)
+        for kwargs in ({}, {'eager': True}, {'dtype': 'float64'}):
+            profiler = FepsTimeProfiler(S, E, parameters=parameters, **kwargs)
+            data = serialization.to_bytes(profiler)
+            assert len(data) == serialization.HEADER.size + 4 * 28 * 8
+
+            result = serialization.from_bytes(data)
+            assert result.model == 'feps'
+            assert result.start_hour == datetime.datetime(2015, 1, 1, 6)
+            assert result.resolution == datetime.timedelta(hours=1)
+            assert result.num_hours == 28
+            assert result.parameters_fingerprint == parameters.fingerprint
+            assert_same_values(profiler, result)
+
+    def test_static(self):
+        profiler = StaticTimeProfiler(S, E,
+            resolution=datetime.timedelta(minutes=15))
+        result = serialization.from_bytes(serialization.to_bytes(profiler))
+        assert result.model == 'static'
+        assert result.start_hour == datetime.datetime(2015, 1, 1, 6, 30)
+        assert result.resolution == datetime.timedelta(minutes=15)
+        assert result.parameters_fingerprint == 0
+        assert_same_values(profiler, result)
+
+    def test_timezone_aware(self):
+        tz = datetime.timezone(datetime.timedelta(hours=-7))
+        profiler = StaticTimeProfiler(S.replace(tzinfo=tz), E.replace(tzinfo=tz))
+        result = serialization.from_bytes(serialization.to_bytes(profiler))
+        # stored in local wall time
+        assert result.start_hour == datetime.datetime(2015, 1, 1, 6)
+        assert_same_values(profiler, result)
+
+    def test_template(self):
+        profile = TemplateCache().get_profile('feps', S, E)
+        result = serialization.from_bytes(serialization.to_bytes(profile))
+        assert result.start_hour == datetime.datetime(2015, 1, 1, 6)
+        assert_same_values(profile, result)
+
+    def test_float32(self):
+        profiler = FepsTimeProfiler(S, E)
+        data = serialization.to_bytes(profiler, dtype='float32')
+        result = serialization.from_bytes(data)
+        assert result.hourly_fractions.dtype == 'float32'
+        assert len(data) == serialization.HEADER.size + 4 * 28 * 4
+        # re-serializing with the same dtype returns the same bytes
+        assert serialization.to_bytes(result) == data
+        assert serialization.from_bytes(serialization.to_bytes(result,
+            dtype='float64')).hourly_fractions.dtype == 'float64'
+
+    def test_invalid(self):
+        with raises(ValueError) as e_info:
+            serialization.to_bytes(FepsTimeProfiler(S, E), dtype='int8')
+        assert e_info.value.args[0] == (
+            "Invalid dtype: 'int8'.  Valid: 'float64', 'float32'")
+        with raises(ValueError) as e_info:
+            serialization.to_bytes(object())
+        assert e_info.value.args[0] == "Can't serialize object objects"
+
+
+class TestFromBytes(object):
+
+    def test_zero_copy(self):
+        data = serialization.to_bytes(FepsTimeProfiler(S, E))
+        result = serialization.from_bytes(data)
+        array = result.hourly_fractions.array
+        assert np.shares_memory(array, np.frombuffer(data, dtype='uint8'))
+        assert isinstance(result.hourly_fractions, HourlyFractions)
+        assert result.hourly_fractions.frozen
+        with raises(ValueError):
+            array[0, 0] = 1.0
+
+    def test_pickle(self):
+        data = serialization.to_bytes(FepsTimeProfiler(S, E))
+        result = serialization.from_bytes(data)
+
+        buffers = []
+        pickled = pickle.dumps(result, protocol=5,
+            buffer_callback=buffers.append)
+        assert len(pickled) < 100
+        unpickled = pickle.loads(pickled, buffers=buffers)
+        assert np.shares_memory(unpickled.hourly_fractions.array,
+            np.frombuffer(data, dtype='uint8'))
+
+        for protocol in (4, 5):
+            unpickled = pickle.loads(pickle.dumps(result, protocol=protocol))
+            assert unpickled.start_hour == result.start_hour
+            assert_array_equal(unpickled.hourly_fractions.array,
+                result.hourly_fractions.array)
+
+    def test_invalid(self):
+        data = serialization.to_bytes(FepsTimeProfiler(S, E))
+        with raises(ValueError) as e_info:
+            serialization.from_bytes(data[:10])
+        assert e_info.value.args[0] == "Invalid serialized profile: 10 bytes"
+        with raises(ValueError) as e_info:
+            serialization.from_bytes(b'XXXX' + data[4:])
+        assert e_info.value.args[0] == "Invalid serialized profile header"
+        with raises(ValueError) as e_info:
+            serialization.from_bytes(data[:-8])
+        assert e_info.value.args[0] == (
+            "Invalid serialized profile: expected 928 bytes; got 920")
+
+        # corrupt model, dtype, and number of phases
+        for offset in (5, 6, 7):
+            corrupt = bytearray(data)
+            corrupt[offset] = 9
+            with raises(ValueError) as e_info:
+                serialization.from_bytes(corrupt)
+            assert e_info.value.args[0] == "Invalid serialized profile header"
@@ -2,14 +2,21 @@ __author__      = "Joel Dubowy"
 
 #import copy
 import datetime
+import functools
 
-from numpy.testing import assert_approx_equal
+import numpy as np
+from numpy.testing import assert_approx_equal, assert_allclose
 from pytest import raises
 
+from timeprofile import InvalidStartEndTimesError
 from timeprofile.static import (
     StaticTimeProfiler,
-    InvalidHourlyFractionsError
+    StaticBatchProfiler,
+    HourlyFractionSet,
+    InvalidHourlyFractionsError,
+    _DiurnalTable
 )
+from timeprofile.fractions import HourlyFractions
 
 def assert_approximately_equal(expected, actual):
     if isinstance(expected, dict) and isinstance(actual, dict):
@@ -238,3 +245,364 @@ class TestStaticTimeProfiler_CustomHourlyFractions(object):
         et = datetime.datetime(2015, 1, 4, 0)
         with raises(InvalidHourlyFractionsError) as e:
             stp = StaticTimeProfiler(st, et, hourly_fractions=self.HOURLY_FRACTIONS)
+
+
+class TestStaticTimeProfiler_InputCopy(object):
+
+    def test_changes_after_construction_are_ignored(self):
+        s = datetime.datetime(2015, 1, 20, 10, 0)
+        e = datetime.datetime(2015, 1, 20, 14, 0)
+        hourly_fractions = {p: [1 / 24.0] * 24 for p in StaticTimeProfiler.FIELDS}
+        profiler = StaticTimeProfiler(s, e, hourly_fractions=hourly_fractions)
+        hourly_fractions['flaming'][10] = 5.0
+        hourly_fractions['smoldering'] = [1.0]
+        assert_approximately_equal(profiler.hourly_fractions,
+            {p: [0.25] * 4 for p in StaticTimeProfiler.FIELDS})
+        assert_allclose(list(profiler.iter_hourly_fractions())[0][1:],
+            [0.25] * 4)
+
+
+class TestStaticTimeProfiler_LongWindows(object):
+
+    def _hour_by_hour(self, profiler, hourly_fractions):
+        # hour by hour computation, summing totals with reduce
+        num_hours = profiler._num_hours
+        expected = {}
+        for p in StaticTimeProfiler.FIELDS:
+            values = hourly_fractions[p]
+            if len(values) == 24:
+                r = [values[(profiler.start_hour.hour + i) % 24]
+                    for i in range(num_hours)]
+            else:
+                r = list(values[:num_hours])
+            r[0] *= (3600 - profiler._first_hour_offset) / 3600
+            if num_hours > 1:
+                r[-1] *= profiler._last_hour_offset / 3600
+            total = functools.reduce(lambda x, y: x + y, r)
+            expected[p] = [x / total for x in r]
+        return expected
+
+    def test_identical_to_hour_by_hour(self):
+        daily = {p: list(np.random.RandomState(i).dirichlet(np.ones(24)))
+            for i, p in enumerate(StaticTimeProfiler.FIELDS)}
+        s = datetime.datetime(2015, 1, 1, 5, 20)
+        for e in (datetime.datetime(2015, 1, 1, 5, 40),
+                datetime.datetime(2015, 1, 2, 5, 0),
+                datetime.datetime(2015, 3, 31, 17, 45)):
+            for hourly_fractions in (None, daily):
+                profiler = StaticTimeProfiler(s, e,
+                    hourly_fractions=hourly_fractions)
+                assert profiler.hourly_fractions == self._hour_by_hour(
+                    profiler, hourly_fractions
+                    or StaticTimeProfiler.DEFAULT_DAILY_HOURLY_FRACTIONS)
+
+    def test_diurnal_table_totals(self):
+        values = np.random.RandomState(0).dirichlet(np.ones(24))
+        table = _DiurnalTable(values)
+        for first_hour_of_day in (0, 5, 23):
+            for num_hours in (1, 19, 24, 25, 24 * 90 + 7):
+                expected = sum(values[(first_hour_of_day + i) % 24]
+                    for i in range(num_hours))
+                assert_allclose(table.get_total(first_hour_of_day, num_hours),
+                    expected, rtol=1e-12)
+            assert_allclose(table.rotations[first_hour_of_day],
+                np.roll(values, -first_hour_of_day))
+
+
+class TestStaticTimeProfiler_Dtype(object):
+
+    def test_float32(self):
+        s = datetime.datetime(2015, 1, 1, 0, 30)
+        e = datetime.datetime(2015, 1, 2, 12, 0)
+        expected = StaticTimeProfiler(s, e).hourly_fractions
+        hourly_fractions = StaticTimeProfiler(s, e,
+            dtype='float32').hourly_fractions
+        assert isinstance(hourly_fractions, HourlyFractions)
+        assert hourly_fractions.dtype == 'float32'
+        for k in StaticTimeProfiler.FIELDS:
+            assert_allclose(hourly_fractions.get_array(k), expected[k],
+                rtol=1e-6)
+
+    def test_no_instance_dict(self):
+        profiler = StaticTimeProfiler(datetime.datetime(2015, 1, 1, 0),
+            datetime.datetime(2015, 1, 2, 0))
+        assert not hasattr(profiler, '__dict__')
+
+
+class TestStaticTimeProfiler_Sparse(object):
+
+    def test_sparsify(self):
+        s = datetime.datetime(2015, 1, 1, 5, 20)
+        e = datetime.datetime(2015, 1, 2, 3, 10)
+        custom = {p: [0.0] * 10 + [0.25] * 4 + [0.0] * 10
+            for p in StaticTimeProfiler.FIELDS}
+        profiler = StaticTimeProfiler(s, e, hourly_fractions=custom)
+        expected = dict(profiler.hourly_fractions)
+        hourly_fractions = profiler.sparsify()
+        for k in StaticTimeProfiler.FIELDS:
+            # 10:00 through 13:00
+            assert hourly_fractions.get_sparse(k)[0] == 5
+            assert len(hourly_fractions.get_sparse(k)[1]) == 4
+            assert hourly_fractions[k] == expected[k]
+
+
+class TestStaticTimeProfiler_IterHourlyFractions(object):
+
+    def test_matches_hourly_fractions(self):
+        custom = {p: [1 / 40] * 40 for p in StaticTimeProfiler.FIELDS}
+        cases = [
+            (datetime.datetime(2015, 1, 1, 0), datetime.datetime(2015, 1, 2, 0), None),
+            (datetime.datetime(2015, 1, 1, 5, 20), datetime.datetime(2015, 1, 1, 5, 40), None),
+            (datetime.datetime(2015, 1, 1, 5, 20), datetime.datetime(2015, 1, 4, 17, 45), None),
+            (datetime.datetime(2015, 1, 1, 5, 20), datetime.datetime(2015, 1, 2, 20, 30), custom)
+        ]
+        for s, e, hourly_fractions in cases:
+            profiler = StaticTimeProfiler(s, e, hourly_fractions=hourly_fractions)
+            rows = list(profiler.iter_hourly_fractions())
+            chunks = list(profiler.iter_hourly_fractions(chunk_size=7))
+            assert rows[0][0] == profiler.start_hour
+            assert rows[-1][0] == profiler.end_hour
+            for i, k in enumerate(StaticTimeProfiler.FIELDS):
+                assert_allclose([r[i + 1] for r in rows],
+                    profiler.hourly_fractions[k], rtol=1e-12)
+                assert_allclose(np.concatenate([c[i + 1] for c in chunks]),
+                    profiler.hourly_fractions[k], rtol=1e-12)
+
+    def test_timezone_aware_times(self):
+        # hours are local wall times, not converted to UTC
+        tz = datetime.timezone(datetime.timedelta(hours=-7))
+        s = datetime.datetime(2015, 1, 1, 12, 20, tzinfo=tz)
+        profiler = StaticTimeProfiler(s, s + datetime.timedelta(hours=3))
+        rows = list(profiler.iter_hourly_fractions())
+        assert [r[0] for r in rows] == [datetime.datetime(2015, 1, 1, h)
+            for h in (12, 13, 14, 15)]
+        chunk = next(profiler.iter_hourly_fractions(chunk_size=2))
+        assert chunk[0][0] == np.datetime64('2015-01-01T12', 'h')
+
+
+class TestStaticTimeProfiler_Resolution(object):
+
+    FIFTEEN_MINUTES = datetime.timedelta(minutes=15)
+
+    def _hourly_sums(self, profiler, values):
+        # pad the steps out to whole hours, and sum each hour's steps
+        steps_per_hour = 3600 // profiler.resolution.seconds
+        pad = profiler.start_hour.minute * 60 // profiler.resolution.seconds
+        values = np.concatenate([np.zeros(pad), values])
+        values = np.pad(values, (0, -len(values) % steps_per_hour))
+        return values.reshape(-1, steps_per_hour).sum(axis=1)
+
+    def test_hourly_sums(self):
+        custom = {p: [1 / 40] * 40 for p in StaticTimeProfiler.FIELDS}
+        cases = [
+            (datetime.datetime(2015, 1, 1, 0), datetime.datetime(2015, 1, 2, 0), None),
+            (datetime.datetime(2015, 1, 1, 5, 20), datetime.datetime(2015, 1, 2, 3, 10), None),
+            (datetime.datetime(2015, 1, 1, 5, 20), datetime.datetime(2015, 1, 2, 20, 30), custom)
+        ]
+        for s, e, hourly_fractions in cases:
+            expected = StaticTimeProfiler(s, e,
+                hourly_fractions=hourly_fractions).hourly_fractions
+            for minutes in (5, 15, 30):
+                profiler = StaticTimeProfiler(s, e,
+                    hourly_fractions=hourly_fractions,
+                    resolution=datetime.timedelta(minutes=minutes))
+                for k in StaticTimeProfiler.FIELDS:
+                    assert_allclose(self._hourly_sums(profiler,
+                        profiler.hourly_fractions[k]), expected[k], rtol=1e-12)
+
+    def test_steps(self):
+        s = datetime.datetime(2015, 1, 1, 5, 20)
+        e = datetime.datetime(2015, 1, 1, 7, 10)
+        profiler = StaticTimeProfiler(s, e, resolution=self.FIFTEEN_MINUTES)
+        assert profiler.resolution == self.FIFTEEN_MINUTES
+        assert profiler.start_hour == datetime.datetime(2015, 1, 1, 5, 15)
+        assert profiler.end_hour == datetime.datetime(2015, 1, 1, 7, 0)
+        # 05:15 (10 of 15 minutes) through 07:00 (10 of 15 minutes), all
+        # with the same default hourly fraction
+        assert_allclose(profiler.hourly_fractions['flaming'],
+            np.array([10] + [15] * 6 + [10]) / 110, rtol=1e-12)
+
+        rows = list(profiler.iter_hourly_fractions())
+        assert rows[0][0] == profiler.start_hour
+        assert rows[1][0] == datetime.datetime(2015, 1, 1, 5, 30)
+        chunks = list(profiler.iter_hourly_fractions(chunk_size=3))
+        assert chunks[0][0].dtype == 'datetime64[m]'
+        for i, k in enumerate(StaticTimeProfiler.FIELDS):
+            assert_allclose(np.concatenate([c[i + 1] for c in chunks]),
+                profiler.hourly_fractions[k], rtol=1e-12)
+
+    def test_dtype(self):
+        s = datetime.datetime(2015, 1, 1, 5, 20)
+        e = datetime.datetime(2015, 1, 2, 3, 10)
+        expected = StaticTimeProfiler(s, e,
+            resolution=self.FIFTEEN_MINUTES).hourly_fractions
+        hourly_fractions = StaticTimeProfiler(s, e, dtype='float32',
+            resolution=self.FIFTEEN_MINUTES).hourly_fractions
+        assert isinstance(hourly_fractions, HourlyFractions)
+        for k in StaticTimeProfiler.FIELDS:
+            assert_allclose(hourly_fractions.get_array(k), expected[k],
+                rtol=1e-6)
+
+    def test_invalid(self):
+        s = datetime.datetime(2015, 1, 1, 5, 20)
+        e = datetime.datetime(2015, 1, 2, 3, 10)
+        for resolution in (datetime.timedelta(minutes=7),
+                datetime.timedelta(hours=2), datetime.timedelta(0),
+                datetime.timedelta(seconds=0.5), 15):
+            with raises(ValueError) as e_info:
+                StaticTimeProfiler(s, e, resolution=resolution)
+            assert e_info.value.args[0].startswith('Invalid resolution')
+
+
+class TestHourlyFractionSet(object):
+
+    DAILY = {p: list(StaticTimeProfiler.DEFAULT_DAILY_HOURLY_FRACTIONS[p])
+        for p in StaticTimeProfiler.FIELDS}
+
+    def test_construction(self):
+        hourly_fractions = HourlyFractionSet(self.DAILY)
+        assert dict(hourly_fractions) == self.DAILY
+        assert hourly_fractions.num_hours == 24
+        assert hourly_fractions.array.shape == (4, 24)
+        assert hourly_fractions.array.flags.c_contiguous
+        assert not hourly_fractions.array.flags.writeable
+        assert hourly_fractions.frozen
+        assert not hourly_fractions.get_array('smoldering').flags.writeable
+        with raises(KeyError):
+            hourly_fractions['foo']
+
+    def test_invalid(self):
+        for invalid in (
+                {p: self.DAILY[p] for p in ('area_fraction', 'flaming')},
+                dict(self.DAILY, flaming=self.DAILY['flaming'][:23]),
+                dict(self.DAILY, flaming=[2 * f for f in self.DAILY['flaming']]),
+                dict(self.DAILY, flaming=[float('nan')] * 24),
+                {p: [] for p in self.DAILY}):
+            with raises(InvalidHourlyFractionsError):
+                HourlyFractionSet(invalid)
+
+    def test_static_time_profiler(self):
+        hourly_fractions = HourlyFractionSet(self.DAILY)
+        resolution = datetime.timedelta(minutes=15)
+        for s, e in ((datetime.datetime(2019, 1, 1, 5, 30),
+                    datetime.datetime(2019, 1, 4, 7, 15)),
+                (datetime.datetime(2019, 1, 1, 0, 0),
+                    datetime.datetime(2019, 1, 1, 3, 0))):
+            expected = StaticTimeProfiler(s, e, hourly_fractions=self.DAILY)
+            actual = StaticTimeProfiler(s, e, hourly_fractions=hourly_fractions)
+            assert actual.hourly_fractions == expected.hourly_fractions
+            assert list(actual.iter_hourly_fractions()) == list(
+                expected.iter_hourly_fractions())
+            assert StaticTimeProfiler(s, e, hourly_fractions=hourly_fractions,
+                resolution=resolution).hourly_fractions == StaticTimeProfiler(
+                s, e, hourly_fractions=self.DAILY,
+                resolution=resolution).hourly_fractions
+
+        # Values for every hour of the window
+        s = datetime.datetime(2019, 1, 1, 12, 0)
+        e = datetime.datetime(2019, 1, 1, 15, 0)
+        window = {p: [0.25, 0.5, 0.25] for p in StaticTimeProfiler.FIELDS}
+        assert StaticTimeProfiler(s, e,
+            hourly_fractions=HourlyFractionSet(window)).hourly_fractions == (
+            StaticTimeProfiler(s, e, hourly_fractions=window).hourly_fractions)
+        with raises(InvalidHourlyFractionsError):
+            StaticTimeProfiler(s, e + datetime.timedelta(hours=1),
+                hourly_fractions=HourlyFractionSet(window))
+
+    def test_validate_table(self):
+        table = np.array([HourlyFractionSet(self.DAILY).array] * 5)
+        table[1, 2, 3] += 0.1
+        table[3, 0, 0] = np.nan
+        assert HourlyFractionSet.validate_table(table).tolist() == [
+            False, True, False, True, False]
+
+        window = np.full((3, 4, 4), 0.25)
+        window[2, 1] = 0.5
+        assert HourlyFractionSet.validate_table(window).tolist() == [
+            False, False, True]
+        assert HourlyFractionSet.validate_table(window,
+            num_hours=[4, 5, 4]).tolist() == [False, True, True]
+        assert HourlyFractionSet.validate_table(window[:, :3]).tolist() == [
+            True, True, True]
+
+
+class TestStaticBatchProfiler(object):
+
+    WINDOWS = [
+        (datetime.datetime(2015, 1, 1, 0), datetime.datetime(2015, 1, 2, 0)),
+        (datetime.datetime(2015, 1, 1, 12, 20), datetime.datetime(2015, 1, 2, 16, 40)),
+        (datetime.datetime(2015, 1, 1, 12, 20), datetime.datetime(2015, 1, 1, 12, 40)),
+        (datetime.datetime(2015, 1, 1, 12, 20), datetime.datetime(2015, 1, 1, 13)),
+        (datetime.datetime(2015, 1, 1, 23, 59, 30), datetime.datetime(2015, 1, 3, 0, 0, 1)),
+        (datetime.datetime(2015, 1, 1, 5), datetime.datetime(2015, 1, 1, 7, 30))
+    ]
+
+    DAILY_HOURLY_FRACTIONS = TestStaticTimeProfiler_CustomDailyHourlyFractions.DAILY_HOURLY_FRACTIONS
+
+    def _check(self, batch, hourly_fractions_by_fire):
+        assert batch.num_fires == len(self.WINDOWS)
+        for k in StaticTimeProfiler.FIELDS:
+            assert batch.hourly_fractions[k].shape == (len(self.WINDOWS), 29)
+        for i, (s, e) in enumerate(self.WINDOWS):
+            stp = StaticTimeProfiler(s, e,
+                hourly_fractions=hourly_fractions_by_fire[i])
+            assert batch.start_hour[i].astype(object) == stp.start_hour
+            assert batch.end_hour[i].astype(object) == stp.end_hour
+            assert batch.num_hours[i] == len(stp.hourly_fractions['flaming'])
+            actual = batch.get_hourly_fractions(i)
+            assert set(actual) == set(stp.hourly_fractions)
+            for k, expected in stp.hourly_fractions.items():
+                assert_allclose(actual[k], expected, rtol=1e-12)
+
+    def test_default_hourly_fractions(self):
+        batch = StaticBatchProfiler([w[0] for w in self.WINDOWS],
+            [w[1] for w in self.WINDOWS])
+        self._check(batch, [None] * len(self.WINDOWS))
+
+    def test_shared_custom_hourly_fractions(self):
+        batch = StaticBatchProfiler([w[0] for w in self.WINDOWS],
+            [w[1] for w in self.WINDOWS],
+            hourly_fractions=self.DAILY_HOURLY_FRACTIONS)
+        self._check(batch, [self.DAILY_HOURLY_FRACTIONS] * len(self.WINDOWS))
+
+    def test_grouped_hourly_fractions(self):
+        tables = [StaticTimeProfiler.DEFAULT_DAILY_HOURLY_FRACTIONS,
+            self.DAILY_HOURLY_FRACTIONS]
+        groups = [0, 1, 1, 0, 1, 0]
+        batch = StaticBatchProfiler([w[0] for w in self.WINDOWS],
+            [w[1] for w in self.WINDOWS], hourly_fractions=tables,
+            groups=groups)
+        self._check(batch, [tables[g] if g else None for g in groups])
+
+    def test_hourly_fraction_sets(self):
+        tables = [HourlyFractionSet(StaticTimeProfiler.DEFAULT_DAILY_HOURLY_FRACTIONS),
+            HourlyFractionSet(self.DAILY_HOURLY_FRACTIONS)]
+        groups = [0, 1, 1, 0, 1, 0]
+        batch = StaticBatchProfiler([w[0] for w in self.WINDOWS],
+            [w[1] for w in self.WINDOWS], hourly_fractions=tables,
+            groups=groups)
+        self._check(batch, [tables[g] if g else None for g in groups])
+
+        # sets must still be daily hourly fractions
+        with raises(InvalidHourlyFractionsError):
+            StaticBatchProfiler([w[0] for w in self.WINDOWS],
+                [w[1] for w in self.WINDOWS], hourly_fractions=HourlyFractionSet(
+                {p: [0.5, 0.5] for p in StaticTimeProfiler.FIELDS}))
+
+    def test_invalid(self):
+        s = [w[0] for w in self.WINDOWS]
+        e = [w[1] for w in self.WINDOWS]
+
+        with raises(InvalidHourlyFractionsError) as e_info:
+            StaticBatchProfiler(s, e, hourly_fractions={
+                k: v[:23] for k, v in self.DAILY_HOURLY_FRACTIONS.items()})
+        with raises(InvalidHourlyFractionsError) as e_info:
+            StaticBatchProfiler(s, e, hourly_fractions={
+                k: [2 * f for f in v]
+                for k, v in self.DAILY_HOURLY_FRACTIONS.items()})
+        with raises(ValueError) as e_info:
+            StaticBatchProfiler(s, e,
+                hourly_fractions=[self.DAILY_HOURLY_FRACTIONS], groups=1)
+        with raises(InvalidStartEndTimesError) as e_info:
+            StaticBatchProfiler(s, s)
+        assert e_info.value.args[0].startswith("Fire 0: ")
@@ -0,0 +1,124 @@
+import datetime
+
+from numpy.testing import assert_allclose
+from pytest import raises
+
+from timeprofile import InvalidStartEndTimesError
+from timeprofile.feps import FepsTimeProfiler
+from timeprofile.static import StaticTimeProfiler
+from timeprofile.templates import TemplateCache
+
+
+def assert_same_profile(expected, actual, attrs):
+    for a in attrs:
+        assert getattr(actual, a) == getattr(expected, a)
+    assert set(actual.hourly_fractions) == set(expected.hourly_fractions)
+    for k, v in expected.hourly_fractions.items():
+        assert_allclose(actual.hourly_fractions[k], v, rtol=1e-15)
+
+
+class TestTemplateCache_Feps(object):
+
+    ATTRS = ('start', 'end', 'start_hour', 'end_hour', 'ignition_start',
+        'ignition_end')
+
+    def test_shifted_windows_share_template(self):
+        cache = TemplateCache()
+        for day in range(1, 5):
+            s = datetime.datetime(2015, 1, day, 0, 30)
+            e = datetime.datetime(2015, 1, day + 1, 0)
+            profile = cache.get_profile('feps', s, e, fire_type='wf')
+            assert_same_profile(FepsTimeProfiler(s, e, fire_type='wf'),
+                profile, self.ATTRS)
+        stats = cache.get_stats()
+        assert (stats.hits, stats.misses, stats.entries) == (3, 1, 1)
+
+    def test_default_ignition_depends_on_hour_of_day(self):
+        cache = TemplateCache()
+        s1 = datetime.datetime(2015, 1, 1, 0)
+        s2 = datetime.datetime(2015, 1, 1, 6)
+        for s in (s1, s2):
+            e = s + datetime.timedelta(hours=24)
+            profile = cache.get_profile('feps', s, e)
+            assert_same_profile(FepsTimeProfiler(s, e), profile, self.ATTRS)
+        assert cache.get_stats().entries == 2
+
+        # explicit ignition times relative to window are shift invariant
+        for s in (s1, s2):
+            e = s + datetime.timedelta(hours=24)
+            ig_s = s + datetime.timedelta(hours=10)
+            profile = cache.get_profile('feps', s, e,
+                local_ignition_start_time=ig_s)
+            assert_same_profile(FepsTimeProfiler(s, e,
+                local_ignition_start_time=ig_s), profile, self.ATTRS)
+        assert cache.get_stats().entries == 3
+
+    def test_default_ignition_time_outside_window(self):
+        cache = TemplateCache()
+        s = datetime.datetime(2015, 1, 1, 5)
+        e = datetime.datetime(2015, 1, 1, 12)
+        for kwargs in (
+                # default ignition end is after the end time
+                {'local_ignition_start_time': datetime.datetime(2015, 1, 1, 11)},
+                # default ignition start is before the start time
+                {'local_ignition_end_time': datetime.datetime(2015, 1, 1, 6)}):
+            profile = cache.get_profile('feps', s, e, **kwargs)
+            assert_same_profile(FepsTimeProfiler(s, e, **kwargs), profile,
+                self.ATTRS)
+
+    def test_iter_hourly_fractions(self):
+        cache = TemplateCache()
+        s = datetime.datetime(2015, 1, 3, 6)
+        e = datetime.datetime(2015, 1, 4, 6)
+        cache.get_profile('feps', s - datetime.timedelta(days=1),
+            e - datetime.timedelta(days=1))
+        profile = cache.get_profile('feps', s, e)
+        assert cache.get_stats().hits == 1
+        expected = list(FepsTimeProfiler(s, e).iter_hourly_fractions())
+        assert list(profile.iter_hourly_fractions()) == expected
+        hours = next(profile.iter_hourly_fractions(chunk_size=24))[0]
+        assert hours.tolist() == [r[0] for r in expected]
+
+    def test_invalid(self):
+        s = datetime.datetime(2015, 1, 1, 12)
+        with raises(InvalidStartEndTimesError):
+            TemplateCache().get_profile('feps', s, s)
+
+
+class TestTemplateCache_Static(object):
+
+    ATTRS = ('start_hour', 'end_hour')
+
+    def test_daily_hourly_fractions(self):
+        cache = TemplateCache()
+        for day in range(1, 4):
+            for hour in (0, 12):
+                s = datetime.datetime(2015, 1, day, hour, 20)
+                e = s + datetime.timedelta(hours=30)
+                profile = cache.get_profile('static', s, e)
+                assert_same_profile(StaticTimeProfiler(s, e), profile,
+                    self.ATTRS)
+        stats = cache.get_stats()
+        assert (stats.hits, stats.misses) == (4, 2)
+
+    def test_full_window_hourly_fractions(self):
+        hourly_fractions = {k: [0.25] * 4 for k in StaticTimeProfiler.FIELDS}
+        cache = TemplateCache()
+        for hour in (0, 5, 13):
+            s = datetime.datetime(2015, 1, 1, hour)
+            e = s + datetime.timedelta(hours=4)
+            profile = cache.get_profile('static', s, e,
+                hourly_fractions=hourly_fractions)
+            assert_same_profile(StaticTimeProfiler(s, e,
+                hourly_fractions=hourly_fractions), profile, self.ATTRS)
+        assert cache.get_stats().misses == 1
+
+    def test_timezone_aware_times(self):
+        cache = TemplateCache()
+        for tz in (datetime.timezone.utc,
+                datetime.timezone(datetime.timedelta(hours=-7))):
+            s = datetime.datetime(2015, 1, 1, 12, 20, tzinfo=tz)
+            e = s + datetime.timedelta(hours=30)
+            profile = cache.get_profile('static', s, e)
+            assert_same_profile(StaticTimeProfiler(s, e), profile, self.ATTRS)
+            assert profile.start_hour.tzinfo is tz
@@ -0,0 +1,191 @@
+import datetime
+
+import numpy as np
+from numpy.testing import assert_array_equal
+from pytest import raises
+
+from timeprofile import validation
+from timeprofile.feps import FepsBatchProfiler, MoistureCategory
+from timeprofile.static import (
+    HourlyFractionSet,
+    StaticBatchProfiler,
+    StaticTimeProfiler
+)
+
+S = datetime.datetime(2019, 1, 1, 6)
+E = datetime.datetime(2019, 1, 2, 6)
+ONE_HOUR = datetime.timedelta(hours=1)
+
+
+class TestValidateFeps(object):
+
+    FIRES = [
+        # (ignition start, ignition end, fire type, moisture category, code)
+        (None, None, 'rx', 'dry', validation.OK),
+        (S - ONE_HOUR, None, 'rx', 'dry', validation.INVALID_IGNITION_START_TIME),
+        (None, E + ONE_HOUR, 'rx', 'dry', validation.INVALID_IGNITION_END_TIME),
+        (S + 5 * ONE_HOUR, S + 4 * ONE_HOUR, 'wf', 'dry',
+            validation.INVALID_IGNITION_TIMES),
+        (S + 2 * ONE_HOUR, S + 4 * ONE_HOUR, 'WF', 'Moist', validation.OK),
+        (None, None, 'foo', 'dry', validation.INVALID_FIRE_TYPE),
+        (None, None, 'rx', 'soggy', validation.INVALID_MOISTURE_CATEGORY),
+        (None, None, 'rx', MoistureCategory('wet'), validation.OK),
+        # only the first error is reported
+        (S - ONE_HOUR, None, 'foo', 'soggy',
+            validation.INVALID_IGNITION_START_TIME)
+    ]
+
+    def _validate(self, **kwargs):
+        return validation.validate_feps([S] * len(self.FIRES),
+            [E] * len(self.FIRES),
+            local_ignition_start_times=[f[0] for f in self.FIRES],
+            local_ignition_end_times=[f[1] for f in self.FIRES],
+            fire_types=[f[2] for f in self.FIRES],
+            moisture_categories=[f[3] for f in self.FIRES], **kwargs)
+
+    def test_codes(self):
+        result = self._validate()
+        expected = [f[4] for f in self.FIRES]
+        assert result.codes.tolist() == expected
+        assert_array_equal(result.valid, np.array(expected) == validation.OK)
+        assert result.num_invalid == 6
+        assert result.summary == {
+            'invalid_ignition_start_time': 2,
+            'invalid_ignition_end_time': 1,
+            'invalid_ignition_times': 1,
+            'invalid_fire_type': 1,
+            'invalid_moisture_category': 1
+        }
+
+    def test_agrees_with_batch_profiler(self):
+        result = self._validate()
+        for i, (ig_start, ig_end, fire_type, moisture_category, _) in enumerate(
+                self.FIRES):
+            kwargs = dict(local_ignition_start_times=[ig_start],
+                local_ignition_end_times=[ig_end], fire_types=[fire_type],
+                moisture_categories=[moisture_category])
+            if result.valid[i]:
+                FepsBatchProfiler([S], [E], **kwargs)
+            else:
+                with raises(ValueError):
+                    FepsBatchProfiler([S], [E], **kwargs)
+
+    def test_errors(self):
+        result = self._validate()
+        errors = result.errors
+        assert [e.index for e in errors] == [1, 2, 3, 5, 6, 8]
+        assert errors[0] == validation.ValidationError(1,
+            validation.INVALID_IGNITION_START_TIME,
+            "Ignition start time - 2019-01-01T05:00:00.000000 - isn't within"
+            " start / end times - 2019-01-01T06:00:00.000000 /"
+            " 2019-01-02T06:00:00.000000")
+        assert errors[3].message == (
+            "Invalid fire type: 'foo'.  Valid: 'rx', 'wf'")
+        assert errors[4].message == "Invalid moisture category: soggy"
+        assert result.get_error(0) is None
+
+    def test_invalid_start_end_times(self):
+        result = validation.validate_feps([S, E, S],
+            [E, S, np.datetime64('NaT', 'us')])
+        assert result.codes.tolist() == [validation.OK,
+            validation.INVALID_START_END_TIMES, validation.INVALID_START_END_TIMES]
+        assert result.errors[0].message == ("The fire's start time,"
+            " 2019-01-02T06:00:00.000000, is not before its end time,"
+            " 2019-01-01T06:00:00.000000")
+
+    def test_empty_default_ignition_window(self):
+        start = datetime.datetime(2020, 1, 2, 8, 17)
+        end = datetime.datetime(2020, 1, 2, 8, 55)
+        result = validation.validate_feps([start, S], [end, E])
+        assert result.codes.tolist() == [validation.INVALID_IGNITION_TIMES,
+            validation.OK]
+        assert result.errors[0].message == ("The fire's ignition start time,"
+            " 2020-01-02T09:00:00.000000, is not before its end time,"
+            " 2020-01-02T08:55:00.000000")
+
+        # The valid fires are profiled without NaNs
+        batch = FepsBatchProfiler(**result.inputs)
+        for k in batch.FIELDS:
+            assert np.isfinite(batch.hourly_fractions[k]).all()
+
+        # Windows with ignition times given are fine
+        assert validation.validate_feps([start], [end],
+            local_ignition_start_times=[start]).codes.tolist() == [
+            validation.OK]
+
+    def test_shared_values(self):
+        assert validation.validate_feps([S, S], [E, E], fire_types='WF',
+            moisture_categories='dry').codes.tolist() == [0, 0]
+        result = validation.validate_feps([S, S], [E, E],
+            moisture_categories='soggy')
+        assert result.summary == {'invalid_moisture_category': 2}
+        assert result.inputs['moisture_categories'] == 'soggy'
+
+    def test_inputs(self):
+        num_fires = len(self.FIRES)
+        hourly_rh = np.tile(np.arange(30.0, 54.0), (num_fires, 1))
+        result = self._validate(duff_fuel_loads=np.arange(num_fires),
+            relative_humidities=hourly_rh, relative_humidity_lag=0)
+        valid = result.valid
+        inputs = result.inputs
+        assert_array_equal(inputs['duff_fuel_loads'], np.flatnonzero(valid))
+        assert inputs['relative_humidities'].shape == (3, 24)
+        assert inputs['relative_humidity_lag'] == 0
+        assert inputs['fire_types'].tolist() == ['rx', 'wf', 'rx']
+
+        batch = FepsBatchProfiler(**inputs)
+        expected = FepsBatchProfiler([S] * 3, [E] * 3,
+            local_ignition_start_times=[None, S + 2 * ONE_HOUR, None],
+            local_ignition_end_times=[None, S + 4 * ONE_HOUR, None],
+            fire_types=['rx', 'wf', 'rx'],
+            moisture_categories=['dry', 'moist', MoistureCategory('wet')],
+            duff_fuel_loads=[0, 4, 7], relative_humidities=hourly_rh[:3])
+        for k in batch.FIELDS:
+            assert_array_equal(batch.hourly_fractions[k],
+                expected.hourly_fractions[k])
+
+    def test_wrong_number_of_values(self):
+        with raises(ValueError) as e_info:
+            validation.validate_feps([S, S], [E, E], fire_types=['rx'] * 3)
+        assert e_info.value.args[0] == "Expected 2 fire type values; got 3"
+
+
+class TestValidateStatic(object):
+
+    DEFAULT = StaticTimeProfiler.DEFAULT_DAILY_HOURLY_FRACTIONS
+    INVALID = {p: [1 / 23.0] * 23 for p in StaticTimeProfiler.FIELDS}
+
+    def test_times(self):
+        result = validation.validate_static([S, E], [E, S])
+        assert result.codes.tolist() == [validation.OK,
+            validation.INVALID_START_END_TIMES]
+        assert list(result.inputs) == ['local_start_times', 'local_end_times']
+        StaticBatchProfiler(**result.inputs)
+
+    def test_hourly_fractions_tables(self):
+        tables = [self.INVALID, self.DEFAULT, HourlyFractionSet(self.DEFAULT),
+            {p: self.DEFAULT[p] for p in StaticTimeProfiler.FIELDS[:2]}]
+        groups = [0, 1, 2, 3, 4, 2]
+        result = validation.validate_static([S] * 6, [E] * 6,
+            hourly_fractions=tables, groups=groups)
+        assert result.codes.tolist() == [validation.INVALID_HOURLY_FRACTIONS,
+            validation.OK, validation.OK, validation.INVALID_HOURLY_FRACTIONS,
+            validation.INVALID_GROUP, validation.OK]
+        assert result.errors[2].message == ("Invalid group: 4.  Groups must"
+            " be indices into the 4 hourly fractions tables")
+
+        # invalid tables are dropped
+        inputs = result.inputs
+        assert len(inputs['hourly_fractions']) == 2
+        assert inputs['groups'].tolist() == [0, 1, 1]
+        batch = StaticBatchProfiler(**inputs)
+        expected = StaticBatchProfiler([S] * 3, [E] * 3)
+        for k in batch.FIELDS:
+            assert_array_equal(batch.hourly_fractions[k],
+                expected.hourly_fractions[k])
+
+    def test_shared_table(self):
+        result = validation.validate_static([S, S], [E, E],
+            hourly_fractions=self.INVALID)
+        assert result.summary == {'invalid_hourly_fractions': 2}
+        assert not result.valid.any()
@@ -0,0 +1,171 @@
+import datetime
+
+import numpy as np
+from numpy.testing import assert_allclose, assert_array_equal
+from pytest import importorskip, raises
+
+from timeprofile.feps import FepsTimeProfiler, FepsBatchProfiler
+from timeprofile.static import StaticTimeProfiler
+from timeprofile.writers import (
+    ArrowWriter,
+    NpyProfiles,
+    NpyWriter,
+    get_index_path
+)
+
+FIELDS = FepsTimeProfiler.FIELDS
+
+S = datetime.datetime(2015, 1, 1, 6, 30)
+E = datetime.datetime(2015, 1, 2, 9, 15)
+
+
+def make_batch():
+    starts = [S, S + datetime.timedelta(hours=5)]
+    ends = [E, E + datetime.timedelta(days=2)]
+    return FepsBatchProfiler(starts, ends, fire_types=['rx', 'wf'])
+
+
+class TestNpyWriter(object):
+
+    def test_write_and_read(self, tmpdir):
+        path = str(tmpdir.join('profiles.npy'))
+        feps = FepsTimeProfiler(S, E, dtype='float32')
+        static = StaticTimeProfiler(S, E)
+        batch = make_batch()
+        with NpyWriter(path) as writer:
+            writer.write('a', feps)
+            writer.write('b', static)
+            writer.write_batch(batch, ids=['c', 'd'])
+
+        profiles = NpyProfiles(path)
+        assert isinstance(profiles.values, np.memmap)
+        assert len(profiles) == 4
+        assert profiles.ids.tolist() == ['a', 'b', 'c', 'd']
+        assert profiles.num_hours.tolist() == [28, 28, 28, 71]
+        assert profiles.offsets.tolist() == [0, 28, 56, 84]
+        assert profiles.values.shape == (155, 4)
+        assert profiles.first_hours[0] == np.datetime64('2015-01-01T06', 'h')
+        assert profiles.get_hours(3)[-1] == np.datetime64('2015-01-04T09', 'h')
+
+        for i, k in enumerate(FIELDS):
+            assert_allclose(profiles[0][:, i], feps.hourly_fractions[k], rtol=1e-7)
+            assert_allclose(profiles[1][:, i], static.hourly_fractions[k])
+            assert_allclose(profiles[profiles.find('d')][:, i],
+                batch.get_hourly_fractions(1)[k])
+
+        # readable with np.memmap given the header size
+        values = np.load(path)
+        offset = np.lib.format.open_memmap(path, mode='r').offset
+        memmap = np.memmap(path, dtype='float64', mode='r', offset=offset,
+            shape=values.shape)
+        assert_array_equal(memmap[84:], values[84:])
+
+    def test_default_ids(self, tmpdir):
+        path = str(tmpdir.join('profiles'))
+        with NpyWriter(path, dtype='float32') as writer:
+            writer.write_batch(make_batch())
+            writer.write_batch(make_batch())
+        assert get_index_path(path) == path + '.index.npz'
+        profiles = NpyProfiles(path)
+        assert profiles.values.dtype == np.float32
+        assert profiles.ids.tolist() == [0, 1, 2, 3]
+        with raises(KeyError):
+            profiles.find(4)
+
+    def test_invalid_ids(self, tmpdir):
+        with NpyWriter(str(tmpdir.join('profiles.npy'))) as writer:
+            with raises(ValueError) as e_info:
+                writer.write_batch(make_batch(), ids=['a'])
+        assert e_info.value.args[0] == "Expected 2 ids; got 1"
+
+        # mixed, missing, and inconsistent id types
+        for ids in ([1, 'a'], [None, 'a'], [1.5, 2.5]):
+            with NpyWriter(str(tmpdir.join('profiles.npy'))) as writer:
+                with raises(ValueError) as e_info:
+                    writer.write_batch(make_batch(), ids=ids)
+            assert e_info.value.args[0].startswith("Invalid fire ids: ")
+        with NpyWriter(str(tmpdir.join('profiles.npy'))) as writer:
+            with raises(ValueError):
+                writer.write(None, StaticTimeProfiler(S, E))
+            writer.write('a', StaticTimeProfiler(S, E))
+            with raises(ValueError):
+                writer.write(1, StaticTimeProfiler(S, E))
+
+    def test_integer_ids(self, tmpdir):
+        path = str(tmpdir.join('profiles.npy'))
+        with NpyWriter(path) as writer:
+            writer.write(7, StaticTimeProfiler(S, E))
+            writer.write_batch(make_batch(), ids=[np.int32(8), 9])
+        profiles = NpyProfiles(path)
+        assert profiles.ids.dtype == np.int64
+        assert profiles.find(9) == 2
+
+    def test_sparse(self, tmpdir):
+        path = str(tmpdir.join('profiles.npy'))
+        feps = FepsTimeProfiler(S, E)
+        expected = dict(feps.hourly_fractions)
+        hourly_fractions = feps.sparsify(1e-12)
+        begin, end = hourly_fractions.span
+        with NpyWriter(path) as writer:
+            writer.write('a', feps)
+
+        profiles = NpyProfiles(path)
+        assert profiles.num_hours.tolist() == [end - begin]
+        assert profiles.first_hours[0] == (np.datetime64('2015-01-01T06', 'h')
+            + np.timedelta64(begin, 'h'))
+        for i, k in enumerate(FIELDS):
+            assert_allclose(profiles[0][:, i], expected[k][begin:end],
+                rtol=1e-9, atol=1e-12)
+
+    def test_timezone_aware(self, tmpdir):
+        path = str(tmpdir.join('profiles.npy'))
+        tz = datetime.timezone(datetime.timedelta(hours=-7))
+        with NpyWriter(path) as writer:
+            writer.write('a', StaticTimeProfiler(S.replace(tzinfo=tz),
+                E.replace(tzinfo=tz)))
+        # first hours are local wall time
+        profiles = NpyProfiles(path)
+        assert profiles.first_hours[0] == np.datetime64('2015-01-01T06', 'h')
+
+    def test_sub_hourly(self, tmpdir):
+        profiler = StaticTimeProfiler(S, E,
+            resolution=datetime.timedelta(minutes=15))
+        with NpyWriter(str(tmpdir.join('profiles.npy'))) as writer:
+            with raises(ValueError) as e_info:
+                writer.write('a', profiler)
+        assert e_info.value.args[0] == (
+            "Only hourly profiles can be written; got resolution 0:15:00")
+
+
+class TestArrowWriter(object):
+
+    def test_ipc_and_parquet(self, tmpdir):
+        pyarrow = importorskip('pyarrow')
+        import pyarrow.parquet
+
+        batch = make_batch()
+        feps = FepsTimeProfiler(S, E)
+        for file_format in ArrowWriter.FORMATS:
+            path = str(tmpdir.join('profiles.' + file_format))
+            with ArrowWriter(path, file_format=file_format) as writer:
+                writer.write('a', feps)
+                writer.write_batch(batch, ids=['b', 'c'])
+
+            if file_format == 'ipc':
+                table = pyarrow.ipc.open_file(path).read_all()
+            else:
+                table = pyarrow.parquet.read_table(path)
+            assert table.column_names == ['id', 'hour'] + FIELDS
+            assert table.num_rows == 28 * 2 + 71
+            ids = np.array(table.column('id').to_pylist())
+            hours = table.column('hour').to_pylist()
+            assert hours[28] == datetime.datetime(2015, 1, 1, 6)
+            assert hours[-1] == datetime.datetime(2015, 1, 4, 9)
+            assert_allclose(np.array(table.column('residual'))[ids == 'c'],
+                batch.get_hourly_fractions(1)['residual'])
+
+    def test_invalid_format(self, tmpdir):
+        importorskip('pyarrow')
+        with raises(ValueError) as e_info:
+            ArrowWriter(str(tmpdir.join('profiles')), file_format='csv')
+        assert e_info.value.args[0] == "Invalid format: 'csv'.  Valid: 'ipc', 'parquet'"
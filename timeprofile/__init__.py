@@ -1,12 +1,18 @@
 __author__      = "Joel Dubowy"
 
-__version_info__ = (2,0,0)
+__version_info__ = (2,1,0)
 __version__ = '.'.join([str(n) for n in __version_info__])
 
 import datetime
+import types
+
+import numpy as np
+
+from .fractions import HourlyFractions, SparseHourlyFractions
 
 __all__ = [
     'BaseTimeProfiler',
+    'BaseBatchTimeProfiler',
     'InvalidStartEndTimesError'
 ]
 
@@ -15,9 +21,140 @@ class InvalidStartEndTimesError(ValueError):
 
 class BaseTimeProfiler(object):
 
+    __slots__ = ('_hourly_fractions', '_dtype', '_resolution')
+
     ONE_HOUR = datetime.timedelta(hours=1)
     FIELDS = ['area_fraction', 'flaming', 'smoldering', 'residual']
 
+    # Number of hours computed at a time when streaming tuples
+    STREAM_CHUNK_SIZE = 24
+
+    @property
+    def hourly_fractions(self):
+        return self._hourly_fractions
+
+    @property
+    def resolution(self):
+        """Length of each of the profile's steps; one hour unless a
+        sub-hourly resolution was specified
+        """
+        return self._resolution
+
+    def sparsify(self, epsilon=0.0, renormalize=True):
+        """Replaces the hourly fractions, in place, with a
+        SparseHourlyFractions object, trimming each phase's leading and
+        trailing values at or below epsilon, and returns it.  See
+        SparseHourlyFractions.from_dict.
+        """
+        if self._is_read_only():
+            raise ValueError("Can't sparsify a read-only profiler")
+        self._hourly_fractions = SparseHourlyFractions.from_dict(
+            self.hourly_fractions, epsilon=epsilon, renormalize=renormalize,
+            phases=self.FIELDS, dtype=self._dtype or 'float64')
+        return self._hourly_fractions
+
+    def iter_hourly_fractions(self, chunk_size=None):
+        """Streams the profile, without materializing hourly_fractions.
+
+        Yields (hour, area_fraction, flaming, smoldering, residual) tuples,
+        one per hour.  If chunk_size is specified, each tuple instead holds
+        arrays covering up to chunk_size hours, with hours as datetime64[h].
+        Memory use is independent of the length of the activity window.
+
+        With a sub-hourly resolution, there's one tuple (or array element)
+        per step, and times are datetime64[m] (or [s], if the resolution
+        isn't a whole number of minutes).
+        """
+        if chunk_size is None:
+            return self._iter_tuples()
+        if chunk_size < 1:
+            raise ValueError("Invalid chunk size: {}".format(chunk_size))
+        return self._iter_chunks(chunk_size)
+
+    def _iter_tuples(self):
+        for chunk in self._iter_chunks(self.STREAM_CHUNK_SIZE):
+            yield from zip(*[c.tolist() for c in chunk])
+
+    def _iter_chunks(self, chunk_size):
+        raise NotImplementedError
+
+    def _count_hours(self):
+        """Number of hours in the profile, for instrumentation"""
+        return self._compute_num_hours()
+
+    def _set_dtype(self, dtype):
+        if dtype is not None and np.dtype(dtype).name not in HourlyFractions.DTYPES:
+            raise ValueError("Invalid dtype: '{}'.  Valid: '{}'".format(
+                dtype, "', '".join(HourlyFractions.DTYPES)))
+
+        self._dtype = dtype
+
+    def _set_resolution(self, resolution):
+        resolution = self.ONE_HOUR if resolution is None else resolution
+        if (not isinstance(resolution, datetime.timedelta)
+                or resolution <= datetime.timedelta(0)
+                or resolution.microseconds or self.ONE_HOUR % resolution):
+            raise ValueError(("Invalid resolution: {}.  Must be a whole "
+                "number of seconds that evenly divides one hour").format(
+                resolution))
+
+        self._resolution = resolution
+
+    def _is_read_only(self):
+        """Returns True if the hourly fractions are read-only (e.g. shared
+        by timeprofile.cache, or sparse)
+        """
+        hourly_fractions = self._hourly_fractions
+        return (isinstance(hourly_fractions, types.MappingProxyType)
+            or getattr(hourly_fractions, 'frozen', False))
+
+    def _freeze(self):
+        """Replaces the hourly fractions with read-only copies, for
+        profilers whose results are shared (see timeprofile.cache)
+        """
+        if isinstance(self.hourly_fractions, (HourlyFractions,
+                SparseHourlyFractions)):
+            self._hourly_fractions.freeze()
+            return
+
+        self._hourly_fractions = types.MappingProxyType(
+            {k: tuple(v) for k, v in self.hourly_fractions.items()})
+
+    ## Time helpers
+    # Profiles are computed with times represented as seconds, or hour
+    # indices, relative to the first hour; datetime objects are only
+    # created at the API boundary
+
+    @staticmethod
+    def _floor_hour(t):
+        return t.replace(minute=0, second=0, microsecond=0)
+
+    def _floor_step(self, t):
+        """Returns the start of the step, of length resolution, that
+        contains t
+        """
+        hour = self._floor_hour(t)
+        if self._resolution == self.ONE_HOUR:
+            return hour
+        return hour + ((t - hour) // self._resolution) * self._resolution
+
+    def _step_times(self, first_step, steps):
+        """Returns the start times of the given step indices, as
+        datetime64[h] for hourly profiles, or else in minutes or seconds.
+        datetime64 has no time zones, so times are local wall times (numpy
+        would convert time zone aware times to UTC).
+        """
+        first_step = first_step.replace(tzinfo=None)
+        if self._resolution == self.ONE_HOUR:
+            return np.datetime64(first_step, 'h') + steps
+        unit = 's' if self._resolution.seconds % 60 else 'm'
+        return np.datetime64(first_step, unit) + steps * np.timedelta64(
+            self._resolution).astype('timedelta64[{}]'.format(unit))
+
+    def _to_seconds(self, t, first_hour):
+        """Returns the number of seconds from first_hour to t"""
+        return (t - first_hour).total_seconds()
+
     def _validate_start_end_times(self, local_start_time, local_end_time,
             time_qualifier=""):
         """Raises an InvalidStartEndTimesError exception if times are invalid.
@@ -27,3 +164,84 @@ class BaseTimeProfiler(object):
             raise InvalidStartEndTimesError("The fire's {} start time, {},"
                 " is not before its end time, {}".format(time_qualifier,
                 local_start_time.isoformat(), local_end_time.isoformat()))
+
+
+class BaseBatchTimeProfiler(object):
+    """Base class for profilers that compute hourly fractions for many
+    fires at once.
+
+    Inputs are columns, with one value per fire or a single value for all
+    fires.  Results are stored as (num_fires, num_hours) arrays, where
+    num_hours is the length of the longest fire's profile; shorter profiles
+    are padded with zeros.
+    """
+
+    ONE_HOUR = np.timedelta64(1, 'h')
+    FIELDS = BaseTimeProfiler.FIELDS
+
+    @property
+    def num_fires(self):
+        return len(self._start)
+
+    @property
+    def first_hour(self):
+        """Hour of each fire's first hourly fraction, as datetime64[h]"""
+        return self._start.astype('datetime64[h]')
+
+    @property
+    def num_hours(self):
+        """Number of hours in each fire's profile"""
+        return self._num_hours
+
+    @property
+    def hourly_fractions(self):
+        """Dict of (num_fires, num_hours) arrays, keyed by phase"""
+        return self._hourly_fractions
+
+    def get_hourly_fractions(self, i):
+        """Returns fire i's hourly fractions, in the same form as the
+        corresponding single fire profiler's hourly_fractions
+        """
+        n = self._num_hours[i]
+        return {k: v[i, :n].tolist() for k, v in self._hourly_fractions.items()}
+
+    def get_sparse_hourly_fractions(self, i, epsilon=0.0, renormalize=True):
+        """Returns fire i's hourly fractions as a SparseHourlyFractions
+        object (see SparseHourlyFractions.from_dict)
+        """
+        n = self._num_hours[i]
+        return SparseHourlyFractions.from_dict(
+            {k: v[i, :n] for k, v in self._hourly_fractions.items()},
+            epsilon=epsilon, renormalize=renormalize, phases=self.FIELDS)
+
+    def _count_hours(self):
+        """Total number of fire hours, for instrumentation"""
+        num_hours = getattr(self, '_num_hours', None)
+        return 0 if num_hours is None else int(num_hours.sum())
+
+    def _column(self, values, dtype, label):
+        column = np.asarray(values, dtype=dtype)
+        if column.ndim == 0:
+            column = np.full(self.num_fires, column)
+        elif column.shape != (self.num_fires,):
+            raise ValueError("Expected {} {} values; got {}".format(
+                self.num_fires, label, len(column)))
+        return column
+
+    def _time_column(self, values, label):
+        return self._column(values, 'datetime64[us]', label)
+
+    def _raise_first(self, invalid, exc_class, msg, *columns):
+        i = np.flatnonzero(invalid)[0]
+        raise exc_class(("Fire {}: " + msg).format(i, *[c[i] for c in columns]))
+
+    def _validate_start_end_times(self, local_start_times, local_end_times,
+            time_qualifier=""):
+        """Raises an InvalidStartEndTimesError exception for the first fire
+        with invalid times.
+        """
+        invalid = ~(local_start_times < local_end_times)
+        if invalid.any():
+            self._raise_first(invalid, InvalidStartEndTimesError,
+                "The fire's " + time_qualifier + " start time, {}, is not"
+                " before its end time, {}", local_start_times, local_end_times)
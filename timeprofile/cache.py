@@ -0,0 +1,224 @@
+"""timeprofile.cache
+
+Memoizing profiler factory.  Fires that share the same activity window and
+inputs share a single profiler, whose hourly fractions are read-only.
+
+    from timeprofile import cache
+
+    profiler = cache.get_profiler('feps', local_start_time, local_end_time,
+        fire_type='rx')
+    profiler.hourly_fractions['flaming']
+
+Cache size is bounded by number of entries and/or by an estimate of the
+memory used by the cached profilers.  Hit, miss, and eviction counts are
+available via get_stats.
+"""
+
+import collections
+import inspect
+import sys
+import threading
+
+import numpy as np
+
+from .feps import DEFAULT_PARAMETERS, FepsTimeProfiler, MoistureCategory
+from .fractions import HourlyFractions, SparseHourlyFractions
+from .static import HourlyFractionSet, StaticTimeProfiler
+
+__all__ = [
+    'MODELS',
+    'CacheStats',
+    'LRUCache',
+    'ProfilerCache',
+    'get_profiler',
+    'get_stats',
+    'configure',
+    'clear'
+]
+
+MODELS = {
+    'feps': FepsTimeProfiler,
+    'static': StaticTimeProfiler
+}
+
+CacheStats = collections.namedtuple('CacheStats', ['hits', 'misses',
+    'evictions', 'entries', 'bytes', 'max_entries', 'max_bytes'])
+
+
+class LRUCache(object):
+    """Thread-safe least-recently-used cache, bounded by number of entries
+    and/or total size of the cached values.
+    """
+
+    def __init__(self, max_entries=1024, max_bytes=None):
+        """LRUCache constructor
+
+        kwargs:
+         - max_entries -- maximum number of cached values; None for no limit
+         - max_bytes -- maximum total size of cached values, as
+           estimated by _sizeof; None for no limit
+        """
+        self._lock = threading.Lock()
+        self._entries = collections.OrderedDict()
+        self._bytes = 0
+        self._hits = self._misses = self._evictions = 0
+        self.configure(max_entries=max_entries, max_bytes=max_bytes)
+
+    def configure(self, max_entries=None, max_bytes=None):
+        """Sets new size limits, evicting entries as necessary"""
+        with self._lock:
+            self._max_entries = max_entries
+            self._max_bytes = max_bytes
+            self._evict()
+
+    def get_stats(self):
+        with self._lock:
+            return CacheStats(self._hits, self._misses, self._evictions,
+                len(self._entries), self._bytes, self._max_entries,
+                self._max_bytes)
+
+    def clear(self):
+        """Removes all entries and resets stats"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self._hits = self._misses = self._evictions = 0
+
+    def get(self, key, compute):
+        """Returns the value cached under key, calling compute() to create
+        it if it's not already cached.
+        """
+        with self._lock:
+            if key in self._entries:
+                self._hits += 1
+                self._entries.move_to_end(key)
+                return self._entries[key][0]
+            self._misses += 1
+
+        # compute outside of the lock, so that other threads aren't blocked
+        value = compute()
+        size = self._sizeof(value)
+
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = (value, size)
+                self._bytes += size
+                self._evict()
+            return value
+
+    def _evict(self):
+        # Must be called with self._lock held
+        while self._entries and (
+                (self._max_entries is not None
+                    and len(self._entries) > self._max_entries)
+                or (self._max_bytes is not None
+                    and self._bytes > self._max_bytes)):
+            _, (_, size) = self._entries.popitem(last=False)
+            self._bytes -= size
+            self._evictions += 1
+
+    def _sizeof(self, value):
+        return sys.getsizeof(value)
+
+
+class ProfilerCache(LRUCache):
+    """Cache of FepsTimeProfiler and StaticTimeProfiler objects, keyed on
+    canonicalized constructor arguments.
+    """
+
+    FLOAT_SIZE = sys.getsizeof(0.0)
+
+    def get_profiler(self, model, *args, **kwargs):
+        """Returns a shared, read-only profiler for the given model
+        ('feps' or 'static') and constructor arguments.
+        """
+        profiler_class = self._get_profiler_class(model)
+        key = self._canonicalize(profiler_class, args, kwargs)
+        return self.get(key,
+            lambda: self._create_profiler(profiler_class, args, kwargs))
+
+    def _get_profiler_class(self, model):
+        if model in MODELS.values():
+            return model
+        if model not in MODELS:
+            raise ValueError("Invalid model: '{}'.  Valid: '{}'".format(
+                model, "', '".join(MODELS)))
+        return MODELS[model]
+
+    def _create_profiler(self, profiler_class, args, kwargs):
+        profiler = profiler_class(*args, **kwargs)
+        profiler._freeze()
+        return profiler
+
+    def _canonicalize(self, profiler_class, args, kwargs):
+        """Returns a hashable key that's the same for all sets of arguments
+        that result in the same profile (e.g. 'RX' and 'rx', or None and
+        the default value)
+        """
+        bound = inspect.signature(profiler_class).bind(*args, **kwargs)
+        bound.apply_defaults()
+        canonicalize = (self._canonicalize_feps_arg
+            if profiler_class is FepsTimeProfiler
+            else self._canonicalize_static_arg)
+        return (profiler_class.__name__,) + tuple(
+            (k, canonicalize(k, v)) for k, v in bound.arguments.items())
+
+    def _canonicalize_feps_arg(self, k, v):
+        if k in FepsTimeProfiler.INPUT_DEFAULTS:
+            if v is not None and len(np.shape(v)):
+                # hourly values
+                return tuple(float(e) for e in v)
+            return float(FepsTimeProfiler.INPUT_DEFAULTS[k] if v is None else v)
+        if k == 'fire_type':
+            return v.lower()
+        if k == 'parameters':
+            return v or DEFAULT_PARAMETERS
+        if k == 'resolution':
+            return FepsTimeProfiler.ONE_HOUR if v is None else v
+        if k == 'moisture_category':
+            if isinstance(v, MoistureCategory):
+                return tuple(sorted(v.factors.items()))
+            return tuple(sorted(MoistureCategory(v).factors.items()))
+        return v
+
+    def _canonicalize_static_arg(self, k, v):
+        if k == 'hourly_fractions':
+            if not v or v is StaticTimeProfiler.DEFAULT_DAILY_HOURLY_FRACTIONS:
+                return None
+            if isinstance(v, HourlyFractionSet):
+                return v.key
+            return tuple((p, tuple(v[p]) if p in v else None)
+                for p in StaticTimeProfiler.FIELDS)
+        if k == 'resolution':
+            return StaticTimeProfiler.ONE_HOUR if v is None else v
+        return v
+
+    def _sizeof(self, profiler):
+        size = sys.getsizeof(profiler)
+        if isinstance(profiler.hourly_fractions, (HourlyFractions,
+                SparseHourlyFractions)):
+            return size + profiler.hourly_fractions.nbytes
+        for v in profiler.hourly_fractions.values():
+            size += sys.getsizeof(v) + len(v) * self.FLOAT_SIZE
+        return size
+
+
+## Module level cache
+
+_cache = ProfilerCache()
+
+def get_profiler(model, *args, **kwargs):
+    """Returns a shared, read-only profiler from the module level cache.
+    See ProfilerCache.get_profiler
+    """
+    return _cache.get_profiler(model, *args, **kwargs)
+
+def get_stats():
+    return _cache.get_stats()
+
+def configure(max_entries=None, max_bytes=None):
+    """Sets the module level cache's size limits; None for no limit"""
+    _cache.configure(max_entries=max_entries, max_bytes=max_bytes)
+
+def clear():
+    _cache.clear()
@@ -0,0 +1,250 @@
+"""timeprofile.cli
+
+The timeprofile console script, which streams fire records in from CSV or
+JSONL, profiles them, and streams hourly fractions out as CSV or JSONL.
+
+Each input record holds a fire's profiler constructor kwargs (e.g.
+local_start_time, local_end_time, fire_type), with times in ISO 8601
+format.  Other fields are ignored, except for the id field, which is
+copied to the output.  Records are read, profiled, and written in batches,
+so that memory use doesn't grow with the number of fires.  Records that
+can't be parsed or profiled are logged, with their 0-based index, and
+skipped; the exit status is 1 if any were skipped.
+"""
+
+import argparse
+import contextlib
+import csv
+import datetime
+import inspect
+import itertools
+import json
+import logging
+import os
+import sys
+
+from .cache import MODELS
+from .feps import FepsTimeProfiler
+from .parallel import profile_many
+
+__all__ = [
+    'main'
+]
+
+FORMATS = ('csv', 'jsonl')
+LAYOUTS = ('hourly', 'fire')
+
+TIME_FIELDS = ('local_start_time', 'local_end_time',
+    'local_ignition_start_time', 'local_ignition_end_time')
+
+# Errors raised by profilers for invalid fire inputs (e.g. division by zero
+# for an empty ignition window)
+PROFILE_ERRORS = (ValueError, TypeError, ArithmeticError)
+
+# Profiler kwargs that aren't fire inputs
+OPTION_FIELDS = ('engine', 'eager', 'dtype', 'parameters', 'resolution')
+
+EXAMPLES_STRING = """
+Examples:
+
+    timeprofile -i fires.csv -o hourly-fractions.csv
+
+    cat fires.jsonl | timeprofile -m static --input-format jsonl \\
+        --output-format jsonl --layout fire
+
+    timeprofile -i fires.csv -o hourly-fractions.jsonl -w 8 -b 50000
+
+ """
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog='timeprofile')
+    parser.add_argument('-i', '--input', default='-',
+        help="input file; default '-' (stdin)")
+    parser.add_argument('-o', '--output', default='-',
+        help="output file; default '-' (stdout)")
+    parser.add_argument('--input-format', choices=FORMATS,
+        help="default inferred from input file extension, else 'csv'")
+    parser.add_argument('--output-format', choices=FORMATS,
+        help="default inferred from output file extension, else 'csv'")
+    parser.add_argument('-m', '--model', choices=list(MODELS), default='feps',
+        help="default 'feps'")
+    parser.add_argument('-l', '--layout', choices=LAYOUTS, default='hourly',
+        help="'hourly' for one row per fire hour, or 'fire' for one row per"
+        " fire; default 'hourly'")
+    parser.add_argument('--id-field', default='id',
+        help="input field to copy to output rows; default 'id'.  Records"
+        " without it are identified by their 0-based index")
+    parser.add_argument('-w', '--workers', type=int, default=1,
+        help="number of worker processes; default 1")
+    parser.add_argument('-b', '--batch-size', type=int, default=10000,
+        help="number of fires read, profiled, and written at a time;"
+        " default 10000")
+    parser.add_argument('--log-level', default='WARNING',
+        help="default WARNING")
+
+    parser.epilog = EXAMPLES_STRING
+    parser.formatter_class = argparse.RawTextHelpFormatter
+
+    args = parser.parse_args(argv)
+    args.input_format = args.input_format or _infer_format(args.input)
+    args.output_format = args.output_format or _infer_format(args.output)
+
+    logging.basicConfig(level=getattr(logging, args.log_level.upper()),
+        format='%(asctime)s %(levelname)s: %(message)s')
+
+    return args
+
+def _infer_format(path):
+    ext = os.path.splitext(path)[1].lower()
+    return 'jsonl' if ext in ('.jsonl', '.json') else 'csv'
+
+
+## Input
+
+def read_records(f, input_format):
+    """Yields fire records, as dicts"""
+    if input_format == 'csv':
+        yield from csv.DictReader(f)
+    else:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+def parse_record(record, model):
+    """Converts a record to profiler constructor kwargs"""
+    parameters = inspect.signature(MODELS[model]).parameters
+    kwargs = {}
+    for k, v in record.items():
+        if k not in parameters or k in OPTION_FIELDS or v in ('', None):
+            continue
+        if k in TIME_FIELDS:
+            v = datetime.datetime.fromisoformat(v)
+        elif k in FepsTimeProfiler.INPUT_DEFAULTS:
+            # hourly values are JSON encoded lists in CSV cells
+            if isinstance(v, str) and v.lstrip().startswith('['):
+                v = json.loads(v)
+            v = [float(e) for e in v] if isinstance(v, list) else float(v)
+        elif k == 'relative_humidity_lag':
+            v = int(v)
+        elif k == 'hourly_fractions' and isinstance(v, str):
+            v = json.loads(v)
+        kwargs[k] = v
+    return kwargs
+
+
+## Output
+
+class RowWriter(object):
+
+    PHASES = FepsTimeProfiler.FIELDS
+
+    def __init__(self, f, output_format, layout):
+        self._layout = layout
+        self._output_format = output_format
+        if layout == 'hourly':
+            fieldnames = ['id', 'hour'] + self.PHASES
+        else:
+            fieldnames = ['id', 'start_hour', 'num_hours'] + self.PHASES
+
+        if output_format == 'csv':
+            writer = csv.DictWriter(f, fieldnames, lineterminator='\n')
+            writer.writeheader()
+            self._write = writer.writerow
+        else:
+            self._write = lambda row: f.write(json.dumps(row) + '\n')
+
+    def write(self, fire_id, first_hour, hourly_fractions):
+        if self._layout == 'hourly':
+            for i, values in enumerate(zip(*[hourly_fractions[p]
+                    for p in self.PHASES])):
+                hour = first_hour + datetime.timedelta(hours=i)
+                row = {'id': fire_id, 'hour': hour.isoformat()}
+                row.update(zip(self.PHASES, values))
+                self._write(row)
+
+        else:
+            row = {'id': fire_id, 'start_hour': first_hour.isoformat(),
+                'num_hours': len(hourly_fractions[self.PHASES[0]])}
+            for p in self.PHASES:
+                # CSV cells hold JSON encoded lists
+                row[p] = (json.dumps(list(hourly_fractions[p]))
+                    if self._output_format == 'csv'
+                    else list(hourly_fractions[p]))
+            self._write(row)
+
+
+## Main
+
+@contextlib.contextmanager
+def _open(path, mode, stdio):
+    if path == '-':
+        yield stdio
+    else:
+        with open(path, mode, newline='') as f:
+            yield f
+
+def run(args):
+    """Profiles and writes each record, skipping (and logging) records that
+    can't be parsed or profiled.  Returns the number of skipped records.
+    """
+    num_skipped = 0
+    with _open(args.input, 'r', sys.stdin) as f_in, \
+            _open(args.output, 'w', sys.stdout) as f_out:
+        writer = RowWriter(f_out, args.output_format, args.layout)
+        records = enumerate(read_records(f_in, args.input_format))
+        while True:
+            batch = list(itertools.islice(records, args.batch_size))
+            if not batch:
+                break
+
+            parsed = []
+            for i, record in batch:
+                try:
+                    parsed.append((i, record, parse_record(record, args.model)))
+                except (ValueError, TypeError) as e:
+                    _log_skipped(i, e)
+                    num_skipped += 1
+
+            for (i, record, fire), hourly_fractions in zip(parsed,
+                    _profile_batch(parsed, args)):
+                if hourly_fractions is None:
+                    num_skipped += 1
+                    continue
+                first_hour = fire['local_start_time'].replace(minute=0,
+                    second=0, microsecond=0)
+                writer.write(record.get(args.id_field, i), first_hour,
+                    hourly_fractions)
+
+            logging.info("Profiled %s fires", batch[-1][0] + 1)
+
+    return num_skipped
+
+def _profile_batch(parsed, args):
+    """Returns each parsed record's hourly fractions, or None for records
+    that fail
+    """
+    results = profile_many([fire for _, _, fire in parsed],
+        model=args.model, workers=args.workers, return_errors=True)
+    for n, ((i, _, _), result) in enumerate(zip(parsed, results)):
+        if isinstance(result, Exception):
+            if not isinstance(result, PROFILE_ERRORS):
+                raise result
+            _log_skipped(i, result)
+            results[n] = None
+    return results
+
+def _log_skipped(i, e):
+    logging.error("Record %s: %s", i, e or e.__class__.__name__)
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        num_skipped = run(args)
+    except (ValueError, OSError) as e:
+        logging.error(e)
+        sys.exit(1)
+    if num_skipped:
+        logging.error("Skipped %s invalid record(s)", num_skipped)
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,236 @@
+"""timeprofile.ensemble
+
+FEPS profiles of a single activity window under every combination of
+values in grids of fire inputs, e.g. for uncertainty runs.
+
+    from timeprofile.ensemble import FepsEnsemble
+
+    ensemble = FepsEnsemble(local_start_time, local_end_time,
+        fire_type=['rx', 'wf'],
+        moisture_category=MoistureCategory.CATEGORIES,
+        relative_humidity=[30, 50, 70],
+        duff_moisture_content=range(40, 200, 20))
+    ensemble.hourly_fractions  # (num_members, 4, num_hours) array
+    ensemble.members[i]  # member i's grid values
+    ensemble.get_hourly_fractions(i)
+
+Any of FepsTimeProfiler's fire inputs, including ignition times, may be
+given as a sequence of values, which makes it an axis of the grid.  Other
+inputs are shared by all members.  Members are ordered as by
+itertools.product over the grid axes, in the order given, so that
+
+    ensemble.hourly_fractions.reshape(ensemble.shape + (4, num_hours))
+
+is indexed by grid position.
+
+Area fractions are computed once per distinct ignition window and fire
+type.  Since the normalized recurrence of each phase doesn't depend on
+the phase's (scalar) coefficient, the recurrences are computed once per
+distinct area fractions and decay, in one fused pass, and broadcast to the
+members.  As with FepsTimeProfiler's numpy engine, members whose
+coefficient is zero (e.g. wind speed below U_b) get NaN hourly fractions.
+"""
+
+import itertools
+
+import numpy as np
+
+from . import BaseTimeProfiler
+from .feps import (
+    DEFAULT_PARAMETERS,
+    FepsTimeProfiler,
+    MoistureCategory,
+    _compute_recurrence_parameters,
+    _compute_smoldering_adjustment,
+    _filter_blocks
+)
+from .fractions import HourlyFractions
+from .instrumentation import stage
+
+__all__ = [
+    'FepsEnsemble'
+]
+
+# Inputs that can be varied across members
+INPUTS = ('local_ignition_start_time', 'local_ignition_end_time',
+    'fire_type', 'moisture_category') + tuple(FepsTimeProfiler.INPUT_DEFAULTS)
+
+
+class FepsEnsemble(object):
+
+    FIELDS = BaseTimeProfiler.FIELDS
+
+    def __init__(self, local_start_time, local_end_time, parameters=None,
+            dtype='float64', **inputs):
+        """FepsEnsemble constructor
+
+        args:
+         - local_start_time, local_end_time -- the activity window
+
+        kwargs:
+         - parameters -- FepsParameters object, shared by all members
+         - dtype -- 'float64' or 'float32'
+         - any of FepsTimeProfiler's fire inputs, each either a single
+           value or a sequence of values (a grid axis)
+        """
+        invalid = sorted(set(inputs) - set(INPUTS))
+        if invalid:
+            raise ValueError("Invalid ensemble input(s): {}".format(
+                ', '.join(invalid)))
+        if np.dtype(dtype).name not in HourlyFractions.DTYPES:
+            raise ValueError("Invalid dtype: '{}'.  Valid: '{}'".format(
+                dtype, "', '".join(HourlyFractions.DTYPES)))
+
+        self._start = local_start_time
+        self._end = local_end_time
+        self._parameters = parameters or DEFAULT_PARAMETERS
+        self._grid = {k: list(v) for k, v in inputs.items() if _is_grid(v)}
+        self._members = [dict(zip(self._grid, values))
+            for values in itertools.product(*self._grid.values())]
+
+        columns = {k: [m.get(k, inputs.get(k)) for m in self._members]
+            for k in INPUTS}
+        self._compute_hourly_fractions(columns, dtype)
+
+    @property
+    def start(self):
+        return self._start
+
+    @property
+    def end(self):
+        return self._end
+
+    @property
+    def start_hour(self):
+        return self._start.replace(minute=0, second=0, microsecond=0)
+
+    @property
+    def num_hours(self):
+        return self._hourly_fractions.shape[2]
+
+    @property
+    def num_members(self):
+        return len(self._members)
+
+    @property
+    def grid(self):
+        """Dict of input name to the sequence of values it takes"""
+        return dict(self._grid)
+
+    @property
+    def shape(self):
+        return tuple(len(v) for v in self._grid.values())
+
+    @property
+    def members(self):
+        """Each member's grid values, as a list of dicts"""
+        return self._members
+
+    @property
+    def hourly_fractions(self):
+        """(num_members, 4, num_hours) array, with phases in FIELDS order"""
+        return self._hourly_fractions
+
+    def get_hourly_fractions(self, i):
+        """Returns member i's hourly fractions, in the same form as the
+        corresponding FepsTimeProfiler's hourly_fractions
+        """
+        return dict(zip(self.FIELDS, self._hourly_fractions[i].tolist()))
+
+
+    ## Computations
+
+    def _count_hours(self):
+        """Total number of member hours, for instrumentation"""
+        hourly_fractions = getattr(self, '_hourly_fractions', None)
+        return 0 if hourly_fractions is None else (
+            hourly_fractions.shape[0] * hourly_fractions.shape[2])
+
+    @stage
+    def _compute_hourly_fractions(self, columns, dtype):
+        area_fractions, area_index = self._compute_area_fractions(columns)
+
+        numeric = {k: np.array([default if v is None else v
+            for v in columns[k]], dtype=float)
+            for k, default in FepsTimeProfiler.INPUT_DEFAULTS.items()}
+        duff_factors = {}
+        duff_moisture_category_factor = []
+        for m in columns['moisture_category']:
+            m = m or 'moderate'
+            key = m.lower() if isinstance(m, str) else id(m)
+            if key not in duff_factors:
+                duff_factors[key] = (m if isinstance(m, MoistureCategory)
+                    else MoistureCategory(m))['duff']
+            duff_moisture_category_factor.append(duff_factors[key])
+
+        phases = _compute_recurrence_parameters(self._parameters,
+            numeric['total_above_ground_consumption'],
+            numeric['total_below_ground_consumption'],
+            numeric['duff_fuel_load'], numeric['duff_moisture_content'],
+            np.array(duff_moisture_category_factor),
+            _compute_smoldering_adjustment(self._parameters,
+                numeric['wind_speed'], numeric['relative_humidity']))
+
+        # One recurrence per distinct (area fractions, decay) pair
+        rows = []
+        row_indices = []
+        for coefficient, decay in phases:
+            keys = np.column_stack([area_index,
+                np.broadcast_to(decay, area_index.shape)])
+            unique, inverse = np.unique(keys, axis=0, return_inverse=True)
+            row_indices.append(len(rows) + inverse.ravel())
+            rows.extend(unique.tolist())
+
+        num_members = len(area_index)
+        hourly_fractions = np.empty((num_members, len(self.FIELDS),
+            area_fractions.shape[1]), dtype=dtype)
+        hourly_fractions[:, 0] = area_fractions[area_index]
+        if rows:
+            y, _ = _filter_blocks(area_fractions[[int(k) for k, _ in rows]],
+                [d for _, d in rows])
+            y /= y.sum(axis=1, keepdims=True)
+            for i, ((coefficient, _), indices) in enumerate(zip(phases,
+                    row_indices)):
+                hourly_fractions[:, i + 1] = y[indices]
+                invalid = ~np.isfinite(coefficient) | (coefficient == 0)
+                hourly_fractions[invalid, i + 1] = np.nan
+
+        self._hourly_fractions = hourly_fractions
+
+    def _compute_area_fractions(self, columns):
+        """Returns the distinct area fractions, as a (num_distinct,
+        num_hours) array, and each member's index into it
+        """
+        ignition_times = {}
+        indices = {}
+        area_fractions = []
+        area_index = []
+        for ig_start, ig_end, fire_type in zip(
+                columns['local_ignition_start_time'],
+                columns['local_ignition_end_time'], columns['fire_type']):
+            if (ig_start, ig_end) not in ignition_times:
+                ignition_times[(ig_start, ig_end)] = (
+                    FepsTimeProfiler.get_ignition_times(self._start,
+                        self._end, ig_start, ig_end))
+            key = ignition_times[(ig_start, ig_end)] + (
+                (fire_type or 'rx').lower(),)
+            if key not in indices:
+                profiler = FepsTimeProfiler(self._start, self._end, key[0],
+                    key[1], fire_type=key[2], engine='numpy',
+                    parameters=self._parameters)
+                profiler._compute_area_fractions()
+                indices[key] = len(area_fractions)
+                area_fractions.append(profiler._area_fractions)
+            area_index.append(indices[key])
+
+        if not area_fractions:
+            # an empty grid axis; just validate the window and get its length
+            num_hours = FepsTimeProfiler(self._start,
+                self._end)._compute_num_hours()
+            return np.empty((0, num_hours)), np.array([], dtype=int)
+
+        return np.array(area_fractions), np.array(area_index)
+
+
+def _is_grid(value):
+    return isinstance(value, (list, tuple, range, np.ndarray))
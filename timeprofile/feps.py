@@ -8,8 +8,10 @@ Notes on modifications made to the equstions in Anderson et. al.:
 
  - The equations for consumption rate in Anderson et. al. use total consumption,
    which FepsTimeProfiler does not use.  Any consumption value is replaced by 1.
- - For computing smoldering adjustment, FepsTimeProfiler takes a single
-   relative humidity value, rather than hourly values.
+ - For computing smoldering adjustment, FepsTimeProfiler takes either a
+   single relative humidity value or hourly values.  Hourly values are
+   used as is unless a lag is specified (Anderson et. al. use relative
+   humidity 4 hours before the current hour).
  - FepsTimeProfiler assumes the following defaults not specified in
    Anderson et. al.
     - relative humidity = 65
@@ -21,16 +23,31 @@ Notes on modifications made to the equstions in Anderson et. al.:
    activity end time FepsTimeProfiler simply cuts the tail end.
    It's up to the user to specify a large enough activity window to avoid
    cutting off a significant portion of the graph (e.g. midnight to midnight
-   for a 9am-12pm ignition).
+   for a 9am-12pm ignition), or to use FepsTimeProfiler.from_ignition,
+   which picks the end time at which the tails fall below a tolerance.
 """
 
+import collections
 import datetime
+import functools
+import hashlib
+import itertools
 import math
+import struct
 
-from . import BaseTimeProfiler, InvalidStartEndTimesError
+import numpy as np
+
+from . import (
+    BaseTimeProfiler,
+    BaseBatchTimeProfiler,
+    InvalidStartEndTimesError
+)
+from .fractions import HourlyFractions, LazyHourlyFractions
+from .instrumentation import stage
 
 __all__ = [
-    'FireType', 'MoistureCategory', 'FepsTimeProfiler'
+    'FireType', 'MoistureCategory', 'FepsParameters', 'RecurrenceState',
+    'FepsTimeProfiler', 'FepsBatchProfiler'
 ]
 
 
@@ -78,42 +95,214 @@ class MoistureCategory(object):
         return d[k]
 
 
+class FepsParameters(object):
+    """FEPS model coefficients, along with the constants derived from them.
+
+    Derived constants are computed once, on construction - or, for those
+    that depend on duff moisture content or moisture category, once per
+    value, on first use - so that a single instance can be shared by any
+    number of profilers.  Instances are read-only.
+
+        parameters = FepsParameters(U_b=4, K_RDR=10)
+        FepsTimeProfiler(start, end, parameters=parameters)
+        FepsBatchProfiler(start_times, end_times, parameters=parameters)
+    """
+
+    # Coefficients and their default values
+    COEFFICIENTS = {
+        # for smoldiering adjustment
+        'U_b': 3,
+        'RH_b': 60,
+
+        # for computing flaming phase consumption
+        'K_CAG': 0.5,
+        'K_CBG': 0.2,
+
+        # for flaming fractions
+        'K_AGI': 1,
+        'C_TI': 10,
+        'K_TFLAM1': 4 / 3,
+        'K_TFLAM2': 8,
+        'N_TFLAM': 0.5,
+        'B_f': 20,
+
+        # For short term smoldering
+        'K_EDR1': 8 / 3,
+        'K_EDR2': 8,
+        'N_EDR': 0.5,
+        'B_STS': 12,
+
+        # For long term smoldering
+        'K_LTI': 1,
+        'M_DBM': 130,
+        'K_RDR': 12
+    }
+
+    # Constants derived from the coefficients (see __init__)
+    DERIVED = ('D_f', 'TFLAM', 'DECAY_f', 'D_STS', 'EDR', 'DECAY_STS')
+
+    # Maximum number of duff moisture contents for which long term
+    # smoldering constants are cached
+    MAX_CACHED_DUFF_MOISTURE_CONTENTS = 4096
+
+    __slots__ = tuple(COEFFICIENTS) + DERIVED + ('_rdr_divisor',
+        '_lts_constants', '_duff_consumption_percentages', '_fingerprint')
+
+    def __init__(self, **coefficients):
+        invalid = sorted(set(coefficients) - set(self.COEFFICIENTS))
+        if invalid:
+            raise ValueError("Invalid FEPS parameter(s): {}".format(
+                ', '.join(invalid)))
+
+        set_ = functools.partial(object.__setattr__, self)
+        for k, default in self.COEFFICIENTS.items():
+            v = coefficients.get(k)
+            set_(k, default if v is None else v)
+
+        # Consumption values are replaced by 1 (see module docstring), so
+        # these no longer depend on the fire
+        set_('D_f', math.sqrt(1 / self.B_f))
+        set_('TFLAM', self.K_TFLAM1 * self.K_TFLAM2
+            * math.pow(self.D_f, self.N_TFLAM) / 60)
+        set_('DECAY_f', 1 / math.pow(math.e, (1 / self.TFLAM)))
+        set_('D_STS', 1 / self.B_STS)
+        set_('EDR', self.K_EDR1 * self.K_EDR2
+            * math.pow(self.D_STS, self.N_EDR) / 60)
+        set_('DECAY_STS', 1 / math.pow(math.e, (1 / self.EDR)))
+
+        set_('_rdr_divisor', (1 - math.pow(math.e, -1)) * 100)
+        set_('_lts_constants', {})
+        set_('_duff_consumption_percentages', {})
+        set_('_fingerprint', None)
+
+    @property
+    def coefficients(self):
+        return {k: getattr(self, k) for k in self.COEFFICIENTS}
+
+    @property
+    def fingerprint(self):
+        """64 bit digest of the coefficients which, unlike hash(), is the
+        same in every process (e.g. for tagging serialized profiles)
+        """
+        if self._fingerprint is None:
+            packed = struct.pack('<{}d'.format(len(self.COEFFICIENTS)),
+                *self.coefficients.values())
+            object.__setattr__(self, '_fingerprint', int.from_bytes(
+                hashlib.blake2b(packed, digest_size=8).digest(), 'little'))
+        return self._fingerprint
+
+    @property
+    def constants(self):
+        """Coefficients and derived constants"""
+        constants = self.coefficients
+        constants.update((k, getattr(self, k)) for k in self.DERIVED)
+        return constants
+
+    def get_lts_constants(self, duff_moisture_content):
+        """Returns long term smoldering involvement, Inv_LTS, and decay,
+        Decay_l, for the given duff moisture content, computing them on
+        first use.  (see FepsTimeProfiler._compute_long_term_smoldering)
+        """
+        constants = self._lts_constants.get(duff_moisture_content)
+        if constants is None:
+            if len(self._lts_constants) >= self.MAX_CACHED_DUFF_MOISTURE_CONTENTS:
+                self._lts_constants.clear()
+            constants = tuple(float(v) for v in
+                self.compute_lts_constants(duff_moisture_content))
+            self._lts_constants[duff_moisture_content] = constants
+        return constants
+
+    def compute_lts_constants(self, duff_moisture_contents):
+        """Array version of get_lts_constants, without caching"""
+        inv_lts = 100 / np.power(math.e, self.K_LTI * (
+            duff_moisture_contents / self.M_DBM))
+        rdr = (self.K_RDR * inv_lts) / self._rdr_divisor
+        decay_l = 1 / np.power(math.e, 1 / rdr)
+        return inv_lts, decay_l
+
+    def get_duff_consumption_percentage(self, duff_moisture_factor):
+        """Returns the percentage of duff consumed, LC_D, for a moisture
+        category's duff factor, computing it on first use
+        """
+        percentage = self._duff_consumption_percentages.get(duff_moisture_factor)
+        if percentage is None:
+            percentage = float(self.compute_duff_consumption_percentages(
+                duff_moisture_factor))
+            self._duff_consumption_percentages[duff_moisture_factor] = percentage
+        return percentage
+
+    def compute_duff_consumption_percentages(self, duff_moisture_factors):
+        """Array version of get_duff_consumption_percentage, without
+        caching
+        """
+        return 100 * np.power(1 - math.pow(math.e, -1), duff_moisture_factors)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("FepsParameters are read-only")
+
+    def __eq__(self, other):
+        return (isinstance(other, FepsParameters)
+            and self.coefficients == other.coefficients)
+
+    def __hash__(self):
+        return hash(tuple(self.coefficients.items()))
+
+    def __reduce__(self):
+        return (functools.partial(FepsParameters, **self.coefficients), ())
+
+    def __repr__(self):
+        return "FepsParameters({})".format(', '.join(
+            '{}={!r}'.format(k, v) for k, v in self.coefficients.items()))
+
+DEFAULT_PARAMETERS = FepsParameters()
+
+
+class RecurrenceState(collections.namedtuple('RecurrenceState',
+        ['num_hours', 'decays', 'last_values', 'totals'])):
+    """State of the flaming, smoldering, and residual recurrences at the
+    end of a profile: the number of hours, and each phase's decay, last
+    (unnormalized) value, and total of all (unnormalized) values.  Values
+    are plain floats, so that states can be serialized (e.g. as JSON).
+
+    Since area fractions are zero once ignition is over, a profile that
+    ends after ignition can be extended from its state alone (see
+    advance).  One that ends during ignition can't, since the new hours
+    have area fractions of their own.
+    """
+
+    __slots__ = ()
+
+    def advance(self, num_hours):
+        """Returns the recurrences' unnormalized values for the next
+        num_hours hours, as a (3, num_hours) array, and the state after
+        those hours.  Dividing the values by the new state's totals
+        normalizes them; multiplying the previous hours' normalized values
+        by the ratio of old to new totals renormalizes them.
+        """
+        decays = np.array(self.decays, dtype=float)[:, np.newaxis]
+        values = (np.array(self.last_values, dtype=float)[:, np.newaxis]
+            * np.power(decays, np.arange(1, num_hours + 1)))
+        last_values = (tuple(values[:, -1].tolist()) if num_hours
+            else tuple(self.last_values))
+        totals = (np.array(self.totals, dtype=float) + values.sum(axis=1))
+        return values, RecurrenceState(self.num_hours + num_hours,
+            tuple(self.decays), last_values, tuple(totals.tolist()))
+
+
 class FepsTimeProfiler(BaseTimeProfiler):
 
+    __slots__ = ('_start', '_end', '_ig_start', '_ig_end', '_fire_type',
+        '_moisture_category_factors', '_engine', '_duff_fuel_load',
+        '_total_above_ground_consumption', '_total_below_ground_consumption',
+        '_relative_humidity', '_wind_speed', '_duff_moisture_content',
+        '_total_consumption', '_area_fractions', '_inv_f', '_c_f', '_c_sts',
+        '_smoldering_adjustment', '_parameters', '_recurrence_state')
+
     ## Constants
 
-    # for smoldiering adjustment
-    U_b = 3  # TODO: allow user to provide custom val
-    RH_b = 60  # TODO: allow user to provide custom val
-
-    # for computing flaming phase consumption
-    K_CAG = 0.5  # TODO: allow user to provide custom val
-    K_CBG = 0.2  # TODO: allow user to provide custom val
-
-    # for flaming fractions
-    K_AGI = 1  # TODO: allow user to provide custom val
-    C_TI = 10  # TODO: allow user to provide custom val
-    K_TFLAM1 = 4 / 3  # TODO: allow user to provide custom val
-    K_TFLAM2 = 8  # TODO: allow user to provide custom val
-    N_TFLAM = 0.5  # TODO: allow user to provide custom val
-    B_f = 20  # TODO: allow user to provide custom val
-    D_f = math.sqrt(1/B_f)
-    TFLAM = K_TFLAM1 * K_TFLAM2 * math.pow(D_f, N_TFLAM) / 60
-    DECAY_f = 1 / math.pow(math.e, (1/TFLAM))
-
-    # For short term smoldering
-    K_EDR1 = 8 / 3  # TODO: allow user to provide custom val
-    K_EDR2 = 8  # TODO: allow user to provide custom val
-    N_EDR = 0.5  # TODO: allow user to provide custom val
-    B_STS = 12  # TODO: allow user to provide custom val
-    D_STS = 1 / B_STS
-    EDR = K_EDR1 * K_EDR2 * math.pow(D_STS, N_EDR) / 60
-    DECAY_STS = 1 / math.pow(math.e, (1/EDR))
-
-    # For long term smoldering
-    K_LTI = 1  # TODO: allow user to provide custom val
-    M_DBM = 130  # TODO: allow user to provide custom val
-    K_RDR = 12  # TODO: allow user to provide custom val
+    # Default model coefficients, and the constants derived from them.
+    # To use other values, pass in a FepsParameters object.
+    locals().update(DEFAULT_PARAMETERS.constants)
 
     ## Defaults for input fields
 
@@ -124,7 +313,44 @@ class FepsTimeProfiler(BaseTimeProfiler):
         "total_below_ground_consumption": 1,
         "relative_humidity": 65,
         "wind_speed": 5,
-        "duff_moisture_content": M_DBM
+        "duff_moisture_content": DEFAULT_PARAMETERS.M_DBM
+    }
+
+    # Default fraction of each phase's total that an adaptive window
+    # (see from_ignition) may cut off
+    ADAPTIVE_TOLERANCE = 1e-6
+
+    ## Computation engines
+
+    # 'python' steps through the hours one at a time; 'numpy' computes
+    # area fractions with array operations and all three phase recurrences
+    # in one fused pass (see _fused_recurrences)
+    ENGINES = ('python', 'numpy')
+
+    # Intermediate values needed for each phase, mapped to the methods
+    # that compute them, in the order that they need to be computed
+    PHASE_DEPENDENCIES = {
+        'area_fraction': [
+            ('_area_fractions', '_compute_area_fractions')
+        ],
+        'flaming': [
+            ('_area_fractions', '_compute_area_fractions'),
+            ('_inv_f', '_compute_flaming_phase_involvementolvement'),
+            ('_c_f', '_compute_flaming_phase_consumption')
+        ],
+        'smoldering': [
+            ('_area_fractions', '_compute_area_fractions'),
+            ('_inv_f', '_compute_flaming_phase_involvementolvement'),
+            ('_c_f', '_compute_flaming_phase_consumption'),
+            ('_c_sts', '_compute_sts_phase_consumption'),
+            ('_smoldering_adjustment', '_compute_smoldering_adjustment')
+        ],
+        'residual': [
+            ('_area_fractions', '_compute_area_fractions'),
+            ('_c_f', '_compute_flaming_phase_consumption'),
+            ('_c_sts', '_compute_sts_phase_consumption'),
+            ('_smoldering_adjustment', '_compute_smoldering_adjustment')
+        ]
     }
 
     # TODO: do we need fire_type?  can be inferred as rx if ignition times
@@ -140,22 +366,72 @@ class FepsTimeProfiler(BaseTimeProfiler):
             moisture_category='moderate',
             relative_humidity=None,
             wind_speed=None,
-            duff_moisture_content=None):
-
+            duff_moisture_content=None,
+            relative_humidity_lag=0,
+            engine='python',
+            eager=False,
+            dtype=None,
+            parameters=None,
+            resolution=None):
+        """FepsTimeProfiler constructor
+
+        relative_humidity and wind_speed may each be a single value or a
+        sequence of hourly values, starting at the first hour of the
+        activity window.  Hourly relative humidity values may include
+        relative_humidity_lag hours of history before the first hour;
+        otherwise, the first hour's value is used for the hours before it.
+
+        kwargs (in addition to fire inputs):
+         - relative_humidity_lag -- number of hours by which relative
+           humidity lags the hour it's applied to (e.g. 4, as in Anderson
+           et. al.)
+         - engine -- 'python' or 'numpy'; see ENGINES
+         - eager -- if True, compute all phases' hourly fractions up front,
+           and store them in a plain dict.  Otherwise, hourly_fractions is
+           a LazyHourlyFractions mapping, which computes each phase (and
+           the intermediate values it needs) when first accessed.
+         - dtype -- if specified ('float64' or 'float32'), hourly fractions
+           are stored in an array backed HourlyFractions object, which is
+           lazy unless eager is True
+         - parameters -- FepsParameters object; defaults to the
+           coefficients defined as constants, above
+         - resolution -- timedelta that evenly divides one hour (e.g. 15
+           minutes); defaults to one hour.  With a sub-hourly resolution,
+           the profile has one value per step, starting at the step
+           containing local_start_time, and each phase's decay is rescaled
+           to the step length (i.e. decay^(resolution / 1 hour)).  Hourly
+           relative humidity and wind speed values apply to all of the
+           hour's steps.
+        """
+        self._parameters = parameters or DEFAULT_PARAMETERS
+        self._set_resolution(resolution)
         self._set_times(local_start_time, local_end_time,
             local_ignition_start_time, local_ignition_end_time)
 
         self._set_fire_type(fire_type)
         self._set_moisture_category_factors(moisture_category)
+        self._set_engine(engine)
+        self._set_dtype(dtype)
 
         for k in self.INPUT_DEFAULTS:
             val = locals().get(k)
             val = val if val is not None else self.INPUT_DEFAULTS[k]
             setattr(self, '_' + k, val)
+        self._set_hourly_meteorology(relative_humidity_lag)
 
         self._total_consumption = (self._total_above_ground_consumption +
             self._total_below_ground_consumption)
 
+        if not eager:
+            if self._dtype:
+                self._hourly_fractions = HourlyFractions(self.FIELDS,
+                    self._compute_num_hours(), dtype=self._dtype,
+                    compute=self._compute_phase)
+            else:
+                self._hourly_fractions = LazyHourlyFractions(self.FIELDS,
+                    self._compute_phase)
+            return
+
         # fire type only comes into play for computing area fractions
         self._compute_area_fractions()
         self._compute_flaming_phase_involvementolvement()
@@ -183,9 +459,202 @@ class FepsTimeProfiler(BaseTimeProfiler):
     def ignition_end(self):
         return self._ig_end
 
-    @property
-    def hourly_fractions(self):
-        return self._hourly_fractions
+    @classmethod
+    def get_ignition_times(cls, local_start_time, local_end_time,
+            local_ignition_start_time=None, local_ignition_end_time=None):
+        """Validates the activity window and ignition times, and returns
+        the ignition start and end times that a profiler would use, without
+        computing the profile.
+        """
+        profiler = cls.__new__(cls)
+        profiler._set_times(local_start_time, local_end_time,
+            local_ignition_start_time, local_ignition_end_time)
+        return profiler._ig_start, profiler._ig_end
+
+    @classmethod
+    def get_adaptive_end_time(cls, local_ignition_start_time,
+            local_ignition_end_time, tolerance=ADAPTIVE_TOLERANCE,
+            local_start_time=None, fire_type=FireType.RX,
+            duff_moisture_content=None, parameters=None):
+        """Returns the earliest whole hour end time at which the mass that
+        each phase has left after the end of the activity window is at most
+        tolerance times the phase's total.
+
+        After ignition's last hour L, phase values decay as y_L * d^k, so
+        the mass left after a window of n hours is y_L * d^(n-L) / (1 - d),
+        while the total is sum_j(c * a_j) / (1 - d), i.e. 1 / (1 - d) since
+        area fractions sum to 1 (and the coefficient c cancels).  The number
+        of hours is the smallest n for which y_L * d^(n-L) <= tolerance,
+        over all three phases' decays.
+
+        local_start_time defaults to the ignition start time.
+        """
+        if not tolerance > 0:
+            raise ValueError("Invalid tolerance: {}".format(tolerance))
+
+        profiler = cls.__new__(cls)
+        start = local_start_time or local_ignition_start_time
+        profiler._validate_start_end_times(local_ignition_start_time,
+            local_ignition_end_time, time_qualifier="ignition")
+        profiler._validate_ignition_time(local_ignition_start_time, start,
+            local_ignition_end_time, "start")
+        profiler._start = start
+        profiler._ig_start = local_ignition_start_time
+        profiler._ig_end = local_ignition_end_time
+        profiler._set_fire_type(fire_type)
+        profiler._set_resolution(None)
+        profiler._parameters = parameters or DEFAULT_PARAMETERS
+        profiler._duff_moisture_content = (cls.INPUT_DEFAULTS[
+            'duff_moisture_content'] if duff_moisture_content is None
+            else duff_moisture_content)
+
+        first_hour = profiler._first_hour()
+        b = math.floor((profiler._ig_start - first_hour) / cls.ONE_HOUR)
+        e = math.ceil((profiler._ig_end - first_hour) / cls.ONE_HOUR)
+        area_fractions = profiler._compute_area_fraction_range(b, e)
+        num_hours = e
+        for decay in profiler._get_decays():
+            # last value, y_L, of y_i = a_i + y_i-1 * d
+            last_value = (area_fractions
+                * np.power(decay, np.arange(e - b - 1, -1, -1))).sum()
+            if 0 < decay and tolerance < last_value:
+                num_hours = max(num_hours, e - 1 + math.ceil(
+                    math.log(tolerance / last_value) / math.log(decay)))
+
+        return first_hour + num_hours * cls.ONE_HOUR
+
+    @classmethod
+    def from_ignition(cls, local_ignition_start_time, local_ignition_end_time,
+            tolerance=ADAPTIVE_TOLERANCE, local_start_time=None, **kwargs):
+        """Returns a profiler whose activity window ends once all phases'
+        tails fall below the tolerance (see get_adaptive_end_time).  The
+        chosen end time is the profiler's end.  kwargs are passed to the
+        constructor; hourly relative humidity and wind speed aren't
+        supported, since the number of hours isn't known in advance.
+        """
+        start = local_start_time or local_ignition_start_time
+        end = cls.get_adaptive_end_time(local_ignition_start_time,
+            local_ignition_end_time, tolerance=tolerance,
+            local_start_time=start, fire_type=kwargs.get('fire_type', FireType.RX),
+            duff_moisture_content=kwargs.get('duff_moisture_content'),
+            parameters=kwargs.get('parameters'))
+        return cls(start, end, local_ignition_start_time,
+            local_ignition_end_time, **kwargs)
+
+    def get_recurrence_state(self):
+        """Returns the RecurrenceState at the end of the profile, scaled so
+        that values are in units of the normalized hourly fractions (i.e.
+        with totals of 1, up to rounding).  Computes all phases.
+        """
+        return self._get_recurrence_state(self._get_phase_arrays())
+
+    def _get_recurrence_state(self, values):
+        state = getattr(self, '_recurrence_state', None)
+        if state is not None:
+            return state
+
+        return RecurrenceState(self._compute_num_hours(),
+            self._get_decays(),
+            tuple(float(values[p][-1]) for p in self.FIELDS[1:]),
+            tuple(float(values[p].sum()) for p in self.FIELDS[1:]))
+
+    def extend(self, local_end_time):
+        """Extends the activity window, in place, to a later end time.
+
+        The result is the profile of a profiler with the new end time and
+        this profiler's ignition times.  If ignition ends within the
+        original window, the recurrences just decay over the new hours, so
+        only those hours are computed, and the previous hours are
+        renormalized using the recurrences' totals (see RecurrenceState).
+        Otherwise (e.g. if the default three hour ignition window runs past
+        the original end), the profile is recomputed from scratch.
+        """
+        hourly_fractions = self._hourly_fractions
+        if self._is_read_only():
+            raise ValueError("Can't extend a read-only profiler")
+        if local_end_time <= self._end:
+            raise ValueError(("New end time - {} - isn't after end time - "
+                "{}").format(local_end_time, self._end))
+        if self._ig_end > self._end:
+            return self._recompute(local_end_time)
+
+        # Phases are extended together, so finish computing any that a
+        # lazy profiler has started on
+        computed = (hourly_fractions.computed
+            if isinstance(hourly_fractions, (LazyHourlyFractions,
+                HourlyFractions))
+            else self.FIELDS)
+        values = self._get_phase_arrays() if computed else None
+        state = self._get_recurrence_state(values) if computed else None
+
+        num_hours = self._compute_num_hours()
+        self._end = local_end_time
+        new_num_hours = self._compute_num_hours()
+        self._pad_hourly_values(new_num_hours - num_hours)
+
+        if not computed:
+            if isinstance(hourly_fractions, HourlyFractions):
+                self._hourly_fractions = HourlyFractions(self.FIELDS,
+                    new_num_hours, dtype=self._dtype, compute=self._compute_phase)
+            return
+
+        new_values, new_state = state.advance(new_num_hours - num_hours)
+        totals = np.array(new_state.totals)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            scale = np.array(state.totals) / totals
+            new_values /= totals[:, np.newaxis]
+        values = {
+            'area_fraction': np.concatenate([values['area_fraction'],
+                np.zeros(new_num_hours - num_hours)]),
+            **{p: np.concatenate([values[p] * scale[i], new_values[i]])
+                for i, p in enumerate(self.FIELDS[1:])}
+        }
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self._recurrence_state = new_state._replace(
+                last_values=tuple((np.array(new_state.last_values)
+                    / totals).tolist()),
+                totals=tuple((totals / totals).tolist()))
+
+        if isinstance(hourly_fractions, HourlyFractions):
+            self._hourly_fractions = HourlyFractions.from_dict(values,
+                phases=self.FIELDS, dtype=self._dtype)
+        elif isinstance(hourly_fractions, LazyHourlyFractions):
+            self._hourly_fractions = LazyHourlyFractions(self.FIELDS,
+                self._compute_phase, values=values)
+        else:
+            self._hourly_fractions = {p: values[p].tolist()
+                for p in self.FIELDS}
+
+    def _recompute(self, local_end_time):
+        """Recomputes the profile with a new end time, keeping
+        hourly_fractions in the same form (plain dict, LazyHourlyFractions,
+        or lazy or fully computed HourlyFractions)
+        """
+        hourly_fractions = self._hourly_fractions
+        num_hours = self._compute_num_hours()
+        self._end = local_end_time
+        new_num_hours = self._compute_num_hours()
+        self._pad_hourly_values(new_num_hours - num_hours)
+        for attr in ('_area_fractions', '_recurrence_state'):
+            if hasattr(self, attr):
+                delattr(self, attr)
+
+        if isinstance(hourly_fractions, HourlyFractions):
+            if len(hourly_fractions.computed) < len(self.FIELDS):
+                self._hourly_fractions = HourlyFractions(self.FIELDS,
+                    new_num_hours, dtype=self._dtype,
+                    compute=self._compute_phase)
+                return
+        elif isinstance(hourly_fractions, LazyHourlyFractions):
+            self._hourly_fractions = LazyHourlyFractions(self.FIELDS,
+                self._compute_phase)
+            return
+
+        for phase in self.FIELDS:
+            for attr, method in self.PHASE_DEPENDENCIES[phase]:
+                if not hasattr(self, attr):
+                    getattr(self, method)()
+        self._compute_hourly_fractions()
 
 
     ## Initialization
@@ -195,6 +664,7 @@ class FepsTimeProfiler(BaseTimeProfiler):
             raise ValueError(("Ignition {} time - {} - isn't within start "
                 "/ end times - {} / {}").format(identifier, t, start, end))
 
+    @stage
     def _set_times(self, start, end, ig_start, ig_end):
         # Makes sure start < end
         self._validate_start_end_times(start, end)
@@ -230,11 +700,12 @@ class FepsTimeProfiler(BaseTimeProfiler):
             self._ig_start = max(start_9am, start)
             self._ig_end = self._ig_start + 3*self.ONE_HOUR
 
-            # shift
-            while (self._ig_end > self._end
-                    and (self._ig_start - self.ONE_HOUR) >= self._start):
-                self._ig_start -= self.ONE_HOUR
-                self._ig_end -= self.ONE_HOUR
+            # shift back by whole hours, as far as needed to end by the
+            # end time, but without starting before the start time
+            num_hours = max(0, min(-((self._end - self._ig_end) // self.ONE_HOUR),
+                (self._ig_start - self._start) // self.ONE_HOUR))
+            self._ig_start -= num_hours * self.ONE_HOUR
+            self._ig_end -= num_hours * self.ONE_HOUR
 
             # shrink
             self._ig_end  = min(self._ig_end, self._end)
@@ -255,6 +726,41 @@ class FepsTimeProfiler(BaseTimeProfiler):
             self._moisture_category_factors = MoistureCategory(
                 moisture_category)
 
+    def _set_hourly_meteorology(self, relative_humidity_lag):
+        """Converts hourly relative humidity and wind speed values, if
+        given, to arrays with one value per hour of the activity window
+        """
+        if relative_humidity_lag < 0:
+            raise ValueError("Invalid relative humidity lag: {}".format(
+                relative_humidity_lag))
+
+        num_hours = math.ceil((self._end - self._floor_hour(self._start))
+            / self.ONE_HOUR)
+        if np.ndim(self._relative_humidity):
+            self._relative_humidity = self._expand_hours(_hourly_series(
+                self._relative_humidity, num_hours, relative_humidity_lag,
+                'relative humidity'))
+        if np.ndim(self._wind_speed):
+            self._wind_speed = self._expand_hours(_hourly_series(
+                self._wind_speed, num_hours, 0, 'wind speed'))
+
+    def _expand_hours(self, values):
+        """Returns per-hour values repeated for each step of each hour"""
+        if self._resolution == self.ONE_HOUR:
+            return values
+        steps_per_hour = self.ONE_HOUR // self._resolution
+        first_step = (self._first_hour() - self._floor_hour(self._start)
+            ) // self._resolution
+        return values[(first_step + np.arange(self._compute_num_hours()))
+            // steps_per_hour]
+
+    def _set_engine(self, engine):
+        if engine not in self.ENGINES:
+            raise ValueError("Invalid engine: '{}'.  Valid: '{}'".format(
+                engine, "', '".join(self.ENGINES)))
+
+        self._engine = engine
+
 
     ## Computations
 
@@ -268,8 +774,9 @@ class FepsTimeProfiler(BaseTimeProfiler):
             C_AG = total above ground consumption
             C_TI (Consumption threshold for total flame involvement) = 10
         """
-        self._inv_f = 100 * (1 - self.K_AGI * math.pow(
-            math.e, -self._total_above_ground_consumption / self.C_TI))
+        p = self._parameters
+        self._inv_f = 100 * (1 - p.K_AGI * math.pow(
+            math.e, -self._total_above_ground_consumption / p.C_TI))
 
     def _compute_flaming_phase_consumption(self):
         """Computes flaming phase consumption, C_f
@@ -280,18 +787,29 @@ class FepsTimeProfiler(BaseTimeProfiler):
             k_CAG (Above ground flaming phase consumption coefficient) = 0.5
             k_CBG (Below ground flaming phase consumption coefficient) = 0.2
         """
-        self._c_f = (self.K_CAG * self._total_above_ground_consumption +
-            self.K_CBG * self._total_below_ground_consumption)
+        p = self._parameters
+        self._c_f = (p.K_CAG * self._total_above_ground_consumption +
+            p.K_CBG * self._total_below_ground_consumption)
 
     def _compute_sts_phase_consumption(self):
         self._c_sts = min(self._c_f, self._total_consumption - self._c_f)
 
     def _compute_smoldering_adjustment(self):
-        # TODO: refactor class to input hourly relative humidity?
+        """Computes the smoldering adjustment, which is a per-hour array
+        if relative humidity or wind speed were given hourly
+        """
+        p = self._parameters
+        if np.ndim(self._relative_humidity) or np.ndim(self._wind_speed):
+            self._smoldering_adjustment = (
+                np.floor(np.sqrt(self._wind_speed / p.U_b))
+                * ((100 / self._relative_humidity) / p.RH_b))
+            return
+
         self._smoldering_adjustment = (
-            math.floor(math.pow((self._wind_speed / self.U_b), 0.5))
-            * ((100 / self._relative_humidity) / self.RH_b))
+            math.floor(math.pow((self._wind_speed / p.U_b), 0.5))
+            * ((100 / self._relative_humidity) / p.RH_b))
 
+    @stage
     def _compute_area_fractions(self):
         """Computes the hourly area consumption rate based on equations
         (19), (20), and (21) in Anderson et. al.  Equation (19) and (20)
@@ -323,24 +841,25 @@ class FepsTimeProfiler(BaseTimeProfiler):
 
         Note: partial ignition hours are supported
         """
+        if self._engine == 'numpy':
+            return self._compute_area_fractions_numpy()
+
         cumulative_area = []
-        total_ig_seconds = (self._ig_end - self._ig_start).total_seconds()
-        hr = datetime.datetime(self._start.year, self._start.month,
-            self._start.day, self._start.hour)
-        final_hr = self._end.date()
+        first_hour = self._first_hour()
+        ig_start = self._to_seconds(self._ig_start, first_hour)
+        ig_end = self._to_seconds(self._ig_end, first_hour)
+        total_ig_seconds = self._to_seconds(self._ig_end, self._ig_start)
+        step = self._resolution.total_seconds()
         cumulative_seconds = 0
-        while hr < self._end:
-            hr_end = hr + self.ONE_HOUR
-            overlap_start = max(hr, self._ig_start)
-            overlap_end = min(hr_end, self._ig_end)
-            overlap_seconds = max(0, (overlap_end - overlap_start).total_seconds())
+        for i in range(self._compute_num_hours()):
+            hr = i * step
+            overlap_seconds = max(0, min(hr + step, ig_end) - max(hr, ig_start))
             cumulative_seconds += overlap_seconds
             if self._fire_type == FireType.RX:
                 cumulative_area.append(cumulative_seconds / total_ig_seconds)
             else:
                 cumulative_area.append(
                     math.pow(cumulative_seconds, 2) / math.pow(total_ig_seconds, 2))
-            hr += self.ONE_HOUR
 
         self._area_fractions = []
         num_hours = len(cumulative_area)
@@ -349,19 +868,207 @@ class FepsTimeProfiler(BaseTimeProfiler):
             a = cumulative_area[i] - prev_val
             self._area_fractions.append(a)
 
+    def _first_hour(self):
+        """Returns the start of the first hour (or sub-hourly step)"""
+        return self._floor_step(self._start)
+
+    def _compute_num_hours(self):
+        """Returns the number of hours (or sub-hourly steps)"""
+        return math.ceil((self._end - self._first_hour()) / self._resolution)
+
+    def _get_phase_arrays(self):
+        """Returns all phases' hourly fractions as arrays, computing any
+        that haven't been computed
+        """
+        if isinstance(self.hourly_fractions, HourlyFractions):
+            return {p: self.hourly_fractions.get_array(p) for p in self.FIELDS}
+        return {p: np.asarray(self.hourly_fractions[p], dtype=float)
+            for p in self.FIELDS}
+
+    def _get_decays(self):
+        p = self._parameters
+        return tuple(self._rescale_decay(d) for d in (p.DECAY_f, p.DECAY_STS,
+            p.get_lts_constants(self._duff_moisture_content)[1]))
+
+    def _rescale_decay(self, decay):
+        """Returns the per step decay, for sub-hourly resolutions"""
+        if self._resolution == self.ONE_HOUR:
+            return decay
+        return math.pow(decay, self._resolution / self.ONE_HOUR)
+
+    def _pad_hourly_values(self, num_hours):
+        """Pads intermediate per-hour values with num_hours more hours.
+        Area fractions are zero after ignition, so the padded hourly
+        meteorology and smoldering adjustment values have no effect.
+        """
+        for attr in ('_relative_humidity', '_wind_speed',
+                '_smoldering_adjustment'):
+            v = getattr(self, attr, None)
+            if isinstance(v, np.ndarray):
+                setattr(self, attr, np.pad(v, (0, num_hours), mode='edge'))
+        area_fractions = getattr(self, '_area_fractions', None)
+        if isinstance(area_fractions, np.ndarray):
+            self._area_fractions = np.pad(area_fractions, (0, num_hours))
+        elif area_fractions is not None:
+            self._area_fractions = area_fractions + [0.0] * num_hours
+
+    def _compute_area_fraction_range(self, begin, end):
+        """Computes area fractions for hours [begin, end) directly from the
+        cumulative area at the hours' boundaries, for streaming.  As in
+        _compute_area_fractions, only ignition within the activity window
+        is counted.
+        """
+        first_hour = self._first_hour()
+        ig_offset = max(0, self._to_seconds(self._ig_start, first_hour))
+        ig_end_offset = self._to_seconds(self._ig_end, first_hour)
+        total_ig_seconds = self._to_seconds(self._ig_end, self._ig_start)
+        boundaries = (np.arange(begin, end + 1)
+            * self._resolution.total_seconds() - ig_offset)
+        cumulative_area = (np.clip(boundaries, 0, ig_end_offset - ig_offset)
+            / total_ig_seconds)
+        if self._fire_type != FireType.RX:
+            cumulative_area = np.power(cumulative_area, 2)
+        return np.diff(cumulative_area)
+
+    def _compute_area_fractions_numpy(self):
+        """Array based version of _compute_area_fractions"""
+        first_hour = self._first_hour()
+        step = self._resolution.total_seconds()
+        hour_start = np.arange(self._compute_num_hours()) * step
+        overlap_start = np.maximum(hour_start,
+            self._to_seconds(self._ig_start, first_hour))
+        overlap_end = np.minimum(hour_start + step,
+            self._to_seconds(self._ig_end, first_hour))
+        cumulative_seconds = np.cumsum(np.maximum(0, overlap_end - overlap_start))
+
+        total_ig_seconds = (self._ig_end - self._ig_start).total_seconds()
+        if self._fire_type == FireType.RX:
+            cumulative_area = cumulative_seconds / total_ig_seconds
+        else:
+            cumulative_area = (np.power(cumulative_seconds, 2)
+                / math.pow(total_ig_seconds, 2))
+
+        self._area_fractions = np.diff(cumulative_area, prepend=0.0)
+
+    @stage
     def _compute_hourly_fractions(self):
         # TODO: make sure start / end times are reasonable for rx?
+        if self._engine == 'numpy':
+            return self._compute_hourly_fractions_numpy()
+
         self._hourly_fractions = {
             "area_fraction": self._area_fractions,
             "flaming": self._normalize(self._compute_flaming()),
             "smoldering": self._normalize(self._compute_short_term_smoldering()),
             "residual": self._normalize(self._compute_long_term_smoldering())
         }
+        if self._dtype:
+            self._hourly_fractions = HourlyFractions.from_dict(
+                self._hourly_fractions, phases=self.FIELDS, dtype=self._dtype)
+
+    def _compute_hourly_fractions_numpy(self):
+        coefficients, decays = zip(self._flaming_recurrence_parameters(),
+            self._sts_recurrence_parameters(),
+            self._lts_recurrence_parameters())
+        flaming, smoldering, residual = _fused_recurrences(
+            self._area_fractions, coefficients, decays)
+        if self._dtype:
+            self._hourly_fractions = HourlyFractions.from_array(self.FIELDS,
+                [self._area_fractions, flaming, smoldering, residual],
+                dtype=self._dtype)
+            return
+
+        self._hourly_fractions = {
+            "area_fraction": self._area_fractions.tolist(),
+            "flaming": flaming.tolist(),
+            "smoldering": smoldering.tolist(),
+            "residual": residual.tolist()
+        }
 
+    @stage
+    def _compute_phase(self, phase):
+        """Computes a single phase's hourly fractions, along with any
+        intermediate values that haven't already been computed.
+        """
+        for attr, method in self.PHASE_DEPENDENCIES[phase]:
+            if not hasattr(self, attr):
+                getattr(self, method)()
+
+        if phase == 'area_fraction':
+            return self._area_fractions
+
+        parameters, compute = {
+            'flaming': (self._flaming_recurrence_parameters,
+                self._compute_flaming),
+            'smoldering': (self._sts_recurrence_parameters,
+                self._compute_short_term_smoldering),
+            'residual': (self._lts_recurrence_parameters,
+                self._compute_long_term_smoldering)
+        }[phase]
+        if self._engine == 'numpy':
+            coefficient, decay = parameters()
+            return _fused_recurrences(self._area_fractions, [coefficient],
+                [decay])[0]
+        return self._normalize(compute())
+
+    def _iter_chunks(self, chunk_size):
+        """Streams the profile with the fused recurrence kernel, carrying
+        the recurrences' state from one chunk to the next.
+        """
+        for phase in self.FIELDS[1:]:
+            for attr, method in self.PHASE_DEPENDENCIES[phase][1:]:
+                if not hasattr(self, attr):
+                    getattr(self, method)()
+
+        coefficients, decays = zip(self._flaming_recurrence_parameters(),
+            self._sts_recurrence_parameters(),
+            self._lts_recurrence_parameters())
+        num_hours = self._compute_num_hours()
+        totals = self._compute_recurrence_totals(coefficients, decays,
+            num_hours)
+        _check_totals(totals)
+
+        first_hour = self._first_hour()
+        state = None
+        for b in range(0, num_hours, chunk_size):
+            n = min(chunk_size, num_hours - b)
+            area_fractions = self._compute_area_fraction_range(b, b + n)
+            y, state = _filter_blocks(_weight(area_fractions,
+                [_hour_range(c, b, b + n) for c in coefficients]), decays,
+                state=state)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                y /= totals[:, np.newaxis]
+            yield (self._step_times(first_hour, np.arange(b, b + n)),
+                area_fractions) + tuple(y)
+
+    def _compute_recurrence_totals(self, coefficients, decays, num_hours):
+        """Computes, for each coefficient c and decay d, the sum over the
+        activity window of
+
+            y_i = c_i * a_i + y_i-1 * d
+
+        which is sum_j (c_j * a_j * (1 - d^(num_hours - j)) / (1 - d)).
+        Area fractions a_j are only non-zero during ignition, so only
+        those hours are visited, limited to the activity window, since
+        ignition may run past its end (e.g. with the default three hour
+        ignition window), or start before its first hour.
+        """
+        first_hour = self._first_hour()
+        b = max(0, math.floor((self._ig_start - first_hour) / self._resolution))
+        e = min(num_hours,
+            math.ceil((self._ig_end - first_hour) / self._resolution))
+        x = _weight(self._compute_area_fraction_range(b, e),
+            [_hour_range(c, b, e) for c in coefficients])
+        remaining = num_hours - np.arange(b, e)
+        d = np.array(decays)[:, np.newaxis]
+        return (x * (1 - np.power(d, remaining)) / (1 - d)).sum(axis=1)
+
+    @stage
     def _normalize(self, fractions):
         total = sum(fractions)
         return [e / total for e in fractions]
 
+    @stage
     def _compute_flaming(self):
         """Computes hourly flaming phase consumption, as defined by
         a modification of equation (27) in Anderson et. al.  The original
@@ -385,20 +1092,25 @@ class FepsTimeProfiler(BaseTimeProfiler):
 
             D_f = (1/B_f)^(1/2)
 
-        so that DECAY_f, TFLAM, and D_f can be defined as constants, above.
+        so that DECAY_f, TFLAM, and D_f are constants (see FepsParameters).
         """
         flaming_fractions = []
 
         # TODO: come up with appropriate name for the following variable
-        temp = (self._inv_f / 100) * self._c_f * (1 - self.DECAY_f)
+        temp, decay_f = self._flaming_recurrence_parameters()
 
         for i, a in enumerate(self._area_fractions):
             prev = flaming_fractions[i-1] if i > 0 else 0.0
-            f = a * temp + prev * self.DECAY_f
+            f = a * temp + prev * decay_f
             flaming_fractions.append(f)
 
         return flaming_fractions
 
+    def _flaming_recurrence_parameters(self):
+        decay_f = self._rescale_decay(self._parameters.DECAY_f)
+        return (self._inv_f / 100) * self._c_f * (1 - decay_f), decay_f
+
+    @stage
     def _compute_short_term_smoldering(self):
         """Computes hourly smoldering (i.e. Short Term Smoldering, STS)
         phase consumption, as defined by a modification of equation (28)
@@ -431,20 +1143,27 @@ class FepsTimeProfiler(BaseTimeProfiler):
 
             D_STS = 1 / B_STS
 
-        so that DECAY_STS, EDR, and D_STS can be defined as constants, above.
+        so that DECAY_STS, EDR, and D_STS are constants (see FepsParameters).
         """
         sts_fractions = []
 
         # TODO: come up with appropriate name for the following variable
-        temp = self._smoldering_adjustment * (self._inv_f / 100) * self._c_sts * (1 - self.DECAY_STS)
+        temp, decay_sts = self._sts_recurrence_parameters()
 
-        for i, a in enumerate(self._area_fractions):
+        for i, (a, temp) in enumerate(zip(self._area_fractions,
+                _per_hour(temp))):
             prev = sts_fractions[i-1] if i > 0 else 0.0
-            s = temp * a + (prev * self.DECAY_STS)
+            s = temp * a + (prev * decay_sts)
             sts_fractions.append(s)
 
         return sts_fractions
 
+    def _sts_recurrence_parameters(self):
+        decay_sts = self._rescale_decay(self._parameters.DECAY_STS)
+        return (self._smoldering_adjustment * (self._inv_f / 100)
+            * self._c_sts * (1 - decay_sts)), decay_sts
+
+    @stage
     def _compute_long_term_smoldering(self):
         """Computes hourly residual (i.e. Long Term Smoldering, LTS)
         phase consumption, as defined by a modification of equation (29)
@@ -472,22 +1191,428 @@ class FepsTimeProfiler(BaseTimeProfiler):
                 = (k_RDR * Inv_LTS / (1 - e^(-1))) / 100
                 = (k_RDR * Inv_LTS) / ((1 - e^(-1)) * 100)
         """
-        inv_lts = 100 / math.pow(math.e, self.K_LTI * (
-            self._duff_moisture_content / self.M_DBM))
-        lc_d = 100 * math.pow(1 - math.pow(math.e, -1),
-            self._moisture_category_factors['duff'])
-        c_duff = lc_d * self._duff_fuel_load / 100
-        c_lts = max(self._total_consumption - self._c_f - self._c_sts,
-            (self._duff_fuel_load * inv_lts / 100) - c_duff)
-        rdr = (self.K_RDR * inv_lts) / ((1 - math.pow(math.e,-1)) * 100)
-        decay_l = 1 / math.pow(math.e, 1 / rdr)
         # TODO: come up with appropriate name for the following variable
-        temp = self._smoldering_adjustment * (inv_lts / 100) * c_lts * (1 - decay_l)
+        temp, decay_l = self._lts_recurrence_parameters()
 
         lts_fractions = []
-        for i, a in enumerate(self._area_fractions):
+        for i, (a, temp) in enumerate(zip(self._area_fractions,
+                _per_hour(temp))):
             prev = lts_fractions[i-1] if i > 0 else 0.0
             s = temp * a + (prev * decay_l)
             lts_fractions.append(s)
 
         return lts_fractions
+
+    def _lts_recurrence_parameters(self):
+        p = self._parameters
+        inv_lts, decay_l = p.get_lts_constants(self._duff_moisture_content)
+        decay_l = self._rescale_decay(decay_l)
+        lc_d = p.get_duff_consumption_percentage(
+            self._moisture_category_factors['duff'])
+        c_duff = lc_d * self._duff_fuel_load / 100
+        c_lts = max(self._total_consumption - self._c_f - self._c_sts,
+            (self._duff_fuel_load * inv_lts / 100) - c_duff)
+        return (self._smoldering_adjustment * (inv_lts / 100) * c_lts
+            * (1 - decay_l)), decay_l
+
+
+# Number of hours processed per step in _fused_recurrences
+FUSED_BLOCK_SIZE = 64
+
+@functools.lru_cache(maxsize=32)
+def _decay_matrices(decays, size):
+    """Returns, for each decay d, the lower triangular matrix with d^(i-j)
+    at [i, j], and the factors d^(i+1) that carry the state from the end of
+    one block into each hour of the next
+    """
+    d = np.array(decays)
+    lags = np.subtract.outer(np.arange(size), np.arange(size))
+    matrices = np.where(lags >= 0,
+        np.power(d[:, np.newaxis, np.newaxis], np.maximum(lags, 0)), 0.0)
+    carry = np.power(d[:, np.newaxis], np.arange(1, size + 1))
+    return matrices, carry
+
+@stage(hours=lambda area_fractions, *args, **kwargs: len(area_fractions))
+def _fused_recurrences(area_fractions, coefficients, decays,
+        block_size=FUSED_BLOCK_SIZE):
+    """Computes and normalizes the first order recurrences
+
+        y_p_i = c_p * a_i + y_p_i-1 * decay_p
+
+    for all phases p at once, returning a (num_phases, num_hours) array.
+    Each coefficient c_p is either a scalar or an array of hourly values
+    (e.g. with an hourly smoldering adjustment).
+
+    The recurrences are treated as IIR filters applied to the area
+    fractions.  Within each block of hours, the closed form
+
+        y_p_i = sum_j<=i (c_p * a_j * decay_p^(i-j)) + decay_p^(i+1) * y_p_-1
+
+    is evaluated as a matrix product, with y_p_-1 being the last value of
+    the previous block.  Keeping blocks short avoids the overflow that
+    a closed form over the whole window (with decay^-i terms) would hit.
+    """
+    y, _ = _filter_blocks(_weight(area_fractions, coefficients), decays,
+        block_size)
+    totals = y.sum(axis=1, keepdims=True)
+    _check_totals(totals)
+    y /= totals
+    return y
+
+def _check_totals(totals):
+    """Raises ZeroDivisionError, as the python engine's normalization does,
+    if any phase's total is zero (e.g. if no ignition falls within the
+    activity window's hours)
+    """
+    if not np.all(totals):
+        raise ZeroDivisionError("float division by zero")
+
+def _weight(area_fractions, coefficients):
+    """Returns the (num_phases, num_hours) array of c_p * a_i"""
+    return np.array([np.multiply(c, area_fractions) for c in coefficients])
+
+def _hour_range(coefficient, begin, end):
+    """Returns an hourly coefficient's values for hours [begin, end), or
+    a scalar coefficient as is
+    """
+    return coefficient[begin:end] if np.ndim(coefficient) else coefficient
+
+def _per_hour(coefficient):
+    """Returns an iterable of an hourly or scalar coefficient's value for
+    each hour, for the python engine's loops
+    """
+    if np.ndim(coefficient):
+        return coefficient.tolist()
+    return itertools.repeat(coefficient)
+
+def _hourly_series(values, num_hours, lag, label):
+    """Returns an array of the values (along the last axis) applied to
+    each of num_hours hours, with the value for hour i being the one lag
+    hours earlier.  values either start lag hours before the first hour,
+    or at the first hour, in which case the first value is used for
+    earlier hours.
+    """
+    values = np.asarray(values, dtype=float)
+    if values.shape[-1] == num_hours + lag:
+        return values[..., :num_hours]
+    if values.shape[-1] == num_hours:
+        return values[..., np.maximum(np.arange(num_hours) - lag, 0)]
+    expected = ("{} or {}".format(num_hours, num_hours + lag) if lag
+        else num_hours)
+    raise ValueError("Expected {} hourly {} values; got {}".format(
+        expected, label, values.shape[-1]))
+
+def _filter_blocks(x, decays, block_size=FUSED_BLOCK_SIZE, state=None):
+    """Computes the unnormalized recurrences y_p_i = x_p_i + y_p_i-1 * decay_p
+    block by block (see _fused_recurrences), starting from the previous
+    values in state (zeros if None).  Returns y and the state to pass in
+    when continuing with the following hours.
+    """
+    num_phases, num_hours = x.shape
+    size = min(block_size, num_hours)
+    matrices, carry = _decay_matrices(tuple(decays), size)
+
+    y = np.empty_like(x)
+    state = np.zeros(num_phases) if state is None else state
+    for b in range(0, num_hours, size):
+        n = min(size, num_hours - b)
+        block = np.matmul(matrices[:, :n, :n], x[:, b:b+n, np.newaxis])[:, :, 0]
+        block += carry[:, :n] * state[:, np.newaxis]
+        y[:, b:b+n] = block
+        state = block[:, -1]
+
+    return y, state
+
+
+class FepsBatchProfiler(BaseBatchTimeProfiler):
+    """Computes FEPS hourly fractions for many fires in one vectorized pass.
+
+    Times may be sequences of datetime objects or numpy datetime64 arrays,
+    and missing ignition times (None / NaT) are filled in the same way as in
+    FepsTimeProfiler.  Missing numeric values (None / NaN) are replaced
+    with FepsTimeProfiler.INPUT_DEFAULTS.
+
+    Relative humidities and wind speeds may also be given hourly, as
+    (num_fires, num_hours) arrays, where num_hours is the longest fire's
+    number of hours (plus relative_humidity_lag, for relative humidities
+    with history); see FepsTimeProfiler.
+
+    Model coefficients are taken from parameters, a FepsParameters object,
+    if specified.
+    """
+
+    def __init__(self, local_start_times, local_end_times,
+            local_ignition_start_times=None,
+            local_ignition_end_times=None,
+            fire_types=FireType.RX,
+            duff_fuel_loads=None,
+            total_above_ground_consumptions=None,
+            total_below_ground_consumptions=None,
+            moisture_categories='moderate',
+            relative_humidities=None,
+            wind_speeds=None,
+            duff_moisture_contents=None,
+            relative_humidity_lag=0,
+            parameters=None):
+
+        self._parameters = parameters or DEFAULT_PARAMETERS
+        self._set_times(local_start_times, local_end_times,
+            local_ignition_start_times, local_ignition_end_times)
+
+        self._set_fire_types(fire_types)
+        self._set_duff_moisture_category_factors(moisture_categories)
+
+        self._duff_fuel_load = self._numeric_column(
+            duff_fuel_loads, 'duff_fuel_load')
+        self._total_above_ground_consumption = self._numeric_column(
+            total_above_ground_consumptions, 'total_above_ground_consumption')
+        self._total_below_ground_consumption = self._numeric_column(
+            total_below_ground_consumptions, 'total_below_ground_consumption')
+        self._relative_humidity = self._meteorology_column(
+            relative_humidities, 'relative_humidity')
+        self._wind_speed = self._meteorology_column(wind_speeds, 'wind_speed')
+        if relative_humidity_lag < 0:
+            raise ValueError("Invalid relative humidity lag: {}".format(
+                relative_humidity_lag))
+        self._relative_humidity_lag = relative_humidity_lag
+        self._duff_moisture_content = self._numeric_column(
+            duff_moisture_contents, 'duff_moisture_content')
+
+        self._compute_area_fractions()
+        self._compute_hourly_fractions()
+
+    @property
+    def start(self):
+        return self._start
+
+    @property
+    def end(self):
+        return self._end
+
+    @property
+    def ignition_start(self):
+        return self._ig_start
+
+    @property
+    def ignition_end(self):
+        return self._ig_end
+
+
+    ## Initialization
+
+    def _numeric_column(self, values, key):
+        default = FepsTimeProfiler.INPUT_DEFAULTS[key]
+        column = self._column(default if values is None else values,
+            float, key)
+        return np.where(np.isnan(column), default, column)
+
+    def _meteorology_column(self, values, key):
+        """Returns a column of per-fire values, or a (num_fires, num_hours)
+        array of hourly values if values is two dimensional
+        """
+        if np.ndim(values) != 2:
+            return self._numeric_column(values, key)
+        values = np.asarray(values, dtype=float)
+        if len(values) != self.num_fires:
+            raise ValueError("Expected {} rows of hourly {}; got {}".format(
+                self.num_fires, key.replace('_', ' '), len(values)))
+        return np.where(np.isnan(values), FepsTimeProfiler.INPUT_DEFAULTS[key],
+            values)
+
+    @stage
+    def _set_times(self, start, end, ig_start, ig_end):
+        self._start = np.asarray(start, dtype='datetime64[us]').ravel()
+        self._end = self._time_column(end, 'end time')
+        ig_start = self._time_column(ig_start, 'ignition start time')
+        ig_end = self._time_column(ig_end, 'ignition end time')
+
+        # Same checks, in the same order, as FepsTimeProfiler._set_times
+        self._validate_start_end_times(self._start, self._end)
+        for t, identifier in ((ig_start, 'start'), (ig_end, 'end')):
+            invalid = ~np.isnat(t) & ((t < self._start) | (t > self._end))
+            if invalid.any():
+                self._raise_first(invalid, ValueError,
+                    "Ignition " + identifier + " time - {} - isn't within"
+                    " start / end times - {} / {}", t, self._start, self._end)
+        both = ~np.isnat(ig_start) & ~np.isnat(ig_end)
+        self._validate_start_end_times(np.where(both, ig_start, self._start),
+            np.where(both, ig_end, self._end), time_qualifier="ignition")
+
+        self._ig_start, self._ig_end = _fill_ignition_times(self._start,
+            self._end, ig_start, ig_end)
+
+    def _set_fire_types(self, fire_types):
+        fire_types = np.char.lower(self._column(fire_types, str, 'fire type'))
+        invalid = ~np.isin(fire_types, FireType.VALID_FIRE_TYPES)
+        if invalid.any():
+            self._raise_first(invalid, ValueError,
+                "Invalid fire type: '{}'.  Valid: '" + "', '".join(
+                FireType.VALID_FIRE_TYPES) + "')", fire_types)
+        self._is_wf = fire_types == FireType.WF
+
+    def _set_duff_moisture_category_factors(self, moisture_categories):
+        single = isinstance(moisture_categories, (str, MoistureCategory))
+        factors = {}
+        duff_factors = []
+        for m in ([moisture_categories] if single else moisture_categories):
+            key = m.lower() if isinstance(m, str) else id(m)
+            if key not in factors:
+                factors[key] = (m if isinstance(m, MoistureCategory)
+                    else MoistureCategory(m))['duff']
+            duff_factors.append(factors[key])
+        self._duff_moisture_category_factor = self._column(
+            duff_factors[0] if single else duff_factors,
+            float, 'moisture category')
+
+
+    ## Computations
+
+    @stage
+    def _compute_area_fractions(self):
+        """Vectorized version of FepsTimeProfiler._compute_area_fractions"""
+        first_hour = self._start.astype('datetime64[h]').astype('datetime64[us]')
+        self._num_hours = np.ceil(
+            (self._end - first_hour) / self.ONE_HOUR).astype('int64')
+        hours = np.arange(self._num_hours.max())
+
+        # Work with (num_hours, num_fires) arrays so that each step of
+        # the recurrences, below, operates on a contiguous row
+        hour_start = first_hour[np.newaxis, :] + hours[:, np.newaxis] * self.ONE_HOUR
+        overlap_start = np.maximum(hour_start, self._ig_start)
+        overlap_end = np.minimum(hour_start + self.ONE_HOUR, self._ig_end)
+        overlap_seconds = np.maximum(overlap_end - overlap_start,
+            np.timedelta64(0, 'us')) / np.timedelta64(1, 's')
+        cumulative_seconds = np.cumsum(overlap_seconds, axis=0)
+
+        total_ig_seconds = (self._ig_end - self._ig_start) / np.timedelta64(1, 's')
+        cumulative_area = np.where(self._is_wf,
+            np.power(cumulative_seconds, 2) / np.power(total_ig_seconds, 2),
+            cumulative_seconds / total_ig_seconds)
+
+        self._area_fractions = np.diff(cumulative_area, axis=0, prepend=0.0)
+        self._padding = hours[:, np.newaxis] >= self._num_hours
+        self._area_fractions[self._padding] = 0.0
+
+    @stage
+    def _compute_hourly_fractions(self):
+        flaming, smoldering, residual = [
+            self._compute_recurrence(coefficient, decay)
+            for coefficient, decay in _compute_recurrence_parameters(
+                self._parameters, self._total_above_ground_consumption,
+                self._total_below_ground_consumption, self._duff_fuel_load,
+                self._duff_moisture_content,
+                self._duff_moisture_category_factor,
+                self._compute_smoldering_adjustment())
+        ]
+
+        self._hourly_fractions = {
+            "area_fraction": np.ascontiguousarray(self._area_fractions.T),
+            "flaming": self._normalize(flaming),
+            "smoldering": self._normalize(smoldering),
+            "residual": self._normalize(residual)
+        }
+
+    def _compute_smoldering_adjustment(self):
+        """Returns the smoldering adjustment per fire, or, if relative
+        humidities or wind speeds were given hourly, per hour and fire, as
+        a (num_hours, num_fires) array
+        """
+        num_hours = len(self._area_fractions)
+        relative_humidity = self._relative_humidity
+        if relative_humidity.ndim == 2:
+            relative_humidity = _hourly_series(relative_humidity, num_hours,
+                self._relative_humidity_lag, 'relative humidity').T
+        wind_speed = self._wind_speed
+        if wind_speed.ndim == 2:
+            wind_speed = _hourly_series(wind_speed, num_hours, 0,
+                'wind speed').T
+
+        return _compute_smoldering_adjustment(self._parameters, wind_speed,
+            relative_humidity)
+
+    @stage
+    def _compute_recurrence(self, coefficient, decay):
+        """Computes y_i = coefficient * a_i + y_i-1 * decay for each fire,
+        stepping through the hours once for all fires.  coefficient is
+        either per fire or, for hourly values, per hour and fire.
+        """
+        x = self._area_fractions * coefficient
+        fractions = np.empty_like(self._area_fractions)
+        prev = np.zeros(self.num_fires)
+        for i, x_i in enumerate(x):
+            prev = x_i + prev * decay
+            fractions[i] = prev
+        # cut the tails off at the end of each fire's activity window
+        fractions[self._padding] = 0.0
+        return fractions
+
+    @stage
+    def _normalize(self, fractions):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.ascontiguousarray((fractions / fractions.sum(axis=0)).T)
+
+
+def _fill_ignition_times(start, end, ig_start, ig_end):
+    """Vectorized version of the defaults set in
+    FepsTimeProfiler._set_times, for datetime64[us] arrays
+    """
+    one_hour = np.timedelta64(1, 'h')
+    three_hours = 3 * one_hour
+    has_start = ~np.isnat(ig_start)
+    has_end = ~np.isnat(ig_end)
+
+    # neither specified - start at 9am, or at start if after 9am, and
+    # then shift back and shrink to fit within the activity window
+    default_start = np.maximum(start.astype('datetime64[D]')
+        + 9 * one_hour, start)
+    default_end = default_start + three_hours
+    needed_shift = np.ceil(np.maximum(default_end - end,
+        np.timedelta64(0, 'us')) / one_hour)
+    allowed_shift = np.floor((default_start - start) / one_hour)
+    shift = np.minimum(needed_shift, allowed_shift).astype('int64')
+    default_start = default_start - shift * one_hour
+    default_end = np.minimum(default_end - shift * one_hour, end)
+
+    new_ig_start = np.where(has_start, ig_start,
+        np.where(has_end, ig_end - three_hours, default_start))
+    new_ig_end = np.where(has_end, ig_end,
+        np.where(has_start, ig_start + three_hours, default_end))
+    return new_ig_start, new_ig_end
+
+def _compute_smoldering_adjustment(parameters, wind_speed, relative_humidity):
+    """Vectorized version of FepsTimeProfiler._compute_smoldering_adjustment"""
+    return (np.floor(np.power((wind_speed / parameters.U_b), 0.5))
+        * ((100 / relative_humidity) / parameters.RH_b))
+
+def _compute_recurrence_parameters(parameters, total_above_ground_consumption,
+        total_below_ground_consumption, duff_fuel_load, duff_moisture_content,
+        duff_moisture_category_factor, smoldering_adjustment):
+    """Vectorized version of FepsTimeProfiler's _*_recurrence_parameters
+    methods, for arrays of inputs.  Returns the flaming, smoldering, and
+    residual phases' (coefficient, decay) pairs.
+    """
+    c = parameters
+    total_consumption = (total_above_ground_consumption +
+        total_below_ground_consumption)
+
+    # flaming phase involvement and consumption
+    inv_f = 100 * (1 - c.K_AGI * np.power(
+        math.e, -total_above_ground_consumption / c.C_TI))
+    c_f = (c.K_CAG * total_above_ground_consumption +
+        c.K_CBG * total_below_ground_consumption)
+    c_sts = np.minimum(c_f, total_consumption - c_f)
+
+    # long term smoldering
+    inv_lts, decay_l = c.compute_lts_constants(duff_moisture_content)
+    lc_d = c.compute_duff_consumption_percentages(duff_moisture_category_factor)
+    c_duff = lc_d * duff_fuel_load / 100
+    c_lts = np.maximum(total_consumption - c_f - c_sts,
+        (duff_fuel_load * inv_lts / 100) - c_duff)
+
+    return [
+        ((inv_f / 100) * c_f * (1 - c.DECAY_f), c.DECAY_f),
+        (smoldering_adjustment * (inv_f / 100) * c_sts * (1 - c.DECAY_STS),
+            c.DECAY_STS),
+        (smoldering_adjustment * (inv_lts / 100) * c_lts * (1 - decay_l),
+            decay_l)
+    ]
@@ -0,0 +1,347 @@
+"""timeprofile.fractions
+
+Containers for profilers' hourly fractions.
+"""
+
+import collections.abc
+
+import numpy as np
+
+__all__ = [
+    'LazyHourlyFractions',
+    'HourlyFractions',
+    'SparseHourlyFractions'
+]
+
+
+class _PhaseMapping(collections.abc.Mapping):
+    """Base class for read-only mappings of an ordered set of phases to
+    hourly fractions
+    """
+
+    __slots__ = ('_phases',)
+
+    def __iter__(self):
+        return iter(self._phases)
+
+    def __len__(self):
+        return len(self._phases)
+
+    def __contains__(self, phase):
+        return phase in self._phases
+
+    def __repr__(self):
+        return '{}({})'.format(self.__class__.__name__, dict(self))
+
+    def _index(self, phase):
+        if phase not in self._phases:
+            raise KeyError(phase)
+        return self._phases.index(phase)
+
+
+class LazyHourlyFractions(_PhaseMapping):
+    """Read-only mapping of phase to hourly fractions, which computes each
+    phase's values when first accessed and then caches them.
+
+    Iterating over items or values computes all phases.  Use dict(...) to
+    convert to a plain dict (e.g. for json serialization).
+    """
+
+    __slots__ = ('_compute', '_values')
+
+    def __init__(self, phases, compute, values=None):
+        """LazyHourlyFractions constructor
+
+        args:
+         - phases -- ordered keys
+         - compute -- function that takes a phase and returns its hourly
+           fractions, as a list or array
+
+        kwargs:
+         - values -- dict of phases' already computed hourly fractions
+        """
+        self._phases = tuple(phases)
+        self._compute = compute
+        self._values = {}
+        for phase, v in (values or {}).items():
+            self._values[phase] = v.tolist() if isinstance(v, np.ndarray) else v
+
+    def __getitem__(self, phase):
+        if phase not in self._values:
+            if phase not in self._phases:
+                raise KeyError(phase)
+            values = self._compute(phase)
+            if isinstance(values, np.ndarray):
+                values = values.tolist()
+            self._values[phase] = values
+        return self._values[phase]
+
+    @property
+    def computed(self):
+        """Phases that have been computed so far"""
+        return [p for p in self._phases if p in self._values]
+
+
+class HourlyFractions(_PhaseMapping):
+    """Hourly fractions for all phases, stored in a single contiguous
+    (num_phases, num_hours) array of float64 or float32 values.
+
+    Like LazyHourlyFractions, this is a read-only mapping, and phases can be
+    computed on first access.  Indexing by phase returns a list, for
+    compatibility with code written for dicts of lists; each phase's list
+    is built on first access and then cached, until the phase is recomputed
+    or the object is frozen.  get_array, or the array property, return
+    read-only views of the underlying array, without copying.
+    """
+
+    __slots__ = ('_compute', '_array', '_computed', '_lists')
+
+    DTYPES = ('float64', 'float32')
+
+    def __init__(self, phases, num_hours, dtype='float64', compute=None):
+        """HourlyFractions constructor
+
+        args:
+         - phases -- ordered keys
+         - num_hours -- number of hourly values per phase
+
+        kwargs:
+         - dtype -- 'float64' or 'float32'
+         - compute -- function that takes a phase and returns its hourly
+           fractions; if not specified, values must be set with
+           from_dict or from_array
+        """
+        self._phases = tuple(phases)
+        self._compute = compute
+        self._lists = {}
+        dtype = np.dtype(dtype)
+        if dtype.name not in self.DTYPES:
+            raise ValueError("Invalid dtype: '{}'.  Valid: '{}'".format(
+                dtype, "', '".join(self.DTYPES)))
+        self._array = np.zeros((len(self._phases), num_hours), dtype=dtype)
+        self._computed = np.zeros(len(self._phases), dtype=bool)
+
+    @classmethod
+    def from_array(cls, phases, array, dtype='float64', copy=True):
+        """Creates HourlyFractions from a (num_phases, num_hours) array.
+        If copy is False, and the array already has the given dtype, it's
+        used as is (e.g. a view of a serialized buffer).
+        """
+        array = np.asarray(array)
+        if copy or array.dtype != np.dtype(dtype):
+            hourly_fractions = cls(phases, array.shape[1], dtype=dtype)
+            hourly_fractions._array[:] = array
+        else:
+            hourly_fractions = cls(phases, 0, dtype=dtype)
+            hourly_fractions._array = array
+        hourly_fractions._computed[:] = True
+        return hourly_fractions
+
+    @classmethod
+    def from_dict(cls, hourly_fractions, phases=None, dtype='float64'):
+        """Creates HourlyFractions from a dict of lists or arrays"""
+        phases = phases or list(hourly_fractions)
+        return cls.from_array(phases, [hourly_fractions[p] for p in phases],
+            dtype=dtype)
+
+    @property
+    def dtype(self):
+        return self._array.dtype
+
+    @property
+    def num_hours(self):
+        return self._array.shape[1]
+
+    @property
+    def nbytes(self):
+        return self._array.nbytes
+
+    @property
+    def frozen(self):
+        return not self._array.flags.writeable
+
+    @property
+    def array(self):
+        """Read-only view of the (num_phases, num_hours) array, with all
+        phases computed
+        """
+        for p in self._phases:
+            self._compute_row(p)
+        return self._read_only(self._array)
+
+    @property
+    def computed(self):
+        return [p for p, c in zip(self._phases, self._computed) if c]
+
+    def get_array(self, phase):
+        """Returns a read-only view of the phase's hourly fractions"""
+        return self._read_only(self._array[self._compute_row(phase)])
+
+    def __getitem__(self, phase):
+        values = self._lists.get(phase)
+        if values is None:
+            values = self._lists[phase] = self.get_array(phase).tolist()
+        return values
+
+    def freeze(self):
+        """Computes all phases and makes the underlying array read-only.
+        Cached lists are dropped, so that lists handed out before freezing
+        aren't shared with the frozen object's later users.
+        """
+        self.array
+        self._array.flags.writeable = False
+        self._compute = None
+        self._lists.clear()
+
+    def _compute_row(self, phase):
+        i = self._index(phase)
+        if not self._computed[i]:
+            self._array[i] = self._compute(phase)
+            self._computed[i] = True
+            self._lists.pop(phase, None)
+        return i
+
+    def _read_only(self, array):
+        view = array.view()
+        view.flags.writeable = False
+        return view
+
+
+class SparseHourlyFractions(_PhaseMapping):
+    """Read-only mapping of phase to hourly fractions, storing each phase
+    as the offset of its first value above epsilon and the values from
+    there through its last value above epsilon.  Leading and trailing
+    values at or below epsilon (e.g. area fractions outside of ignition,
+    or flaming's tail) are dropped, and their total is kept as the phase's
+    trimmed mass.
+
+    Like HourlyFractions, indexing by phase returns the full list of hourly
+    fractions, with the trimmed hours as zeros, so that it can be used
+    wherever a dict of lists is expected.  Use get_sparse for the stored
+    (offset, values) pair.
+    """
+
+    __slots__ = ('_num_hours', '_offsets', '_values', '_trimmed')
+
+    def __init__(self, phases, num_hours, offsets, values, trimmed=None):
+        """SparseHourlyFractions constructor
+
+        args:
+         - phases -- ordered keys
+         - num_hours -- number of hourly values per phase
+         - offsets -- each phase's hour offset of its first stored value
+         - values -- each phase's stored values, as lists or arrays
+
+        kwargs:
+         - trimmed -- each phase's trimmed mass; defaults to zeros
+        """
+        self._phases = tuple(phases)
+        self._num_hours = num_hours
+        self._offsets = tuple(int(o) for o in offsets)
+        self._values = tuple(self._read_only(np.asarray(v)) for v in values)
+        self._trimmed = tuple(float(t) for t in
+            (trimmed if trimmed is not None else [0.0] * len(self._phases)))
+        for o, v in zip(self._offsets, self._values):
+            if o < 0 or o + len(v) > num_hours:
+                raise ValueError("Invalid offset {} for {} values of {} "
+                    "hours".format(o, len(v), num_hours))
+
+    @classmethod
+    def from_dict(cls, hourly_fractions, epsilon=0.0, renormalize=True,
+            phases=None, dtype='float64'):
+        """Creates SparseHourlyFractions from a mapping of phase to lists or
+        arrays (e.g. a profiler's hourly_fractions), trimming each phase's
+        leading and trailing values at or below epsilon.
+
+        kwargs:
+         - epsilon -- largest value to trim
+         - renormalize -- if True, the remaining values are scaled so that
+           they keep the phase's total; otherwise, they're kept as is, and
+           the trimmed mass is left out of the total
+         - phases -- ordered keys; defaults to those of hourly_fractions
+         - dtype -- dtype of the stored values
+        """
+        phases = phases or list(hourly_fractions)
+        get_array = getattr(hourly_fractions, 'get_array', None)
+        offsets, values, trimmed = [], [], []
+        num_hours = 0
+        for p in phases:
+            v = np.asarray(get_array(p) if get_array else hourly_fractions[p],
+                dtype=dtype)
+            num_hours = len(v)
+            # NaN values aren't trimmed
+            keep = np.flatnonzero(~(np.abs(v) <= epsilon))
+            b, e = (keep[0], keep[-1] + 1) if len(keep) else (0, 0)
+            t = float(v[:b].sum() + v[e:].sum())
+            kept = v[b:e]
+            if renormalize and t and len(kept):
+                total = float(v.sum())
+                kept = kept * (total / (total - t))
+            offsets.append(b)
+            values.append(np.array(kept, dtype=dtype))
+            trimmed.append(t)
+        return cls(phases, num_hours, offsets, values, trimmed)
+
+    @property
+    def num_hours(self):
+        return self._num_hours
+
+    @property
+    def nbytes(self):
+        return sum(v.nbytes for v in self._values)
+
+    @property
+    def frozen(self):
+        return True
+
+    @property
+    def trimmed(self):
+        """Dict of each phase's trimmed mass"""
+        return dict(zip(self._phases, self._trimmed))
+
+    @property
+    def span(self):
+        """(begin, end) hour offsets covering all phases' stored values"""
+        spans = [(o, o + len(v)) for o, v in zip(self._offsets, self._values)
+            if len(v)]
+        if not spans:
+            return 0, 0
+        return min(b for b, _ in spans), max(e for _, e in spans)
+
+    @property
+    def array(self):
+        """(num_phases, num_hours) array of the full hourly fractions"""
+        return self._read_only(np.array([self._densify(i)
+            for i in range(len(self._phases))]).reshape(
+            len(self._phases), self._num_hours))
+
+    def get_sparse(self, phase):
+        """Returns the phase's (offset, values), with values read-only"""
+        i = self._index(phase)
+        return self._offsets[i], self._values[i]
+
+    def get_array(self, phase):
+        """Returns a read-only array of the phase's full hourly fractions"""
+        return self._read_only(self._densify(self._index(phase)))
+
+    def freeze(self):
+        # already read-only
+        pass
+
+    def __getitem__(self, phase):
+        return self._densify(self._index(phase)).tolist()
+
+    def __repr__(self):
+        return '{}({})'.format(self.__class__.__name__, {p: (o, v.tolist())
+            for p, o, v in zip(self._phases, self._offsets, self._values)})
+
+    def _densify(self, i):
+        values = self._values[i]
+        dense = np.zeros(self._num_hours, dtype=values.dtype)
+        dense[self._offsets[i]:self._offsets[i] + len(values)] = values
+        return dense
+
+    def _read_only(self, array):
+        view = array.view()
+        view.flags.writeable = False
+        return view
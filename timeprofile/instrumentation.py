@@ -0,0 +1,143 @@
+"""timeprofile.instrumentation
+
+Optional per-stage timing of profiler computations.
+
+    from timeprofile import instrumentation
+
+    with instrumentation.record() as recorder:
+        FepsTimeProfiler(start, end)
+    recorder.get_stats()
+    # {'FepsTimeProfiler._compute_area_fractions': StageStats(calls=1,
+    #     seconds=3.1e-05, hours=24), ...}
+
+Or, to record everything until disabled:
+
+    instrumentation.enable()
+    ...
+    instrumentation.get_stats()
+    instrumentation.disable()
+
+Stages are the profilers' methods decorated with @stage, keyed by
+qualified name.  Each stage's wall time is inclusive of the stages it
+calls (e.g. FepsTimeProfiler._compute_hourly_fractions includes
+FepsTimeProfiler._normalize).  Hours are the number of hours in the
+profiles processed.  When recording is disabled, the only overhead is a
+check of the active recorder on each call of a stage.
+
+Any object with an add(stage, seconds, hours) method can be passed to
+enable or record, e.g. to forward measurements to a metrics system.
+"""
+
+import collections
+import contextlib
+import functools
+import threading
+import time
+
+__all__ = [
+    'StageStats',
+    'Recorder',
+    'stage',
+    'enable',
+    'disable',
+    'record',
+    'get_stats'
+]
+
+StageStats = collections.namedtuple('StageStats', ['calls', 'seconds', 'hours'])
+
+# The active recorder; None when disabled
+_recorder = None
+
+
+class Recorder(object):
+    """Thread-safe accumulator of per-stage call counts, wall time, and
+    hours processed
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def add(self, stage, seconds, hours):
+        with self._lock:
+            calls, total_seconds, total_hours = self._stats.get(stage, (0, 0.0, 0))
+            self._stats[stage] = (calls + 1, total_seconds + seconds,
+                total_hours + hours)
+
+    def get_stats(self):
+        """Returns a snapshot of stats, as a dict of StageStats keyed by
+        stage name
+        """
+        with self._lock:
+            return {k: StageStats(*v) for k, v in sorted(self._stats.items())}
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+
+def stage(func=None, name=None, hours=None):
+    """Decorator that records calls of the decorated function, when
+    recording is enabled.
+
+    kwargs:
+     - name -- stage name; defaults to the function's qualified name
+     - hours -- function that takes the decorated function's args and
+       returns the number of hours processed; defaults to calling the first
+       arg's _count_hours method, if it has one (i.e. if it's a profiler)
+    """
+    if func is None:
+        return functools.partial(stage, name=name, hours=hours)
+
+    name = name or func.__qualname__
+    hours = hours or _default_hours
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        recorder = _recorder
+        if recorder is None:
+            return func(*args, **kwargs)
+
+        t = time.perf_counter()
+        result = func(*args, **kwargs)
+        recorder.add(name, time.perf_counter() - t, hours(*args, **kwargs))
+        return result
+
+    return wrapper
+
+def _default_hours(*args, **kwargs):
+    count = args and getattr(args[0], '_count_hours', None)
+    return count() if count else 0
+
+
+## Module level recording
+
+def enable(recorder=None):
+    """Starts recording to the given recorder, or a new Recorder, which is
+    returned
+    """
+    global _recorder
+    _recorder = recorder or Recorder()
+    return _recorder
+
+def disable():
+    global _recorder
+    _recorder = None
+
+@contextlib.contextmanager
+def record(recorder=None):
+    """Records stages run within the context, restoring the previously
+    active recorder (if any) on exit
+    """
+    global _recorder
+    previous = _recorder
+    recorder = enable(recorder)
+    try:
+        yield recorder
+    finally:
+        _recorder = previous
+
+def get_stats():
+    """Returns the active recorder's stats, or an empty dict if disabled"""
+    return _recorder.get_stats() if _recorder is not None else {}
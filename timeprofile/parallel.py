@@ -0,0 +1,100 @@
+"""timeprofile.parallel
+
+Profiles large collections of fires across a pool of processes.
+
+    from timeprofile import parallel
+
+    fires = [
+        {'local_start_time': start, 'local_end_time': end, 'fire_type': 'wf'},
+        ...
+    ]
+    hourly_fractions = parallel.profile_many(fires, model='feps', workers=8)
+
+Each fire is a dict of profiler constructor kwargs.  Results are returned
+in input order, as dicts of phase to list of hourly fractions (i.e. in the
+same form as a plain dict of a profiler's hourly_fractions), or, if
+epsilon is specified, as SparseHourlyFractions objects, which are smaller
+to send back from the workers and to keep in memory.  If return_errors
+is True, a fire that fails to be profiled gets the exception in place of
+its result, rather than the exception being raised, so that the other
+fires are still profiled in parallel.
+"""
+
+import concurrent.futures
+import functools
+import math
+import multiprocessing
+import os
+import sys
+
+from .cache import MODELS
+
+__all__ = [
+    'profile_many'
+]
+
+# Number of chunks per worker when chunksize isn't specified; more than
+# one, so that workers that get long activity windows don't hold up the rest
+CHUNKS_PER_WORKER = 4
+
+
+def profile_many(fires, model='feps', workers=None, chunksize=None,
+        epsilon=None, return_errors=False):
+    """Computes hourly fractions for each fire, in parallel
+
+    args:
+     - fires -- sequence of dicts of profiler constructor kwargs
+
+    kwargs:
+     - model -- 'feps' or 'static'
+     - workers -- number of worker processes; defaults to the number of
+       CPUs.  If 1, fires are profiled serially, in this process.
+     - chunksize -- number of fires sent to a worker at a time; larger
+       chunks amortize the cost of pickling inputs and results.  Defaults
+       to splitting fires into CHUNKS_PER_WORKER chunks per worker.
+     - epsilon -- if specified, results are sparse, with each phase's
+       leading and trailing values at or below epsilon trimmed, and the
+       remaining values renormalized (see profiler.sparsify)
+     - return_errors -- if True, exceptions raised profiling a fire are
+       returned as its result, instead of being raised
+    """
+    if model not in MODELS:
+        raise ValueError("Invalid model: '{}'.  Valid: '{}'".format(
+            model, "', '".join(MODELS)))
+
+    fires = list(fires)
+    workers = workers or os.cpu_count() or 1
+    if workers < 1:
+        raise ValueError("Invalid number of workers: {}".format(workers))
+
+    profile = functools.partial(_profile, model, epsilon, return_errors)
+    if workers == 1 or len(fires) <= 1:
+        return [profile(fire) for fire in fires]
+
+    chunksize = chunksize or max(1,
+        math.ceil(len(fires) / (workers * CHUNKS_PER_WORKER)))
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers,
+            mp_context=_get_mp_context()) as executor:
+        return list(executor.map(profile, fires, chunksize=chunksize))
+
+
+def _get_mp_context():
+    # Forking a process after pyarrow has started its threads can deadlock
+    # the children, so use a fork server in that case, where available;
+    # otherwise, keep the platform's default start method
+    if ('pyarrow' in sys.modules
+            and 'forkserver' in multiprocessing.get_all_start_methods()):
+        return multiprocessing.get_context('forkserver')
+    return None
+
+
+def _profile(model, epsilon, return_errors, fire):
+    try:
+        profiler = MODELS[model](**fire)
+        if epsilon is not None:
+            return profiler.sparsify(epsilon)
+        return dict(profiler.hourly_fractions)
+    except Exception as e:
+        if not return_errors:
+            raise
+        return e
@@ -0,0 +1,177 @@
+"""timeprofile.serialization
+
+Compact binary form of profile results, for passing profiles between
+pipeline stages and worker processes.
+
+    from timeprofile import serialization
+
+    data = serialization.to_bytes(profiler)
+    profile = serialization.from_bytes(data)
+    profile.start_hour, profile.resolution, profile.num_hours
+    profile.hourly_fractions.array  # (4, num_hours) view of data
+
+The format is a fixed 32 byte header, followed by the hourly fractions as
+a raw, little endian, C ordered (num_phases, num_hours) array of float64
+or float32 values.  Since the values are 8 byte aligned after the header,
+from_bytes wraps them as a numpy array without copying.  Header fields, in
+order (see HEADER):
+
+ - magic -- b'TPRF'
+ - version -- format version (VERSION)
+ - model -- index into MODEL_CODES
+ - dtype -- index into HourlyFractions.DTYPES
+ - num_phases -- number of phases, in BaseTimeProfiler.FIELDS order
+ - start -- first hour (or sub-hourly step), in seconds since
+   1970-01-01T00:00, local time.  Profiles of time zone aware windows are
+   stored in local wall time, without their time zone, so they're
+   deserialized with naive times.
+ - step -- resolution, in seconds
+ - num_hours -- number of hours (or steps)
+ - parameters -- FEPS parameters' fingerprint (see
+   FepsParameters.fingerprint); 0 for static profiles
+
+Deserialized profiles can be pickled with protocol 5 out-of-band buffers,
+in which case the serialized bytes are passed along without copying.
+"""
+
+import datetime
+import pickle
+import struct
+
+import numpy as np
+
+from . import BaseTimeProfiler
+from .feps import FepsTimeProfiler
+from .fractions import HourlyFractions
+from .static import StaticTimeProfiler
+
+__all__ = [
+    'ProfileResult',
+    'to_bytes',
+    'from_bytes'
+]
+
+MAGIC = b'TPRF'
+VERSION = 1
+HEADER = struct.Struct('<4sBBBBqIIQ')
+MODEL_CODES = ('feps', 'static')
+# Little endian dtypes, indexed by the header's dtype field
+DTYPES = tuple(np.dtype(d).newbyteorder('<') for d in HourlyFractions.DTYPES)
+EPOCH = datetime.datetime(1970, 1, 1)
+
+
+class ProfileResult(object):
+    """A deserialized profile.  Hourly fractions are a read-only
+    HourlyFractions object backed by the serialized buffer.
+    """
+
+    __slots__ = ('_buffer', 'model', 'start_hour', 'resolution',
+        'parameters_fingerprint', 'hourly_fractions')
+
+    FIELDS = BaseTimeProfiler.FIELDS
+
+    def __init__(self, buffer, model, start_hour, resolution,
+            parameters_fingerprint, hourly_fractions):
+        self._buffer = buffer
+        self.model = model
+        self.start_hour = start_hour
+        self.resolution = resolution
+        self.parameters_fingerprint = parameters_fingerprint
+        self.hourly_fractions = hourly_fractions
+
+    @property
+    def num_hours(self):
+        return self.hourly_fractions.num_hours
+
+    def to_bytes(self):
+        """Returns the serialized buffer, as passed to from_bytes"""
+        return self._buffer
+
+    def __reduce_ex__(self, protocol):
+        if protocol >= 5:
+            return from_bytes, (pickle.PickleBuffer(self._buffer),)
+        return from_bytes, (bytes(self._buffer),)
+
+    def __repr__(self):
+        return '{}(model={!r}, start_hour={!r}, resolution={!r}, num_hours={})'.format(
+            self.__class__.__name__, self.model, self.start_hour,
+            self.resolution, self.num_hours)
+
+
+def to_bytes(profiler, dtype=None):
+    """Serializes a profiler's results
+
+    args:
+     - profiler -- FepsTimeProfiler, StaticTimeProfiler, template profile
+       (see timeprofile.templates), or ProfileResult
+
+    kwargs:
+     - dtype -- 'float64' or 'float32'; defaults to the dtype of array
+       backed hourly fractions, or else 'float64'
+    """
+    if isinstance(profiler, ProfileResult):
+        if dtype is None or np.dtype(dtype) == profiler.hourly_fractions.dtype:
+            return bytes(profiler.to_bytes())
+        model, parameters = profiler.model, profiler.parameters_fingerprint
+        first_step = profiler.start_hour
+    else:
+        profiler_class = type(getattr(profiler, 'template', profiler))
+        if issubclass(profiler_class, FepsTimeProfiler):
+            model = 'feps'
+            parameters = profiler._parameters.fingerprint
+        elif issubclass(profiler_class, StaticTimeProfiler):
+            model, parameters = 'static', 0
+        else:
+            raise ValueError("Can't serialize {} objects".format(
+                profiler_class.__name__))
+        first_step = profiler._floor_step(profiler.start_hour)
+
+    hourly_fractions = profiler.hourly_fractions
+    if hasattr(hourly_fractions, 'array'):
+        values = hourly_fractions.array
+    else:
+        values = np.array([hourly_fractions[p] for p in BaseTimeProfiler.FIELDS])
+    dtype = np.dtype(dtype or getattr(hourly_fractions, 'dtype', 'float64'))
+    if dtype.name not in HourlyFractions.DTYPES:
+        raise ValueError("Invalid dtype: '{}'.  Valid: '{}'".format(
+            dtype, "', '".join(HourlyFractions.DTYPES)))
+
+    header = HEADER.pack(MAGIC, VERSION, MODEL_CODES.index(model),
+        HourlyFractions.DTYPES.index(dtype.name), values.shape[0],
+        (first_step.replace(tzinfo=None) - EPOCH) // datetime.timedelta(
+            seconds=1),
+        profiler.resolution.seconds, values.shape[1], parameters)
+    return header + np.ascontiguousarray(values,
+        dtype=DTYPES[HourlyFractions.DTYPES.index(dtype.name)]).tobytes()
+
+def from_bytes(data):
+    """Deserializes a profile serialized by to_bytes, returning a
+    ProfileResult whose hourly fractions are backed by data (a bytes-like
+    object) without copying
+    """
+    buffer = memoryview(data).cast('B')
+    if len(buffer) < HEADER.size:
+        raise ValueError("Invalid serialized profile: {} bytes".format(
+            len(buffer)))
+    (magic, version, model, dtype, num_phases, start, step, num_hours,
+        parameters) = HEADER.unpack_from(buffer)
+    if (magic != MAGIC or version != VERSION or model >= len(MODEL_CODES)
+            or dtype >= len(DTYPES)
+            or num_phases > len(BaseTimeProfiler.FIELDS)):
+        raise ValueError("Invalid serialized profile header")
+
+    dtype = DTYPES[dtype]
+    size = num_phases * num_hours
+    if len(buffer) != HEADER.size + size * dtype.itemsize:
+        raise ValueError(("Invalid serialized profile: expected {} bytes; "
+            "got {}").format(HEADER.size + size * dtype.itemsize, len(buffer)))
+
+    array = np.frombuffer(buffer, dtype=dtype, count=size,
+        offset=HEADER.size).reshape(num_phases, num_hours)
+    # read-only, so that the result is frozen (see HourlyFractions.frozen)
+    array.flags.writeable = False
+    hourly_fractions = HourlyFractions.from_array(
+        BaseTimeProfiler.FIELDS[:num_phases], array, dtype=dtype, copy=False)
+    return ProfileResult(data, MODEL_CODES[model],
+        EPOCH + datetime.timedelta(seconds=start),
+        datetime.timedelta(seconds=step), parameters, hourly_fractions)
@@ -6,16 +6,27 @@ In this simple, static time-profiling model, no environmental conditions
 
 __author__      = "Joel Dubowy"
 
+import collections.abc
 import datetime
+import math
 from collections import defaultdict
 
+import numpy as np
 from nested_dict import nested_dict
-from functools import reduce
+from functools import lru_cache
 
-from . import BaseTimeProfiler, InvalidStartEndTimesError
+from . import (
+    BaseTimeProfiler,
+    BaseBatchTimeProfiler,
+    InvalidStartEndTimesError
+)
+from .fractions import HourlyFractions
+from .instrumentation import stage
 
 __all__ = [
     'StaticTimeProfiler',
+    'StaticBatchProfiler',
+    'HourlyFractionSet',
     'InvalidHourlyFractionsError'
 ]
 
@@ -24,6 +35,9 @@ class InvalidHourlyFractionsError(ValueError):
 
 class StaticTimeProfiler(BaseTimeProfiler):
 
+    __slots__ = ('start_hour', 'end_hour', '_first_hour_offset',
+        '_last_hour_offset', '_num_hours', '_input_hourly_fractions')
+
     DEFAULT_DAILY_HOURLY_FRACTIONS = defaultdict(lambda: [
         0.005700, # 00:00 (local time)
         0.005700, # 01:00
@@ -59,7 +73,8 @@ class StaticTimeProfiler(BaseTimeProfiler):
     values in wrap_time_profile add up to 0.9998)
     """
 
-    def __init__(self, local_start_time, local_end_time, hourly_fractions=None): #, **options):
+    def __init__(self, local_start_time, local_end_time, hourly_fractions=None,
+            dtype=None, resolution=None): #, **options):
         """StaticTimeProfiler constructor
 
         kwargs:
@@ -74,11 +89,33 @@ class StaticTimeProfiler(BaseTimeProfiler):
            in hourly_fractions will *not* be applied from index 0 through 23.
            Whenever len(hourly_fractions) == 24 (regardless of the start/end),
            the local hour of day is used as the index to hourly_fractions.
+         - dtype - if specified ('float64' or 'float32'), computed hourly
+           fractions are stored in an array backed HourlyFractions object
+         - resolution - timedelta that evenly divides one hour (e.g. 15
+           minutes); defaults to one hour.  With a sub-hourly resolution,
+           start_hour and end_hour are the first and last steps, the
+           profile has one value per step, and each hour's fraction is
+           redistributed evenly over the hour's steps.  hourly_fractions
+           are still given per hour.
         """
-        # _compute_hourly_fractions will set self.start_hour, self.end_hour,
-        # and self.hourly_fractions
+        self._set_dtype(dtype)
+        self._set_resolution(resolution)
         self._set_times(local_start_time, local_end_time)
-        self._compute_hourly_fractions(hourly_fractions)
+        self._validate_hourly_fractions(math.ceil((local_end_time
+            - self._floor_hour(local_start_time)) / self.ONE_HOUR),
+            hourly_fractions)
+        self._input_hourly_fractions = self._copy_hourly_fractions(
+            hourly_fractions)
+
+        # Hourly fractions are computed on first access, so that they're
+        # not materialized if only streamed with iter_hourly_fractions
+        self._hourly_fractions = None
+
+    @property
+    def hourly_fractions(self):
+        if self._hourly_fractions is None:
+            self._compute_hourly_fractions()
+        return self._hourly_fractions
 
     ##
     ## Validation Methods
@@ -86,9 +123,16 @@ class StaticTimeProfiler(BaseTimeProfiler):
 
     def _validate_hourly_fractions(self, num_hours, hourly_fractions):
         """Raises an InvalidHourlyFractionsError exception if validation
-        fails.
+        fails.  HourlyFractionSet objects were validated on construction,
+        so only their length is checked against the window.
         """
-        if hourly_fractions:
+        if isinstance(hourly_fractions, HourlyFractionSet):
+            if hourly_fractions.num_hours not in (24, num_hours):
+                raise InvalidHourlyFractionsError(
+                    "There must be 24 or {} hourly fractions that sum to 1.00"
+                    " for each of the '{}' fields".format(
+                    num_hours, ', '.join(self.FIELDS)))
+        elif hourly_fractions:
             for k in self.FIELDS:
                 if (len(hourly_fractions.get(k, [])) not in (24, num_hours) or
                         abs(1 - sum(hourly_fractions[k])) > 0.001):
@@ -97,14 +141,28 @@ class StaticTimeProfiler(BaseTimeProfiler):
                         " for each of the '{}' fields".format(
                         num_hours, ', '.join(self.FIELDS)))
 
+    def _copy_hourly_fractions(self, hourly_fractions):
+        """Returns an immutable copy of validated custom hourly fractions,
+        so that changes to the caller's lists don't affect hourly fractions
+        computed on first access
+        """
+        if not hourly_fractions:
+            return self.DEFAULT_DAILY_HOURLY_FRACTIONS
+        if isinstance(hourly_fractions, HourlyFractionSet):
+            return hourly_fractions
+        return {p: tuple(hourly_fractions[p]) for p in self.FIELDS}
+
 
     ##
     ## Computing Hourly Fractions
     ##
 
 
+    @stage
     def _set_times(self, local_start_time, local_end_time):
-        """Sets start and end times, and start/end hour offsets
+        """Sets start and end times, start/end hour offsets (in seconds),
+        and number of hours.  With a sub-hourly resolution, these are
+        the first and last steps, offsets into them, and number of steps.
 
         Args:
          - local_start_time --
@@ -112,55 +170,419 @@ class StaticTimeProfiler(BaseTimeProfiler):
         """
         self._validate_start_end_times(local_start_time, local_end_time)
 
-        self._first_hour_offset = datetime.timedelta(
-            minutes=local_start_time.minute, seconds=local_start_time.second)
-        self.start_hour = local_start_time - self._first_hour_offset
+        step_seconds = self._resolution.seconds
+        self._first_hour_offset = (60 * local_start_time.minute
+            + local_start_time.second) % step_seconds
+        self.start_hour = local_start_time - datetime.timedelta(
+            seconds=self._first_hour_offset)
 
-        if local_end_time.time() == datetime.time(local_end_time.hour):
-            # fire ended exactly on the hour
-            self.end_hour = local_end_time - self.ONE_HOUR
-            self._last_hour_offset = self.ONE_HOUR
+        last_hour_offset = (60 * local_end_time.minute
+            + local_end_time.second) % step_seconds
+        if last_hour_offset == 0 and local_end_time.microsecond == 0:
+            # fire ended exactly on the hour (or step)
+            self._last_hour_offset = step_seconds
         else:
-            self._last_hour_offset = datetime.timedelta(
-                minutes=local_end_time.minute, seconds=local_end_time.second)
-            self.end_hour = local_end_time - self._last_hour_offset
+            self._last_hour_offset = last_hour_offset
+        self.end_hour = local_end_time - datetime.timedelta(
+            seconds=self._last_hour_offset)
 
-    def _compute_hourly_fractions(self, hourly_fractions):
+        # TODO: use math.ceil instead of int? (should have divided evenly, so prob not)
+        self._num_hours = int((self.end_hour - self.start_hour).total_seconds()
+            / step_seconds) + 1
+
+    def _compute_num_hours(self):
+        return self._num_hours
+
+    @stage
+    def _compute_hourly_fractions(self):
         """Determines what fraction of the fire's emissions occur in each
         calendar hour of the fire's duration.
 
         For example, if....
 
-        Args:
-         - hourly_fractions --
+        Sub-hourly profiles are computed with the vectorized kernel used
+        for streaming (see _iter_chunks).
         """
+        if self._resolution != self.ONE_HOUR:
+            _, *values = next(self._iter_chunks(self._num_hours))
+            new_hourly_fractions = {p: v.tolist()
+                for p, v in zip(self.FIELDS, values)}
+            if self._dtype:
+                new_hourly_fractions = HourlyFractions.from_array(self.FIELDS,
+                    values, dtype=self._dtype)
+            self._hourly_fractions = new_hourly_fractions
+            return
 
-        # TODO: use math.ceil instead of int? (should have divided evenly, so prob not)
-        num_hours = int((self.end_hour - self.start_hour).total_seconds() / 3600) + 1
-        self._validate_hourly_fractions(num_hours, hourly_fractions)
+        hourly_fractions = self._input_hourly_fractions
+        num_hours = self._num_hours
+        first_hour_of_day = self.start_hour.hour
+
+        num_days, remainder = divmod(num_hours, 24)
+        r = np.empty((len(self.FIELDS), num_hours))
+        for i, p in enumerate(self.FIELDS):
+            values, diurnal_table = _get_phase_values(hourly_fractions, p)
+            if diurnal_table:
+                # index by local hour of day, tiling whole days of the
+                # table rotated to start at the first hour
+                rotation = diurnal_table.rotations[first_hour_of_day]
+                r[i, :num_days * 24].reshape(num_days, 24)[:] = rotation
+                r[i, num_days * 24:] = rotation[:remainder]
+            else:
+                r[i] = values[:num_hours]
+        r[:, 0] *= (3600 - self._first_hour_offset) / 3600
+        if num_hours > 1:
+            r[:, -1] *= self._last_hour_offset / 3600
 
-        hourly_fractions = hourly_fractions or self.DEFAULT_DAILY_HOURLY_FRACTIONS
+        # Normalize so that it all adds up to 1.0.  Totals are summed
+        # sequentially, hour by hour, as reduce would
+        r /= np.add.accumulate(r, axis=1)[:, -1:]
 
-        # TODO: if more efficient, iterate by phase within the while loop
-        new_hourly_fractions = {}
+        if self._dtype:
+            self._hourly_fractions = HourlyFractions.from_array(self.FIELDS,
+                r, dtype=self._dtype)
+        else:
+            self._hourly_fractions = dict(zip(self.FIELDS, r.tolist()))
+
+    def _iter_chunks(self, chunk_size):
+        """Streams the profile.  Each phase's normalization total is
+        computed up front from whole days' sums of the daily hourly
+        fractions, with the first and last hours' partial weights applied.
+
+        With a sub-hourly resolution, each step gets its hour's fraction
+        (the equal split of the hour's fraction over its steps cancels in
+        normalization), and the hours spanned by the window are weighted by
+        their number of steps.
+        """
+        num_steps = self._num_hours
+        step_seconds = self._resolution.seconds
+        steps_per_hour = 3600 // step_seconds
+        # index, within its hour, of the first step
+        first_step = (self.start_hour.minute * 60
+            + self.start_hour.second) // step_seconds
+        num_hours = (first_step + num_steps - 1) // steps_per_hour + 1
+        first_weight = (step_seconds - self._first_hour_offset) / step_seconds
+        last_weight = self._last_hour_offset / step_seconds
+        first_hour_of_day = self.start_hour.hour
+
+        tables = []
         for p in self.FIELDS:
-            num_hourly_fractions = len(hourly_fractions[p])
-            r = []
-            i = 0
-            d = self.start_hour
-            while d <= self.end_hour:
-                idx = d.hour if num_hourly_fractions == 24 else i
-                f = hourly_fractions[p][idx]
-                if d == self.start_hour:
-                    f *= (3600 - self._first_hour_offset.seconds) / 3600
-                elif d == self.end_hour:
-                    f *= self._last_hour_offset.seconds / 3600
-                r.append(f)
-                d += self.ONE_HOUR
-                i += 1
+            values, diurnal_table = _get_phase_values(
+                self._input_hourly_fractions, p)
+            if diurnal_table:
+                table = diurnal_table.table
+                total = diurnal_table.get_total(first_hour_of_day, num_hours)
+                first, last = table[first_hour_of_day], table[
+                    (first_hour_of_day + num_hours - 1) % 24]
+            else:
+                table = np.asarray(values, dtype=float)
+                total = table.sum()
+                first, last = table[0], table[-1]
+            if steps_per_hour > 1:
+                # exclude the steps of the first and last hours that are
+                # outside of the window
+                total = (total * steps_per_hour - first * first_step - last
+                    * (num_hours * steps_per_hour - first_step - num_steps))
+            total -= first * (1 - first_weight)
+            if num_steps > 1:
+                total -= last * (1 - last_weight)
+            tables.append((table, total))
 
-            # Normalize so that it all adds up to 1.0
-            total = reduce(lambda x, y: x + y, r)
-            new_hourly_fractions[p] = [x / total for x in r]
+        for b in range(0, num_steps, chunk_size):
+            steps = np.arange(b, min(b + chunk_size, num_steps))
+            hours = (first_step + steps) // steps_per_hour
+            weights = np.ones(len(steps))
+            weights[steps == num_steps - 1] = last_weight
+            weights[steps == 0] = first_weight
+            chunk = [self._step_times(self.start_hour, steps)]
+            for table, total in tables:
+                idx = (first_hour_of_day + hours) % 24 if len(table) == 24 else hours
+                chunk.append(table[idx] * weights / total)
+            yield tuple(chunk)
+
+
+class _DiurnalTable(object):
+    """A 24 hour table of daily hourly fractions, with its cyclic
+    cumulative sums, so that the sum of the table over any number of
+    consecutive hours, starting at any hour of day, takes constant time.
+    """
+
+    __slots__ = ('table', 'cumulative', 'rotations')
+
+    def __init__(self, values):
+        self.table = np.asarray(values, dtype=float)
+        self.table.flags.writeable = False
+        # cumulative[i] is the sum of the first i hours of two days
+        self.cumulative = np.concatenate([[0.0],
+            np.cumsum(np.tile(self.table, 2))])
+        # rotations[h] is the table starting at hour of day h
+        self.rotations = np.lib.stride_tricks.sliding_window_view(
+            np.tile(self.table, 2)[:47], 24)
+
+    def get_total(self, first_hour_of_day, num_hours):
+        """Returns the sum of the table over num_hours hours, starting at
+        first_hour_of_day: whole days' sums plus the remainder's
+        """
+        remainder = num_hours % 24
+        return ((num_hours // 24) * self.cumulative[24]
+            + self.cumulative[first_hour_of_day + remainder]
+            - self.cumulative[first_hour_of_day])
+
+# Tables are shared by all profilers using the same daily hourly fractions
+# (e.g. the defaults)
+@lru_cache(maxsize=256)
+def _get_diurnal_table(values):
+    return _DiurnalTable(values)
+
+def _get_phase_values(hourly_fractions, phase):
+    """Returns the phase's hourly fractions and, if there are 24 (i.e.
+    daily hourly fractions), their _DiurnalTable
+    """
+    if isinstance(hourly_fractions, HourlyFractionSet):
+        return (hourly_fractions.get_array(phase),
+            hourly_fractions._diurnal_tables[phase])
+    values = hourly_fractions[phase]
+    if len(values) == 24:
+        return values, _get_diurnal_table(tuple(values))
+    return values, None
+
+
+class HourlyFractionSet(collections.abc.Mapping):
+    """Custom hourly fractions, validated once and stored as a contiguous,
+    read-only (num_phases, num_hours) float64 array, e.g. for curves loaded
+    from config and shared by many fires.
+
+    Sets are trusted: StaticTimeProfiler and StaticBatchProfiler accept
+    them without re-summing each phase, only checking that the number of
+    hourly fractions fits the activity window.  Like HourlyFractions,
+    indexing by phase returns a list; use get_array, or the array property,
+    for read-only views of the underlying array.
+    """
+
+    __slots__ = ('_array', '_diurnal_tables', '_key')
+
+    FIELDS = StaticTimeProfiler.FIELDS
+
+    # Maximum deviation from 1.00 of each phase's sum
+    TOLERANCE = 0.001
+
+    def __init__(self, hourly_fractions):
+        """HourlyFractionSet constructor
+
+        args:
+         - hourly_fractions -- dict of the same number of hourly fractions
+           (24 for daily hourly fractions, or one per hour of an activity
+           window) for each of the FIELDS, each summing to 1.00
+        """
+        try:
+            array = np.array([hourly_fractions[p] for p in self.FIELDS],
+                dtype=float)
+        except (KeyError, ValueError):
+            array = np.empty((0, 0))
+        if array.ndim != 2 or not array.shape[1] or self.validate_table(
+                array[np.newaxis])[0]:
+            raise InvalidHourlyFractionsError(
+                "There must be the same number of hourly fractions, summing"
+                " to 1.00, for each of the '{}' fields".format(
+                ', '.join(self.FIELDS)))
+
+        array.flags.writeable = False
+        self._array = array
+        self._key = tuple((p, tuple(v)) for p, v in zip(self.FIELDS,
+            array.tolist()))
+        self._diurnal_tables = {p: _get_diurnal_table(v)
+            if len(v) == 24 else None for p, v in self._key}
+
+    @classmethod
+    def validate_table(cls, table, num_hours=None):
+        """Validates many sets of hourly fractions at once, e.g. per-fire
+        custom hourly fractions loaded from a table, returning a boolean
+        array that's True for each invalid row
+
+        args:
+         - table -- (num_rows, num_phases, num_hours) array, with phases in
+           FIELDS order
+
+        kwargs:
+         - num_hours -- if specified, rows must have either 24 hourly
+           fractions or this many (a single number or one per row)
+        """
+        table = np.asarray(table, dtype=float)
+        if table.ndim != 3 or table.shape[1] != len(cls.FIELDS):
+            return np.ones(len(table) if table.ndim else 1, dtype=bool)
+
+        # NaN sums are invalid as well
+        invalid = ~(np.abs(1 - table.sum(axis=2))
+            <= cls.TOLERANCE).all(axis=1)
+        if num_hours is not None:
+            invalid |= (table.shape[2] != 24) & (
+                table.shape[2] != np.asarray(num_hours))
+        return invalid
+
+    @property
+    def num_hours(self):
+        return self._array.shape[1]
 
-        self.hourly_fractions = new_hourly_fractions
+    @property
+    def nbytes(self):
+        return self._array.nbytes
+
+    @property
+    def frozen(self):
+        return True
+
+    @property
+    def array(self):
+        """Read-only (num_phases, num_hours) array"""
+        return self._array
+
+    @property
+    def key(self):
+        """Hashable ((phase, values), ...) tuple, as used in cache keys"""
+        return self._key
+
+    def get_array(self, phase):
+        """Returns a read-only view of the phase's hourly fractions"""
+        return self._array[self._index(phase)]
+
+    def freeze(self):
+        """No-op; sets are always read-only"""
+
+    def __getitem__(self, phase):
+        return list(self._key[self._index(phase)][1])
+
+    def __iter__(self):
+        return iter(self.FIELDS)
+
+    def __len__(self):
+        return len(self.FIELDS)
+
+    def __contains__(self, phase):
+        return phase in self.FIELDS
+
+    def __repr__(self):
+        return '{}(num_hours={})'.format(self.__class__.__name__,
+            self.num_hours)
+
+    def _index(self, phase):
+        if phase not in self.FIELDS:
+            raise KeyError(phase)
+        return self.FIELDS.index(phase)
+
+
+class StaticBatchProfiler(BaseBatchTimeProfiler):
+    """Computes static hourly fractions for many fires at once.
+
+    All fires are profiled against a shared 24 hour table of daily hourly
+    fractions or, if groups is specified, against one of several tables.
+    """
+
+    def __init__(self, local_start_times, local_end_times,
+            hourly_fractions=None, groups=None):
+        """StaticBatchProfiler constructor
+
+        kwargs:
+         - hourly_fractions - custom daily hourly fractions, with 24 values
+           (00:00 through 23:00 local time) for each of the FIELDS; or, if
+           groups is specified, a list of such tables.  Tables that are
+           HourlyFractionSet objects aren't re-validated.
+         - groups - index, for each fire, into the list of hourly_fractions
+           tables
+        """
+        self._set_times(local_start_times, local_end_times)
+        self._set_tables(hourly_fractions, groups)
+        self._compute_hourly_fractions()
+
+    @property
+    def start_hour(self):
+        return self._start_hour
+
+    @property
+    def end_hour(self):
+        return self._end_hour
+
+
+    ##
+    ## Validation Methods
+    ##
+
+    def _validate_hourly_fractions(self, tables, trusted=False):
+        """Raises an InvalidHourlyFractionsError exception if any table
+        fails validation.  Trusted tables (i.e. HourlyFractionSet objects)
+        are only checked for their shape.
+        """
+        if tables.shape[1:] != (len(self.FIELDS), 24) or (not trusted and
+                HourlyFractionSet.validate_table(tables).any()):
+            raise InvalidHourlyFractionsError(
+                "There must be 24 hourly fractions that sum to 1.00"
+                " for each of the '{}' fields".format(', '.join(self.FIELDS)))
+
+
+    ##
+    ## Computing Hourly Fractions
+    ##
+
+    @stage
+    def _set_times(self, local_start_times, local_end_times):
+        """Vectorized version of StaticTimeProfiler._set_times"""
+        self._start = np.asarray(local_start_times, dtype='datetime64[us]').ravel()
+        end = self._time_column(local_end_times, 'end time')
+        self._validate_start_end_times(self._start, end)
+
+        # Only minutes and seconds are considered in partial hour offsets
+        one_second = np.timedelta64(1, 's')
+        self._start_hour = self._start.astype('datetime64[h]')
+        self._first_hour_offset = (self._start - self._start_hour) // one_second
+
+        end_hour = end.astype('datetime64[h]')
+        on_the_hour = end == end_hour
+        self._last_hour_offset = np.where(on_the_hour, 3600,
+            (end - end_hour) // one_second)
+        self._end_hour = end_hour - on_the_hour.astype('int64') * self.ONE_HOUR
+
+        self._num_hours = ((self._end_hour - self._start_hour)
+            // self.ONE_HOUR) + 1
+
+    def _set_tables(self, hourly_fractions, groups):
+        if not hourly_fractions:
+            tables = [StaticTimeProfiler.DEFAULT_DAILY_HOURLY_FRACTIONS]
+        elif groups is None:
+            tables = [hourly_fractions]
+        else:
+            tables = hourly_fractions
+        self._groups = self._column(0 if groups is None else groups,
+            'int64', 'group')
+
+        trusted = all(isinstance(t, HourlyFractionSet) for t in tables)
+        try:
+            self._tables = np.array([t.array if trusted
+                else [t[p] for p in self.FIELDS] for t in tables], dtype=float)
+        except (KeyError, ValueError):
+            self._tables = np.empty((0, 0, 0))
+        if hourly_fractions:
+            self._validate_hourly_fractions(self._tables, trusted)
+
+        if ((self._groups < 0) | (self._groups >= len(self._tables))).any():
+            raise ValueError("Groups must be indices into the {} hourly"
+                " fractions tables".format(len(self._tables)))
+
+    @stage
+    def _compute_hourly_fractions(self):
+        """Vectorized version of StaticTimeProfiler._compute_hourly_fractions"""
+        num_fires = self.num_fires
+        hours = np.arange(self._num_hours.max())
+        first_hour_of_day = (self._start_hour
+            - self._start_hour.astype('datetime64[D]')) // self.ONE_HOUR
+        hour_of_day = (first_hour_of_day[:, np.newaxis] + hours) % 24
+
+        # Partial first and last hour weights; as in StaticTimeProfiler,
+        # only the first hour's weight is applied to a single hour profile
+        weights = np.where(hours < self._num_hours[:, np.newaxis], 1.0, 0.0)
+        weights[np.arange(num_fires), self._num_hours - 1] = np.where(
+            self._num_hours > 1, self._last_hour_offset / 3600, 1.0)
+        weights[:, 0] = (3600 - self._first_hour_offset) / 3600
+
+        self._hourly_fractions = {}
+        for i, p in enumerate(self.FIELDS):
+            r = self._tables[self._groups[:, np.newaxis], i, hour_of_day] * weights
+            # Normalize so that it all adds up to 1.0
+            self._hourly_fractions[p] = r / r.sum(axis=1, keepdims=True)
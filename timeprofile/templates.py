@@ -0,0 +1,159 @@
+"""timeprofile.templates
+
+Shift-invariant profile templates.
+
+A profile doesn't depend on the absolute date of its activity window, but
+only on
+
+ - the start, end, and (FEPS) ignition times relative to the first hour
+   of the window,
+ - the local hour of day of the first hour, when static profiling uses
+   24 hour daily tables of hourly fractions, and
+ - the profiler's other inputs.
+
+Profiles are computed once per such signature, anchored at a reference
+date, and then re-anchored to each fire's activity window.  Since
+templates are cached for the life of the process, runs covering many days
+of the same fires reuse the templates from previous days.
+
+    from timeprofile import templates
+
+    profile = templates.get_profile('feps', local_start_time, local_end_time)
+    profile.start_hour
+    profile.hourly_fractions['flaming']
+"""
+
+import datetime
+import inspect
+
+import numpy as np
+
+from .cache import ProfilerCache
+from .feps import FepsTimeProfiler
+from .static import StaticTimeProfiler
+
+__all__ = [
+    'AnchoredProfile',
+    'TemplateCache',
+    'get_profile',
+    'get_stats',
+    'configure',
+    'clear'
+]
+
+REFERENCE_TIME = datetime.datetime(2000, 1, 1)
+
+
+class AnchoredProfile(object):
+    """A template profiler's results, re-anchored to a fire's activity
+    window.  All attributes are those of the template profiler, with
+    datetime attributes shifted to the fire's window.  Hourly fractions are
+    shared with the template, and are therefore read-only.
+    """
+
+    __slots__ = ('_template', '_shift')
+
+    def __init__(self, template, shift):
+        self._template = template
+        self._shift = shift
+
+    @property
+    def template(self):
+        return self._template
+
+    def iter_hourly_fractions(self, chunk_size=None):
+        """The template's iter_hourly_fractions, with hours shifted to the
+        fire's window
+        """
+        if chunk_size is None:
+            return ((hour + self._shift,) + tuple(values) for hour, *values
+                in self._template.iter_hourly_fractions())
+        shift = np.timedelta64(self._shift).astype('timedelta64[h]')
+        return ((hours + shift,) + tuple(values) for hours, *values
+            in self._template.iter_hourly_fractions(chunk_size))
+
+    def __getattr__(self, name):
+        if name in self.__slots__:
+            raise AttributeError(name)
+        value = getattr(self._template, name)
+        if isinstance(value, datetime.datetime):
+            return value + self._shift
+        return value
+
+
+class TemplateCache(ProfilerCache):
+    """Cache of template profilers, keyed on relative offsets of activity
+    window (and ignition) times along with the profilers' other inputs.
+    """
+
+    def get_profile(self, model, *args, **kwargs):
+        """Returns an AnchoredProfile for the given model ('feps' or
+        'static') and constructor arguments.
+        """
+        profiler_class = self._get_profiler_class(model)
+        bound = inspect.signature(profiler_class).bind(*args, **kwargs)
+        bound.apply_defaults()
+        arguments = bound.arguments
+
+        start = arguments['local_start_time']
+        first_hour = start.replace(minute=0, second=0, microsecond=0)
+        # in the window's time zone, if any, so that it can be subtracted
+        reference = REFERENCE_TIME.replace(tzinfo=start.tzinfo)
+
+        if profiler_class is FepsTimeProfiler:
+            ignition_args = ('local_ignition_start_time',
+                'local_ignition_end_time')
+            if not any(arguments[k] for k in ignition_args):
+                # Resolve default ignition times relative to the fire's own
+                # window, since they depend on its hour of day.  Defaults
+                # derived from a given ignition time are only relative to
+                # that time, and may fall outside of the window, so those
+                # are left to the template profiler.
+                (arguments['local_ignition_start_time'],
+                    arguments['local_ignition_end_time']) = (
+                    FepsTimeProfiler.get_ignition_times(start,
+                        arguments['local_end_time']))
+            time_args = ('local_start_time', 'local_end_time') + tuple(
+                k for k in ignition_args if arguments[k])
+
+        else:
+            hourly_fractions = (arguments['hourly_fractions']
+                or StaticTimeProfiler.DEFAULT_DAILY_HOURLY_FRACTIONS)
+            try:
+                daily = any(len(hourly_fractions[p]) == 24
+                    for p in StaticTimeProfiler.FIELDS)
+            except KeyError:
+                # invalid; let the profiler raise the appropriate exception
+                daily = False
+            if daily:
+                reference += datetime.timedelta(hours=first_hour.hour)
+            time_args = ('local_start_time', 'local_end_time')
+
+        for k in time_args:
+            arguments[k] = arguments[k] - first_hour + reference
+
+        key = self._canonicalize(profiler_class, (), arguments)
+        template = self.get(key,
+            lambda: self._create_profiler(profiler_class, (), arguments))
+        return AnchoredProfile(template, first_hour - reference)
+
+
+## Module level cache
+
+_cache = TemplateCache()
+
+def get_profile(model, *args, **kwargs):
+    """Returns an AnchoredProfile from the module level template cache.
+    See TemplateCache.get_profile
+    """
+    return _cache.get_profile(model, *args, **kwargs)
+
+def get_stats():
+    return _cache.get_stats()
+
+def configure(max_entries=None, max_bytes=None):
+    """Sets the module level cache's size limits; None for no limit"""
+    _cache.configure(max_entries=max_entries, max_bytes=max_bytes)
+
+def clear():
+    _cache.clear()
@@ -0,0 +1,334 @@
+"""timeprofile.validation
+
+Exception-free validation of batch inputs.  Every fire is checked with
+array operations, and invalid fires are reported with error codes and
+messages, rather than by raising on the first one.
+
+    from timeprofile import validation
+    from timeprofile.feps import FepsBatchProfiler
+
+    result = validation.validate_feps(start_times, end_times,
+        fire_types=fire_types, moisture_categories=moisture_categories)
+    result.valid  # boolean mask of valid fires
+    result.codes  # each fire's error code (OK if valid)
+    result.summary  # {'invalid_fire_type': 12, ...}
+    for error in result.errors:
+        error.index, error.code, error.message
+    if result.valid.any():
+        batch = FepsBatchProfiler(**result.inputs)
+
+validate_feps and validate_static take the same arguments as
+FepsBatchProfiler and StaticBatchProfiler.  Each fire is given the code of
+the first check it fails, in the order the profilers check their inputs.
+result.inputs are the arguments restricted to the valid fires (and, for
+static runs, to the valid hourly fractions tables), which the batch
+profilers accept without raising.  Inputs with the wrong number of values
+aren't errors of individual fires, and raise ValueError as they do in the
+batch profilers.
+"""
+
+import collections
+
+import numpy as np
+
+from .feps import FireType, MoistureCategory, _fill_ignition_times
+from .static import HourlyFractionSet, StaticTimeProfiler
+
+__all__ = [
+    'ValidationError',
+    'ValidationResult',
+    'validate_feps',
+    'validate_static'
+]
+
+## Error codes
+
+OK = 0
+INVALID_START_END_TIMES = 1
+INVALID_IGNITION_START_TIME = 2
+INVALID_IGNITION_END_TIME = 3
+INVALID_IGNITION_TIMES = 4
+INVALID_FIRE_TYPE = 5
+INVALID_MOISTURE_CATEGORY = 6
+INVALID_GROUP = 7
+INVALID_HOURLY_FRACTIONS = 8
+
+# Indexed by error code
+CODE_NAMES = ('ok', 'invalid_start_end_times', 'invalid_ignition_start_time',
+    'invalid_ignition_end_time', 'invalid_ignition_times',
+    'invalid_fire_type', 'invalid_moisture_category', 'invalid_group',
+    'invalid_hourly_fractions')
+
+ValidationError = collections.namedtuple('ValidationError',
+    ['index', 'code', 'message'])
+
+
+class ValidationResult(object):
+    """Per-fire results of validating a batch's inputs"""
+
+    __slots__ = ('_codes', '_messages', '_inputs')
+
+    def __init__(self, codes, messages, inputs):
+        """ValidationResult constructor
+
+        args:
+         - codes -- each fire's error code
+         - messages -- dict of error code to (message template, columns),
+           where the template is formatted with each column's value for
+           the fire
+         - inputs -- batch profiler arguments, restricted to valid fires
+        """
+        self._codes = codes
+        self._messages = messages
+        self._inputs = inputs
+
+    @property
+    def num_fires(self):
+        return len(self._codes)
+
+    @property
+    def codes(self):
+        return self._codes
+
+    @property
+    def valid(self):
+        return self._codes == OK
+
+    @property
+    def num_invalid(self):
+        return int(np.count_nonzero(self._codes))
+
+    @property
+    def summary(self):
+        """Dict of error code name to the number of fires with that error"""
+        counts = np.bincount(self._codes, minlength=len(CODE_NAMES))
+        return {CODE_NAMES[c]: int(n) for c, n in enumerate(counts)
+            if c != OK and n}
+
+    @property
+    def errors(self):
+        """List of ValidationError tuples, one per invalid fire, in fire
+        order
+        """
+        return [self.get_error(i) for i in np.flatnonzero(self._codes)]
+
+    @property
+    def inputs(self):
+        """Dict of batch profiler arguments, restricted to the valid fires"""
+        return self._inputs
+
+    def get_error(self, i):
+        """Returns fire i's ValidationError, or None if it's valid"""
+        code = int(self._codes[i])
+        if code == OK:
+            return None
+        template, columns = self._messages[code]
+        return ValidationError(int(i), code,
+            template.format(*[c[i] for c in columns]))
+
+    def __repr__(self):
+        return '{}(num_fires={}, num_invalid={})'.format(
+            self.__class__.__name__, self.num_fires, self.num_invalid)
+
+
+def validate_feps(local_start_times, local_end_times,
+        local_ignition_start_times=None, local_ignition_end_times=None,
+        fire_types=FireType.RX, moisture_categories='moderate', **inputs):
+    """Validates FepsBatchProfiler inputs, returning a ValidationResult
+
+    Takes the same arguments as FepsBatchProfiler.  Only times, fire types,
+    and moisture categories are checked per fire; missing numeric values
+    are filled with defaults by the profiler, as usual.
+    """
+    start = np.asarray(local_start_times, dtype='datetime64[us]').ravel()
+    num_fires = len(start)
+    end = _column(local_end_times, 'datetime64[us]', 'end time', num_fires)
+    ig_start = _column(local_ignition_start_times, 'datetime64[us]',
+        'ignition start time', num_fires)
+    ig_end = _column(local_ignition_end_times, 'datetime64[us]',
+        'ignition end time', num_fires)
+    codes = np.zeros(num_fires, dtype='int64')
+
+    # Same checks, in the same order, as FepsBatchProfiler
+    _flag(codes, ~(start < end), INVALID_START_END_TIMES)
+    for t, code in ((ig_start, INVALID_IGNITION_START_TIME),
+            (ig_end, INVALID_IGNITION_END_TIME)):
+        _flag(codes, ~np.isnat(t) & ((t < start) | (t > end)), code)
+    _flag(codes, ~np.isnat(ig_start) & ~np.isnat(ig_end) & ~(ig_start < ig_end),
+        INVALID_IGNITION_TIMES)
+    # Default ignition windows are shrunk to fit the activity window, so
+    # are empty for windows that end before the default start (e.g. before
+    # 09:00), which the profilers can't profile.  Only fires that have
+    # passed the checks so far (e.g. that have end times) are filled in.
+    filled_ig_start, filled_ig_end = ig_start.copy(), ig_end.copy()
+    checked = codes == OK
+    filled_ig_start[checked], filled_ig_end[checked] = _fill_ignition_times(
+        start[checked], end[checked], ig_start[checked], ig_end[checked])
+    _flag(codes, checked & ~(filled_ig_start < filled_ig_end),
+        INVALID_IGNITION_TIMES)
+
+    fire_types = _lower(_column(fire_types, str, 'fire type', num_fires))
+    _flag(codes, ~np.isin(fire_types, FireType.VALID_FIRE_TYPES),
+        INVALID_FIRE_TYPE)
+
+    if isinstance(moisture_categories, (str, MoistureCategory)):
+        # a single category, shared by all fires
+        category = moisture_categories
+        moisture_categories = np.full(num_fires, category, dtype=object)
+        _flag(codes, not _is_moisture_category_value(category),
+            INVALID_MOISTURE_CATEGORY)
+    else:
+        category = None
+        moisture_categories = _column(moisture_categories, None,
+            'moisture category', num_fires)
+        _flag(codes, ~_is_moisture_category(moisture_categories),
+            INVALID_MOISTURE_CATEGORY)
+
+    messages = {
+        INVALID_START_END_TIMES: ("The fire's start time, {}, is not before"
+            " its end time, {}", (start, end)),
+        INVALID_IGNITION_START_TIME: ("Ignition start time - {} - isn't"
+            " within start / end times - {} / {}", (ig_start, start, end)),
+        INVALID_IGNITION_END_TIME: ("Ignition end time - {} - isn't within"
+            " start / end times - {} / {}", (ig_end, start, end)),
+        INVALID_IGNITION_TIMES: ("The fire's ignition start time, {}, is not"
+            " before its end time, {}", (filled_ig_start, filled_ig_end)),
+        INVALID_FIRE_TYPE: ("Invalid fire type: '{}'.  Valid: '"
+            + "', '".join(FireType.VALID_FIRE_TYPES) + "'", (fire_types,)),
+        INVALID_MOISTURE_CATEGORY: ("Invalid moisture category: {}",
+            (moisture_categories,))
+    }
+
+    valid = codes == OK
+    inputs = {k: _take(v, valid, num_fires) for k, v in inputs.items()}
+    inputs.update(local_start_times=start[valid],
+        local_end_times=end[valid],
+        local_ignition_start_times=ig_start[valid],
+        local_ignition_end_times=ig_end[valid],
+        fire_types=fire_types[valid],
+        moisture_categories=(moisture_categories[valid] if category is None
+            else category))
+    return ValidationResult(codes, messages, inputs)
+
+def validate_static(local_start_times, local_end_times,
+        hourly_fractions=None, groups=None):
+    """Validates StaticBatchProfiler inputs, returning a ValidationResult
+
+    Takes the same arguments as StaticBatchProfiler.  Hourly fractions
+    tables are validated at once (see HourlyFractionSet.validate_table),
+    and fires using an invalid table are invalid.  In result.inputs, the
+    invalid tables are dropped, and groups renumbered accordingly.
+    """
+    start = np.asarray(local_start_times, dtype='datetime64[us]').ravel()
+    num_fires = len(start)
+    end = _column(local_end_times, 'datetime64[us]', 'end time', num_fires)
+    codes = np.zeros(num_fires, dtype='int64')
+    _flag(codes, ~(start < end), INVALID_START_END_TIMES)
+
+    if not hourly_fractions:
+        tables = []
+    elif groups is None:
+        tables = [hourly_fractions]
+    else:
+        tables = list(hourly_fractions)
+    groups = _column(0 if groups is None else groups, 'int64', 'group',
+        num_fires)
+    invalid_tables = _validate_tables(tables)
+    valid_group = (groups >= 0) & (groups < max(len(tables), 1))
+    _flag(codes, ~valid_group, INVALID_GROUP)
+    _flag(codes, valid_group & np.append(invalid_tables, False)[
+        np.where(valid_group, groups, len(tables))], INVALID_HOURLY_FRACTIONS)
+
+    messages = {
+        INVALID_START_END_TIMES: ("The fire's start time, {}, is not before"
+            " its end time, {}", (start, end)),
+        INVALID_GROUP: ("Invalid group: {}.  Groups must be indices into the"
+            " {} hourly fractions tables", (groups, np.full(num_fires,
+            max(len(tables), 1)))),
+        INVALID_HOURLY_FRACTIONS: ("Hourly fractions table {} doesn't have 24"
+            " hourly fractions that sum to 1.00 for each of the '{}' fields",
+            (groups, np.full(num_fires, ', '.join(StaticTimeProfiler.FIELDS))))
+    }
+
+    valid = codes == OK
+    inputs = {'local_start_times': start[valid], 'local_end_times': end[valid]}
+    if tables and not invalid_tables.all():
+        inputs['hourly_fractions'] = [t for t, invalid
+            in zip(tables, invalid_tables) if not invalid]
+        inputs['groups'] = (np.cumsum(~invalid_tables) - 1)[groups[valid]]
+    return ValidationResult(codes, messages, inputs)
+
+
+## Helpers
+
+def _column(values, dtype, label, num_fires):
+    """As BaseBatchTimeProfiler._column"""
+    column = np.asarray(values, dtype=dtype)
+    if column.ndim == 0:
+        column = np.full(num_fires, column)
+    elif column.shape != (num_fires,):
+        raise ValueError("Expected {} {} values; got {}".format(
+            num_fires, label, len(column)))
+    return column
+
+def _flag(codes, invalid, code):
+    """Sets code for the invalid fires that haven't failed an earlier check"""
+    codes[(codes == OK) & invalid] = code
+
+def _lower(values):
+    # Columns of categories have few distinct values, so lower casing just
+    # those is much faster than lower casing every value
+    unique, inverse = np.unique(values, return_inverse=True)
+    return np.char.lower(unique)[inverse.ravel()]
+
+def _is_moisture_category(values):
+    if values.dtype.kind == 'U':
+        return np.isin(_lower(values), MoistureCategory.CATEGORIES)
+    # MoistureCategory objects, possibly mixed with strings or None
+    return np.array([_is_moisture_category_value(m) for m in values],
+        dtype=bool)
+
+def _is_moisture_category_value(value):
+    return isinstance(value, MoistureCategory) or (isinstance(value, str)
+        and value.lower() in MoistureCategory.CATEGORIES)
+
+def _validate_tables(tables):
+    """Returns a boolean array that's True for each invalid hourly
+    fractions table
+    """
+    invalid = np.zeros(len(tables), dtype=bool)
+    # Tables with missing phases or the wrong number of values can't be
+    # stacked into one array, so are checked individually first
+    stackable = []
+    for i, t in enumerate(tables):
+        if isinstance(t, HourlyFractionSet):
+            invalid[i] = t.num_hours != 24
+        elif all(np.shape(_get_phase(t, p)) == (24,)
+                for p in StaticTimeProfiler.FIELDS):
+            stackable.append(i)
+        else:
+            invalid[i] = True
+    if stackable:
+        invalid[stackable] = HourlyFractionSet.validate_table(
+            [[tables[i][p] for p in StaticTimeProfiler.FIELDS]
+            for i in stackable])
+    return invalid
+
+def _get_phase(table, phase):
+    # indexed, rather than using get, for defaultdicts (e.g. the defaults)
+    try:
+        return table[phase]
+    except KeyError:
+        return None
+
+def _take(values, valid, num_fires):
+    """Restricts per-fire values (or rows of hourly values) to the valid
+    fires; single values are shared by all fires, so are returned as is
+    """
+    if values is None or np.ndim(values) == 0:
+        return values
+    values = np.asarray(values)
+    if len(values) != num_fires:
+        # let the profiler raise the appropriate exception
+        return values
+    return values[valid]
@@ -0,0 +1,261 @@
+"""timeprofile.writers
+
+Columnar writers for profile results, with one row per fire hour:
+fire id, hour, and the four phases' hourly fractions.
+
+    from timeprofile.writers import NpyWriter, NpyProfiles
+
+    with NpyWriter('profiles.npy') as writer:
+        writer.write('fire-1', profiler)
+        writer.write_batch(batch_profiler, ids=fire_ids)
+
+    profiles = NpyProfiles('profiles.npy')   # memory-mapped
+    profiles.get_hours(i), profiles[i]
+
+NpyWriter writes the hourly fractions as a (num_fire_hours, 4) .npy array,
+with each fire's hours contiguous, plus a sidecar .index.npz with each
+fire's id, first hour, row offset, and number of hours.  The .npy file can
+be opened with np.load(..., mmap_mode='r') or np.memmap, so readers can
+slice one fire's hours without loading the whole file.
+
+ArrowWriter writes Arrow IPC or Parquet files, if pyarrow is installed.
+"""
+
+import numpy as np
+from numpy.lib import format as npy_format
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+from . import BaseTimeProfiler
+from .fractions import SparseHourlyFractions
+
+__all__ = [
+    'NpyWriter',
+    'NpyProfiles',
+    'ArrowWriter',
+    'get_index_path'
+]
+
+FIELDS = BaseTimeProfiler.FIELDS
+
+
+def get_index_path(path):
+    """Returns the path of the sidecar index for an .npy file"""
+    return (path[:-4] if path.endswith('.npy') else path) + '.index.npz'
+
+
+class BaseColumnarWriter(object):
+    """Base class for writers, which convert profilers' results to columns:
+    fire ids, first hours, numbers of hours, and a (num_fire_hours, 4)
+    array of hourly fractions.
+    """
+
+    def __init__(self, path):
+        self._path = path
+        self._num_fires = 0
+        # 'i' (integer) or 'U' (string), set by the first write
+        self._id_kind = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, e_type, value, tb):
+        self.close()
+
+    def write(self, fire_id, profiler):
+        """Writes a single fire's profile, from a FepsTimeProfiler,
+        StaticTimeProfiler, or template profile.  If the profiler's hourly
+        fractions are sparse, only the hours spanning the phases' stored
+        values are written.
+        """
+        resolution = getattr(profiler, 'resolution', BaseTimeProfiler.ONE_HOUR)
+        if resolution != BaseTimeProfiler.ONE_HOUR:
+            raise ValueError("Only hourly profiles can be written; got "
+                "resolution {}".format(resolution))
+        hourly_fractions = profiler.hourly_fractions
+        if hasattr(hourly_fractions, 'array'):
+            values = hourly_fractions.array.T
+        else:
+            values = np.column_stack([hourly_fractions[p] for p in FIELDS])
+        first_hour = np.datetime64(profiler.start_hour.replace(tzinfo=None),
+            'h')
+        if isinstance(hourly_fractions, SparseHourlyFractions):
+            begin, end = hourly_fractions.span
+            values = values[begin:end]
+            first_hour += np.timedelta64(begin, 'h')
+        self._write_columns(self._id_column([fire_id]), np.array([first_hour]),
+            np.array([len(values)]), values)
+
+    def write_batch(self, batch, ids=None):
+        """Writes a FepsBatchProfiler's or StaticBatchProfiler's profiles.
+        ids default to the fires' running indices.
+        """
+        if ids is None:
+            ids = np.arange(self._num_fires, self._num_fires + batch.num_fires)
+        elif len(ids) != batch.num_fires:
+            raise ValueError("Expected {} ids; got {}".format(
+                batch.num_fires, len(ids)))
+
+        hourly_fractions = batch.hourly_fractions
+        num_hours = batch.num_hours
+        mask = (np.arange(hourly_fractions[FIELDS[0]].shape[1])
+            < num_hours[:, np.newaxis])
+        values = np.column_stack([hourly_fractions[p][mask] for p in FIELDS])
+        self._write_columns(self._id_column(ids), batch.first_hour,
+            num_hours, values)
+
+    def _write_columns(self, ids, first_hours, num_hours, values):
+        self._num_fires += len(ids)
+
+    def _id_column(self, ids):
+        """Returns ids as an int64 or unicode array.  Ids must all be
+        integers or all be strings, across all writes, so that they can be
+        looked up by their original values when read back.
+        """
+        column = np.asarray(ids)
+        kind = {'i': 'i', 'u': 'i', 'U': 'U'}.get(column.dtype.kind)
+        if kind == 'U' and not isinstance(ids, np.ndarray) and not all(
+                isinstance(i, str) for i in ids):
+            # numpy converts mixed integers and strings to strings
+            kind = None
+        if kind is None or self._id_kind not in (None, kind):
+            raise ValueError("Invalid fire ids: {}.  Ids must all be integers"
+                " or all be strings".format(', '.join(str(i) for i in
+                list(ids)[:5])))
+        self._id_kind = kind
+        return column.astype('int64') if kind == 'i' else column
+
+    def close(self):
+        pass
+
+
+class NpyWriter(BaseColumnarWriter):
+    """Writes an .npy file of hourly fractions, and its sidecar index.
+    Rows are written as they come in, and the .npy header is updated with
+    the final number of rows on close.
+    """
+
+    def __init__(self, path, dtype='float64'):
+        super(NpyWriter, self).__init__(path)
+        self._dtype = np.dtype(dtype)
+        self._num_rows = 0
+        self._index = {k: [] for k in ('ids', 'first_hours', 'num_hours')}
+        self._file = open(path, 'wb')
+        self._header_size = self._write_header()
+
+    def _write_header(self):
+        self._file.seek(0)
+        npy_format.write_array_header_1_0(self._file, {
+            'descr': npy_format.dtype_to_descr(self._dtype),
+            'fortran_order': False,
+            'shape': (self._num_rows, len(FIELDS))
+        })
+        return self._file.tell()
+
+    def _write_columns(self, ids, first_hours, num_hours, values):
+        super(NpyWriter, self)._write_columns(ids, first_hours, num_hours,
+            values)
+        self._file.write(np.ascontiguousarray(values, dtype=self._dtype).data)
+        self._num_rows += len(values)
+        self._index['ids'].append(ids)
+        self._index['first_hours'].append(
+            np.asarray(first_hours, dtype='datetime64[h]'))
+        self._index['num_hours'].append(np.asarray(num_hours, dtype='int64'))
+
+    def close(self):
+        if self._file.closed:
+            return
+        # numpy leaves room in the header for the number of rows to grow
+        if self._write_header() != self._header_size:
+            raise RuntimeError("Failed to update .npy header")
+        self._file.close()
+
+        index = {k: (np.concatenate(v) if v else np.array([]))
+            for k, v in self._index.items()}
+        index['first_hours'] = index['first_hours'].astype('datetime64[h]')
+        index['offsets'] = (np.cumsum(index['num_hours'])
+            - index['num_hours']).astype('int64')
+        with open(get_index_path(self._path), 'wb') as f:
+            np.savez(f, **index)
+
+
+class NpyProfiles(object):
+    """Reads an .npy file written by NpyWriter, memory-mapping the hourly
+    fractions and loading the index.
+    """
+
+    def __init__(self, path, mmap_mode='r'):
+        self.values = np.load(path, mmap_mode=mmap_mode)
+        with np.load(get_index_path(path)) as index:
+            self.ids = index['ids']
+            self.first_hours = index['first_hours']
+            self.num_hours = index['num_hours']
+            self.offsets = index['offsets']
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, i):
+        """Returns fire i's (num_hours, 4) hourly fractions, without
+        reading other fires' rows
+        """
+        return self.values[self.offsets[i]:self.offsets[i] + self.num_hours[i]]
+
+    def get_hours(self, i):
+        return self.first_hours[i] + np.arange(self.num_hours[i])
+
+    def find(self, fire_id):
+        """Returns the index of the fire with the given id"""
+        matches = np.flatnonzero(self.ids == fire_id)
+        if not len(matches):
+            raise KeyError(fire_id)
+        return matches[0]
+
+
+class ArrowWriter(BaseColumnarWriter):
+    """Writes an Arrow IPC ('ipc') or Parquet ('parquet') file with columns
+    id, hour, and the four phases.  Requires pyarrow.
+    """
+
+    FORMATS = ('ipc', 'parquet')
+
+    def __init__(self, path, file_format='ipc'):
+        if pyarrow is None:
+            raise ImportError("pyarrow is required for ArrowWriter")
+        if file_format not in self.FORMATS:
+            raise ValueError("Invalid format: '{}'.  Valid: '{}'".format(
+                file_format, "', '".join(self.FORMATS)))
+        super(ArrowWriter, self).__init__(path)
+        self._file_format = file_format
+        # created on first write, once the id column's type is known
+        self._writer = None
+
+    def _write_columns(self, ids, first_hours, num_hours, values):
+        super(ArrowWriter, self)._write_columns(ids, first_hours, num_hours,
+            values)
+        offsets = np.repeat(np.cumsum(num_hours) - num_hours, num_hours)
+        hours = (np.repeat(np.asarray(first_hours, dtype='datetime64[h]'),
+            num_hours) + (np.arange(len(values)) - offsets)).astype(
+            'datetime64[s]')
+        columns = [pyarrow.array(np.repeat(ids, num_hours)),
+            pyarrow.array(hours)] + [pyarrow.array(values[:, i])
+            for i in range(len(FIELDS))]
+        table = pyarrow.Table.from_arrays(columns, names=['id', 'hour'] + FIELDS)
+
+        if self._writer is None:
+            if self._file_format == 'ipc':
+                self._writer = pyarrow.ipc.new_file(self._path, table.schema)
+            else:
+                self._writer = pyarrow.parquet.ParquetWriter(self._path,
+                    table.schema)
+        self._writer.write_table(table)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None